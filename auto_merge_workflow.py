@@ -1,7 +1,10 @@
 import os
+import sys
 import json
 import glob
-import shutil
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+from file_transaction import FileTransaction, recover
 
 # Configuration
 BASE_DIR = "/Users/michael/Documents/Ensinamentos/Sites/ShinCollege_Pt/data/temasSeparados"
@@ -10,6 +13,8 @@ BKP_DIR = os.path.join(BASE_DIR, "bkp_translations")
 # The output filename requested: "adicionar _merge no arquivo"
 OUTPUT_FILENAME = "04_4.その他_04_宗教断片集_merge.json"
 OUTPUT_FILE = os.path.join(BASE_DIR, OUTPUT_FILENAME)
+# Journal of the bulk renames/moves (scripts/file_transaction.py)
+TX_DIR = os.path.join(BASE_DIR, ".transactions")
 
 def task_rename():
     """Step 1: Renaming '* copy.json' to '*_pt.json'"""
@@ -19,13 +24,16 @@ def task_rename():
         print("No matches for '* copy.json'. Skipping renaming.")
         return
     
-    for fpath in files:
+    # All renames or none
+    tx = FileTransaction(TX_DIR, "task_rename")
+    for fpath in sorted(files):
         new_path = fpath.replace(" copy.json", "_pt.json")
-        try:
-            os.rename(fpath, new_path)
+        if tx.move(fpath, new_path):
             print(f"Renamed: {os.path.basename(fpath)} -> {os.path.basename(new_path)}")
-        except Exception as e:
-            print(f"Error renaming {fpath}: {e}")
+    try:
+        tx.commit()
+    except Exception as e:
+        print(f"Error renaming, nothing renamed: {e}")
 
 def task_merge():
     """Step 2 & 3: Merge content and save with '_merge' suffix"""
@@ -87,21 +95,22 @@ def task_move_backup(processed_files):
             print(f"Error creating backup directory: {e}")
             return
 
-    moved_count = 0
-    for fpath in processed_files:
-        fname = os.path.basename(fpath)
-        dest = os.path.join(BKP_DIR, fname)
-        try:
-            shutil.move(fpath, dest)
-            # print(f"Moved: {fname}") # Optional: verify verbosity
-            moved_count += 1
-        except Exception as e:
-            print(f"Error moving {fname}: {e}")
+    # All moves or none
+    tx = FileTransaction(TX_DIR, "task_move_backup")
+    try:
+        for fpath in processed_files:
+            fname = os.path.basename(fpath)
+            tx.move(fpath, os.path.join(BKP_DIR, fname))
+        moved_count = tx.commit()
+    except Exception as e:
+        print(f"Error moving, nothing moved: {e}")
+        return
             
     print(f"Moved {moved_count} files to {BKP_DIR}")
 
 def main():
     print("Starting Auto-Merge Workflow...")
+    recover(TX_DIR) # Undo the renames/moves of an interrupted run
     task_rename()
     processed_files = task_merge()
     if processed_files:
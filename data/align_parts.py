@@ -1,140 +1,96 @@
 import os
+import sys
 import json
-import glob
-import re
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from part_alignment import LOW_CONFIDENCE, align_directory
+from file_transaction import FileTransaction
 
 DATA_DIR = "data"
 TEMAS_DIR = os.path.join(DATA_DIR, "temasSeparados")
-BKP_DIR = os.path.join(TEMAS_DIR, "bkp") 
-
-# Find all unique themes
-all_bkp_files = glob.glob(os.path.join(BKP_DIR, "*_parte*_pt.json"))
-themes = set()
-for f in all_bkp_files:
-    basename = os.path.basename(f)
-    # Extract theme key: everything before _parteXX
-    # Example: 03_3.信仰編_08_御神業の心得_parte01_pt.json
-    parts = basename.split("_parte")
-    if len(parts) > 1:
-        themes.add(parts[0])
+BKP_DIR = os.path.join(TEMAS_DIR, "bkp")
+TX_DIR = os.path.join(TEMAS_DIR, ".transactions")
 
-theme_keys = sorted(list(themes))
-print(f"Aligning parts for {len(theme_keys)} themes...")
 
-all_renames = []
+def part_name(theme_key, part_num):
+    return f"{theme_key}_parte{part_num:02d}_pt.json"
 
-for theme_key in theme_keys:
-    print(f"\nProcessing Theme: {theme_key}")
 
-    # Get all PT files
-    # Get all PT files
-    pt_pattern = os.path.join(BKP_DIR, f"{theme_key}_parte*_pt.json")
-    pt_files = sorted(glob.glob(pt_pattern))
+def main():
+    parser = argparse.ArgumentParser(description="Align translated parts (_pt.json) to their originals.")
+    parser.add_argument("--dir", default=BKP_DIR, help="Directory with the parts and their _pt.json")
+    parser.add_argument("--json", help="Write the full part/publication assignment here")
+    parser.add_argument("--apply", action="store_true", help="Rename misnumbered _pt.json files to their original's number")
+    args = parser.parse_args()
 
-    # Get all Original files
-    orig_pattern = os.path.join(BKP_DIR, f"{theme_key}_parte*.json")
-    # Filter out _pt.json and _merged.json
-    orig_files = [f for f in glob.glob(orig_pattern) if "_pt.json" not in f and "_merged.json" not in f]
-    orig_files.sort()
+    start = time.perf_counter()
+    report, errors = align_directory(args.dir)
+    elapsed = time.perf_counter() - start
+    for error in errors:
+        print(f"Error loading {error}")
 
-    print(f"Found {len(pt_files)} PT files and {len(orig_files)} Original files.")
+    renames = []
+    for theme_key, parts in report.items():
+        print(f"\nProcessing Theme: {theme_key}")
+        print(f"{'PT part':>8} | {'Orig part':>9} | {'Confidence':>10} | {'Pubs':>4} | {'Reordered':>9}")
+        print("-" * 56)
+        for part in parts:
+            pubs = part["publications"]
+            reordered = sum(1 for p in pubs if p["orig_index"] is not None and p["orig_index"] != p["pt_index"])
+            orig = "NO_MATCH" if part["orig_part"] is None else part["orig_part"]
+            flag = "  <<< LOW CONFIDENCE" if part["confidence"] < LOW_CONFIDENCE else ""
+            print(f"{part['pt_part']:>8} | {orig:>9} | {part['confidence']:>10.2f} | {len(pubs):>4} | {reordered:>9}{flag}")
+            if part["orig_part"] is not None and part["orig_part"] != part["pt_part"]:
+                print(f"  >>> MISMATCH! Suggest RENAME {part_name(theme_key, part['pt_part'])} -> "
+                      f"{part_name(theme_key, part['orig_part'])}")
+                renames.append((part_name(theme_key, part["pt_part"]), part_name(theme_key, part["orig_part"])))
 
-    # Load all originals into memory for fast searching
-    orig_data_map = {}
-    for fpath in orig_files:
-        basename = os.path.basename(fpath)
-        try:
-            with open(fpath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                pubs = data.get("publications", [])
-                titles = set()
-                for p in pubs:
-                    t = p.get("publication_title", "").strip()
-                    if t:
-                        titles.add(t)
-                orig_data_map[basename] = titles
-        except Exception as e:
-            print(f"Error loading {basename}: {e}")
+    total_parts = sum(len(parts) for parts in report.values())
+    print(f"\nAligned {total_parts} PT parts of {len(report)} themes in {elapsed:.2f}s; {len(renames)} misnumbered.")
 
-    # Match PT files to Originals
-    matches = []
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Assignment written to {args.json}")
 
-    for pt_path in pt_files:
-        pt_basename = os.path.basename(pt_path)
-        
-        # Check if we can find a matching original
-        best_match = None
-        match_count = 0
-        matched_titles = []
-        
-        try:
-            with open(pt_path, 'r', encoding='utf-8') as f:
-                pt_data = json.load(f)
-                pt_pubs = pt_data.get("publications", [])
-                
-                # Use the first few titles to find a match
-                # Some titles might be generic, so check intersection count
-                
-                pt_titles = [p.get("publication_title", "").strip() for p in pt_pubs if p.get("publication_title")]
-                
-                max_intersection = 0
-                
-                for orig_base, orig_titles in orig_data_map.items():
-                    # Count how many PT titles contain an Orig title
-                    current_intersection = 0
-                    for pt_t in pt_titles:
-                        # Check if any orig title is substring of pt_t
-                        # (Simple check: orig in pt)
-                        for orig_t in orig_titles:
-                            if orig_t and orig_t in pt_t:
-                                current_intersection += 1
-                                break # matched one title in this pub
-                    
-                    if current_intersection > max_intersection:
-                        max_intersection = current_intersection
-                        best_match = orig_base
-                    
-                if best_match and max_intersection > 0:
-                    matches.append((pt_basename, best_match, max_intersection))
+    if renames and args.apply:
+        # A destination that exists and is not renamed away (e.g. a NO_MATCH part), or that
+        # another rename already takes, would be overwritten: those renames are left out
+        # (until none is left out, as leaving one out keeps its source in place)
+        blocked = []
+        while True:
+            sources = {old for old, _ in renames}
+            taken = set()
+            kept = []
+            for old, new in renames:
+                if new in taken or (new not in sources and os.path.exists(os.path.join(args.dir, new))):
+                    blocked.append((old, new))
                 else:
-                    matches.append((pt_basename, "NO_MATCH", 0))
-
-        except Exception as e:
-            print(f"Error processing {pt_basename}: {e}")
+                    taken.add(new)
+                    kept.append((old, new))
+            if len(kept) == len(renames):
+                break
+            renames = kept
+        for old, new in blocked:
+            print(f"  Skipping {old} -> {new}: {new} exists and is not renamed; resolve it by hand.")
 
-    print("\nALIGNMENT RESULTS:")
-    print(f"{'PT File':<50} | {'Best Match Orig':<50} | {'Score'}")
-    print("-" * 110)
-
-    renames = []
-    for pt_base, orig_base, score in matches:
-        print(f"{pt_base:<50} | {orig_base:<50} | {score}")
-        
-        if orig_base != "NO_MATCH":
-            # Check if numbering is different
-            # Extract number from PT
-            pt_num = int(pt_base.split("_parte")[1].split("_pt.json")[0])
-            # Extract number from Orig
-            orig_num = int(orig_base.split("_parte")[1].split(".json")[0])
-            
-            if pt_num != orig_num:
-                print(f"  >>> MISMATCH! Suggest RENAME {pt_base} -> {orig_base.replace('.json', '_pt.json')}")
-                renames.append((pt_base, orig_base.replace('.json', '_pt.json')))
-
-    # Execute renames in REVERSE order to avoid overwrites
-    if renames:
-        print("\nEXECUTING RENAMES (Reverse Order):")
-        # Reverse the list
-        renames.reverse()
-        
+    if renames and args.apply:
+        # Through temporary names, in one transaction: swapped parts do not overwrite each other
+        tx = FileTransaction(TX_DIR, "align_parts")
+        for old, _ in renames:
+            tx.move(os.path.join(args.dir, old), os.path.join(args.dir, old + ".align-tmp"))
         for old, new in renames:
-            old_path = os.path.join(BKP_DIR, old)
-            new_path = os.path.join(BKP_DIR, new)
-            
             print(f"  Renaming {old} -> {new}")
-            try:
-                 os.rename(old_path, new_path)
-            except Exception as e:
-                 print(f"  ERROR: {e}")
+            tx.move(os.path.join(args.dir, old + ".align-tmp"), os.path.join(args.dir, new))
+        tx.commit()
+    elif args.apply:
+        print("No renames applied.")
+    elif renames:
+        print("Run with --apply to rename them.")
     else:
         print("No renames needed.")
+
+if __name__ == "__main__":
+    main()
@@ -11,17 +11,29 @@ Este script executa 4 etapas:
 
 import os
 import json
-import shutil
 import glob
 import re
+import time
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 import sys
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from incremental_build import BuildCache
+from file_transaction import FileTransaction, recover
+from node_ids import index_by_id, volume_id, ID_SCHEME
+from site_shards import publish_site
+
 BASE_DIR = "/Users/michael/Documents/Ensinamentos/Sites/ShinCollege_Pt/data"
 TEMAS_DIR = os.path.join(BASE_DIR, "temasSeparados")
 PARTES_DIR = os.path.join(TEMAS_DIR, "partes")
 BKP_DIR = os.path.join(TEMAS_DIR, "bkp")
 OUTPUT_FILE = os.path.join(BASE_DIR, "shin_college_data.json")
+# Diário das renomeações/movimentações em lote (scripts/file_transaction.py)
+TX_DIR = os.path.join(TEMAS_DIR, ".transactions")
+# Código que define o JSON gerado: alterá-lo invalida o cache de build
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts")
+BUILDER_SOURCES = [os.path.abspath(__file__), os.path.join(SCRIPTS_DIR, "node_ids.py")]
 
 VOLUME_MAP = {
     "1.経綸・霊主体従・夜昼転換・祖霊祭祀編": "1. Plano Divino, Precedência do Espírito sobre a Matéria, Transição da Noite para o Dia e Culto aos Antepassados",
@@ -42,246 +54,237 @@ def step1_rename_copy_to_pt():
         print("  Nenhum arquivo ' copy.json' encontrado.")
         return 0
     
-    renamed = 0
-    for src in copy_files:
+    # Tudo ou nada: uma falha no meio desfaz as renomeações já feitas
+    tx = FileTransaction(TX_DIR, "etapa1")
+    for src in sorted(copy_files):
         # Remove " copy.json" do final e adiciona "_pt.json"
         base = src.replace(" copy.json", "")
         dst = base + "_pt.json"
         
         print(f"  {os.path.basename(src)} -> {os.path.basename(dst)}")
-        shutil.move(src, dst)
-        renamed += 1
+        tx.move(src, dst)
+    renamed = tx.commit()
     
     print(f"  Total renomeado: {renamed}")
     return renamed
 
 
-def step2_merge_parts(filter_theme=None):
+PART_PATTERN = re.compile(r"^(.+?)_parte(\d+)(_pt)?\.json$")
+
+
+def simple_norm(t):
+    # Normalizar (remover espaços) para comparação segura de títulos
+    return t.replace(" ", "").replace("　", "")
+
+
+def index_part_files():
+    """
+    Lista partes/ e bkp/ uma única vez.
+    Retorna {theme_key: {part_num: {"pt": caminho, "orig": caminho}}}: o _pt.json
+    vem de partes/, o original de partes/ ou, se não estiver lá, de bkp/.
+    """
+    index = defaultdict(dict)
+    for directory in (BKP_DIR, PARTES_DIR):
+        if not os.path.isdir(directory):
+            continue
+        for name in os.listdir(directory):
+            match = PART_PATTERN.match(name)
+            if not match:
+                continue
+            theme_key, part_num, is_pt = match.group(1), int(match.group(2)), bool(match.group(3))
+            entry = index[theme_key].setdefault(part_num, {})
+            if is_pt:
+                if directory == PARTES_DIR:
+                    entry["pt"] = os.path.join(directory, name)
+            else:
+                # partes/ é listado por último: tem prioridade sobre bkp/
+                entry["orig"] = os.path.join(directory, name)
+
+    # Só interessam as partes com tradução em partes/
+    return {
+        theme_key: {n: e for n, e in parts.items() if "pt" in e}
+        for theme_key, parts in index.items()
+        if any("pt" in e for e in parts.values())
+    }
+
+
+def load_json(path, errors, label):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        errors.append(f"    ⚠️ Erro ao ler {label} {os.path.basename(path)}: {e}")
+        return None
+
+
+def metadata_from_key(theme_key, log):
+    """Metadados extraídos do nome do arquivo (IndexVol_VolName_IndexTheme_ThemeName)"""
+    log.append(f"    ⚠️  Metadados ausentes nos JSONs. Tentando extrair do key: '{theme_key}'")
+    key_parts = theme_key.split('_')
+    if len(key_parts) < 4:
+        return None
+    vol_name = key_parts[1]
+    theme_name = "_".join(key_parts[3:])
+    log.append(f"    ✅ Metadados recuperados do nome: Volume='{vol_name}', Tema='{theme_name}'")
+    return {"volume": vol_name, "theme_id": "", "theme_name": theme_name, "theme_name_ptbr": ""}
+
+
+def merge_part_publications(part_num, pt_data, orig_data, log):
+    """Junta as publicações de uma parte: JP do original, PT do traduzido"""
+    pt_pubs = pt_data.get("publications", [])
+    orig_pubs = orig_data.get("publications", []) if orig_data else []
+
+    # Mapas das publicações originais: pelo id estável (node_ids.py) e,
+    # para partes antigas sem id, pelo índice
+    orig_by_id = index_by_id(orig_pubs)
+    orig_map = {pub.get("pub_idx", i): pub for i, pub in enumerate(orig_pubs)}
+
+    merged_pubs = []
+    for i, pt_pub in enumerate(pt_pubs):
+        pub_idx = pt_pub.get("pub_idx", i)
+        orig_pub = orig_by_id.get(pt_pub.get("id")) or orig_map.get(pub_idx, {})
+
+        merged_pubs.append({
+            "id": orig_pub.get("id") or pt_pub.get("id", ""),
+            "title_id": orig_pub.get("title_id") or pt_pub.get("title_id", ""),
+            "title": orig_pub.get("title") or pt_pub.get("title", ""),
+            "title_ptbr": pt_pub.get("title_ptbr", ""),
+            "publication_title": orig_pub.get("publication_title") or pt_pub.get("publication_title", ""),
+            "publication_title_ptbr": pt_pub.get("publication_title_ptbr", ""),
+            "content": orig_pub.get("content", ""),  # JP do original
+            "content_ptbr": pt_pub.get("content_ptbr", ""),  # PT do traduzido
+            "date": pt_pub.get("date", ""),
+            "has_translation": bool(pt_pub.get("content_ptbr")),
+            "pub_idx": pub_idx
+        })
+
+        # SEGURANÇA: Verificar se o título original informado pelo LLM bate com o arquivo original
+        # Isso evita merges desalinhados (Ex: Parte 39 PT misturada com Parte 44 JP)
+        llm_orig_title = pt_pub.get("original_title", "").strip()
+        file_orig_title = orig_pub.get("publication_title", "").strip()
+        if llm_orig_title and file_orig_title and simple_norm(llm_orig_title) != simple_norm(file_orig_title):
+            log.append(f"    ⚠️  ALERTA DE ALINHAMENTO (Parte {part_num}, Pub {pub_idx}):")
+            log.append(f"       LLM diz ser: '{llm_orig_title}'")
+            log.append(f"       Arquivo é:   '{file_orig_title}'")
+            # Não abortamos, mas o log avisará sobre o risco.
+    return merged_pubs
+
+
+def merge_theme(theme_key, parts, temas_dir):
+    """
+    Cria o {theme_key}_merged.json de um tema, lendo cada arquivo uma única vez.
+    Roda nos processos do pool: devolve (theme_key, publicações, log, segundos)
+    em vez de imprimir, para o log sair na ordem dos temas.
+    """
+    start = time.perf_counter()
+    log = [f"\n  Processando tema: {theme_key}",
+           f"    {len(parts)} partes encontradas: {sorted(parts)}"]
+
+    loaded = []
+    metadata = None
+    for part_num in sorted(parts):
+        entry = parts[part_num]
+        pt_data = load_json(entry["pt"], log, "PT")
+        if pt_data is None:
+            continue
+        orig_data = None
+        if "orig" in entry:
+            orig_data = load_json(entry["orig"], log, "original")
+            if orig_data is None:
+                log.append(f"    ERRO ao processar parte {part_num}: original ilegível")
+                continue
+        else:
+            log.append(f"    ⚠️  Original não encontrado para parte {part_num}")
+        loaded.append((part_num, pt_data, orig_data))
+
+        # Metadados: da primeira parte cujo original tem volume e tema
+        if metadata is None and orig_data and orig_data.get("volume") and orig_data.get("theme_name"):
+            metadata = {
+                "volume": orig_data["volume"],
+                "theme_id": orig_data.get("theme_id", ""),
+                "theme_name": orig_data["theme_name"],
+                "theme_name_ptbr": pt_data.get("theme_name_ptbr", "")  # PTBR vem do PT mesmo vazio
+            }
+            log.append(f"    ✅ Metadados encontrados em (Orig) {os.path.basename(entry['orig'])}")
+
+    if metadata is None:
+        metadata = metadata_from_key(theme_key, log)
+    if not metadata or not metadata.get("volume"):
+        log.append(f"    🛑 ERRO CRÍTICO: Impossível determinar metadados para {theme_key}. Ignorando.")
+        return theme_key, 0, log, time.perf_counter() - start
+
+    all_publications = []
+    for part_num, pt_data, orig_data in loaded:
+        try:
+            merged_pubs = merge_part_publications(part_num, pt_data, orig_data, log)
+        except Exception as e:
+            log.append(f"    ERRO ao processar parte {part_num}: {e}")
+            continue
+        all_publications.extend(merged_pubs)
+        log.append(f"    Parte {part_num}: {len(merged_pubs)} publicações bilíngues")
+
+    if not all_publications:
+        return theme_key, 0, log, time.perf_counter() - start
+
+    merged_data = {
+        "source_file": f"{theme_key}_merged.json",
+        "volume": metadata["volume"],
+        "theme_id": metadata.get("theme_id", ""),
+        "theme_name": metadata["theme_name"],
+        "theme_name_ptbr": metadata["theme_name_ptbr"],
+        "total_publications": len(all_publications),
+        "publications": all_publications
+    }
+    merged_path = os.path.join(temas_dir, f"{theme_key}_merged.json")
+    with open(merged_path, 'w', encoding='utf-8') as f:
+        json.dump(merged_data, f, ensure_ascii=False, indent=2)
+
+    log.append(f"    -> Criado: {theme_key}_merged.json ({len(all_publications)} publicações bilíngues)")
+    return theme_key, len(all_publications), log, time.perf_counter() - start
+
+
+def step2_merge_parts(filter_theme=None, workers=None):
     """Lê arquivos _pt.json de partes, junta com original, e cria arquivo _merged.json por tema"""
     print("\n" + "="*60)
     print("ETAPA 2: Merge de traduções e originais")
     print("="*60)
     
-    # Identificar temas baseados nos arquivos em PARTES_DIR
-    themes = set()
-    start_files = glob.glob(os.path.join(PARTES_DIR, "*_parte01_pt.json"))
+    start = time.perf_counter()
+    index = index_part_files()
     
-    if not start_files:
+    # Temas: os que têm _parte01_pt.json; se nenhum tiver, todos com algum _pt.json
+    themes = sorted(k for k, parts in index.items() if 1 in parts)
+    if not themes:
         print("  Nenhum arquivo _parte01_pt.json encontrado em partes/!")
-        # Fallback: talvez não tenhamos parte01? (Raro, mas...)
-        # Escanear todos _pt.json
-        all_pt = glob.glob(os.path.join(PARTES_DIR, "*_pt.json"))
-        for f in all_pt:
-            # Tentar adivinhar tema removendo _parteXX_pt.json
-            name = os.path.basename(f)
-            # Regex seria melhor, mas split serve
-            parts = name.split("_parte")
-            if len(parts) > 1:
-                themes.add(parts[0])
-    else:
-        for f_path in start_files:
-            basename = os.path.basename(f_path)
-            theme_key = basename.split("_parte01_pt.json")[0]
-            themes.add(theme_key)
+        themes = sorted(index)
     
-    full_themes_list = sorted(list(themes))
-    print(f"  Temas identificados: {len(full_themes_list)}")
-    print(f"  Lista de Temas: {full_themes_list}")
+    print(f"  Temas identificados: {len(themes)}")
+    print(f"  Lista de Temas: {themes}")
     
-    merged_count = 0
+    if filter_theme:
+        themes = [k for k in themes if filter_theme in k]
+        print(f"  Filtro '{filter_theme}': {len(themes)} temas")
     
-    for theme_key in full_themes_list:
-        print(f"DEBUG: Processing theme_key: {repr(theme_key)}")
-        if filter_theme:
-             print(f"DEBUG: Checking filter '{filter_theme}' against '{theme_key}'")
-             if filter_theme not in theme_key:
-                print("DEBUG: Filter mismatch. Skipping.")
-                continue
-
-        # Encontrar todas as partes para o tema atual
-        pattern_glob = os.path.join(PARTES_DIR, f"{theme_key}_parte*_pt.json")
-        print(f"DEBUG: Glob pattern: {pattern_glob}")
-        theme_parts_files = glob.glob(pattern_glob)
-        
-        if not theme_parts_files:
-            print(f"  Nenhuma parte '_pt.json' encontrada para o tema '{theme_key}'. Pulando.")
-            continue
-        
-        print(f"DEBUG: Encontrados {len(theme_parts_files)} arquivos para o tema '{theme_key}'")
-
-        # Agrupar por tema (prefixo antes de _parteXX)
-        parts_for_theme = []
-        pattern = re.compile(r"^(.+?)_parte(\d+)(?:_pt)?\.json$")
-        
-        for pt_file in theme_parts_files:
-            basename = os.path.basename(pt_file)
-            match = pattern.match(basename.replace("_pt.json", ".json"))
-            if match:
-                part_num = int(match.group(2))
-                parts_for_theme.append((part_num, pt_file))
-            else:
-                print(f"DEBUG: Skipping file {basename} - no pattern match")
-        
-        # Ordenar por número da parte
-        parts_for_theme.sort(key=lambda x: x[0])
-
-        print(f"\n  Processando tema: {theme_key}")
-        print(f"    {len(parts_for_theme)} partes encontradas")
-        # DEBUG: Print all parts found
-        print(f"    Parts list: {[p[0] for p in parts_for_theme]}")
-        
-        # Carregar e mesclar todas as partes
-        all_publications = []
-        metadata = None
-        
-        for part_num, pt_path in parts_for_theme:
-            try:
-                # Carregar arquivo PT (com tradução portuguesa)
-                with open(pt_path, 'r', encoding='utf-8') as f:
-                    pt_data = json.load(f)
-                
-                # Buscar arquivo original correspondente (com japonês)
-                # Tentar primeiro em partes/, depois em bkp/
-                orig_basename = os.path.basename(pt_path).replace("_pt.json", ".json")
-                orig_path = os.path.join(PARTES_DIR, orig_basename)
-                
-                if not os.path.exists(orig_path):
-                    # Tentar no backup
-                    orig_path = os.path.join(BKP_DIR, orig_basename)
-                
-                orig_data = None
-
-                if os.path.exists(orig_path):
-                    with open(orig_path, 'r', encoding='utf-8') as f_orig:
-                        orig_data = json.load(f_orig)
-                    
-                    if orig_data.get("volume") and orig_data.get("theme_name"):
-                        metadata = {
-                            "volume": orig_data["volume"],
-                            "theme_name": orig_data["theme_name"],
-                            "theme_name_ptbr": pt_data.get("theme_name_ptbr", "") # PTBR vem do PT mesmo vazio
-                        }
-                        print(f"    ✅ Metadados encontrados em (Orig) {orig_basename}")
-                        break
-            except Exception as e:
-                print(f"    ⚠️ Erro ao ler {pt_path} para metadados: {e}")
-                continue
-
-        # 2. Tentativa via Nome do Arquivo / Theme Key (Fallback)
-        if metadata is None or not metadata.get("volume") or not metadata.get("theme_name"):
-            print(f"    ⚠️  Metadados ausentes nos JSONs. Tentando extrair do key: '{theme_key}'")
-            try:
-                key_parts = theme_key.split('_')
-                # Espera-se: IndexVol, VolName, IndexTheme, ThemeName
-                # Ex: ["01", "1.Volume", "03", "Tema"]
-                if len(key_parts) >= 4:
-                    vol_name = key_parts[1]
-                    theme_name = key_parts[3]
-                    if len(key_parts) > 4:
-                        theme_name = "_".join(key_parts[3:])
-                    
-                    metadata = {
-                        "volume": vol_name,
-                        "theme_name": theme_name,
-                        "theme_name_ptbr": ""
-                    }
-                    print(f"    ✅ Metadados recuperados do nome: Volume='{vol_name}', Tema='{theme_name}'")
-            except Exception as e:
-                print(f"    ❌ Falha ao extrair do nome: {e}")
-
-        # Se falhou tudo, pula
-        if not metadata or not metadata.get("volume"):
-             print(f"    🛑 ERRO CRÍTICO: Impossível determinar metadados para {theme_key}. Ignorando.")
-             continue
-
-        # ESTÁGIO 2: Mesclar Conteúdo
-        # Agora iteramos novamente para processar o conteúdo usando o metadata garantido
-        for part_num, pt_path in parts_for_theme:
-            try:
-                with open(pt_path, 'r', encoding='utf-8') as f:
-                    pt_data = json.load(f)
-                
-                # Buscar arquivo original correspondente (com japonês)
-                orig_basename = os.path.basename(pt_path).replace("_pt.json", ".json")
-                orig_path = os.path.join(PARTES_DIR, orig_basename)
-                
-                if not os.path.exists(orig_path):
-                    orig_path = os.path.join(BKP_DIR, orig_basename)
-                
-                orig_data = None
-                if os.path.exists(orig_path):
-                    with open(orig_path, 'r', encoding='utf-8') as f:
-                        orig_data = json.load(f)
-                else:
-                    print(f"    ⚠️  Original não encontrado para parte {part_num}")
-                
-                pt_pubs = pt_data.get("publications", [])
-                orig_pubs = orig_data.get("publications", []) if orig_data else []
-                
-                # Criar mapa de publicações originais por índice para matching
-                orig_map = {pub.get("pub_idx", i): pub for i, pub in enumerate(orig_pubs)}
-                
-                merged_pubs = []
-                for i, pt_pub in enumerate(pt_pubs):
-                    # Tentar encontrar publicação original correspondente
-                    pub_idx = pt_pub.get("pub_idx", i)
-                    orig_pub = orig_map.get(pub_idx, {})
-                    
-                    # Combinar campos: JP do original, PT do traduzido
-                    merged_pub = {
-                        "title": orig_pub.get("title") or pt_pub.get("title", ""),
-                        "title_ptbr": pt_pub.get("title_ptbr", ""),
-                        "publication_title": orig_pub.get("publication_title") or pt_pub.get("publication_title", ""),
-                        "publication_title_ptbr": pt_pub.get("publication_title_ptbr", ""),
-                        "content": orig_pub.get("content", ""),  # JP do original
-                        "content_ptbr": pt_pub.get("content_ptbr", ""),  # PT do traduzido
-                        "date": pt_pub.get("date", ""),
-                        "has_translation": bool(pt_pub.get("content_ptbr")),
-                        "pub_idx": pub_idx
-                    }
-
-                    # SEGURANÇA: Verificar se o título original informado pelo LLM bate com o arquivo original
-                    # Isso evita merges desalinhados (Ex: Parte 39 PT misturada com Parte 44 JP)
-                    llm_orig_title = pt_pub.get("original_title", "").strip()
-                    file_orig_title = orig_pub.get("publication_title", "").strip()
-                    
-                    if llm_orig_title and file_orig_title:
-                        # Normalizar (remover espaços e pontuação básica) para comparação segura
-                        def simple_norm(t): return t.replace(" ", "").replace("　", "")
-                        
-                        if simple_norm(llm_orig_title) != simple_norm(file_orig_title):
-                            print(f"    ⚠️  ALERTA DE ALINHAMENTO (Parte {part_num}, Pub {pub_idx}):")
-                            print(f"       LLM diz ser: '{llm_orig_title}'")
-                            print(f"       Arquivo é:   '{file_orig_title}'")
-                            # Não abortamos, mas o log avisará sobre o risco.
-                    
-                    merged_pubs.append(merged_pub)
-                
-                all_publications.extend(merged_pubs)
-                print(f"    Parte {part_num}: {len(merged_pubs)} publicações bilíngues")
-                
-            except Exception as e:
-                print(f"    ERRO ao processar parte {part_num}: {e}")
-        
-        if metadata and all_publications:
-            # Criar arquivo merged
-            merged_data = {
-                "source_file": f"{theme_key}_merged.json",
-                "volume": metadata["volume"],
-                "theme_name": metadata["theme_name"],
-                "theme_name_ptbr": metadata["theme_name_ptbr"],
-                "total_publications": len(all_publications),
-                "publications": all_publications
-            }
-            
-            merged_path = os.path.join(TEMAS_DIR, f"{theme_key}_merged.json")
-            with open(merged_path, 'w', encoding='utf-8') as f:
-                json.dump(merged_data, f, ensure_ascii=False, indent=2)
-            
-            print(f"    -> Criado: {theme_key}_merged.json ({len(all_publications)} publicações bilíngues)")
+    workers = max(1, min(workers or os.cpu_count() or 1, len(themes) or 1))
+    tasks = [(theme_key, index[theme_key], TEMAS_DIR) for theme_key in themes]
+    if workers == 1:
+        results = [merge_theme(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(merge_theme, *zip(*tasks)))
+    
+    merged_count = 0
+    timings = []
+    for theme_key, publications, log, seconds in results:
+        print("\n".join(log))
+        if publications:
             merged_count += 1
+        timings.append((seconds, theme_key, publications))
     
-    print(f"\n  Total de arquivos merged criados: {merged_count}")
+    print(f"\n  Tempo por tema ({workers} processo(s)):")
+    for seconds, theme_key, publications in timings:
+        print(f"    {seconds:6.2f}s  {theme_key} ({publications} publicações)")
+    print(f"\n  Total de arquivos merged criados: {merged_count} em {time.perf_counter() - start:.2f}s")
     return merged_count
 
 
@@ -296,7 +299,7 @@ def step3_move_to_backup():
     # Encontrar temas que foram merged (para saber quais partes mover)
     merged_files = glob.glob(os.path.join(TEMAS_DIR, "*_merged.json"))
     
-    total_moved = 0
+    tx = FileTransaction(TX_DIR, "etapa3")
     
     for merged_path in merged_files:
         basename = os.path.basename(merged_path)
@@ -309,22 +312,60 @@ def step3_move_to_backup():
         pattern = os.path.join(PARTES_DIR, f"{theme_key}_parte*")
         parts = glob.glob(pattern)
         
-        for part_path in parts:
+        for part_path in sorted(parts):
             part_basename = os.path.basename(part_path)
             dest_path = os.path.join(BKP_DIR, part_basename)
             
-            try:
-                shutil.move(part_path, dest_path)
+            if tx.move(part_path, dest_path):
                 print(f"  {part_basename} -> bkp/")
-                total_moved += 1
-            except Exception as e:
-                print(f"  ERRO ao mover {part_basename}: {e}")
     
+    # Tudo ou nada: partes/ e bkp/ nunca ficam pela metade
+    total_moved = tx.commit()
     print(f"\n  Total movido: {total_moved}")
     return total_moved
 
 
-def step4_regenerate_main_json():
+def build_theme_from_merged(merged_data):
+    """Converte um *_merged.json (publicações achatadas) no objeto de tema do JSON principal"""
+    flattened_pubs = merged_data.get("publications", [])
+    titles_map = {}
+    titles_order = []
+    
+    for pub in flattened_pubs:
+        t_title = pub.get("title")
+        
+        if t_title not in titles_map:
+            titles_map[t_title] = {
+                "id": pub.get("title_id", ""),
+                "title": t_title,
+                "title_ptbr": pub.get("title_ptbr", ""),
+                "publications": []
+            }
+            titles_order.append(t_title)
+        
+        new_pub = {
+            "id": pub.get("id", ""),
+            "publication_title": pub.get("publication_title", ""),
+            "publication_title_ptbr": pub.get("publication_title_ptbr", ""),
+            "content": pub.get("content", ""),
+            "content_ptbr": pub.get("content_ptbr", ""),
+            "date": pub.get("date", ""),
+            "has_translation": pub.get("has_translation", bool(pub.get("content_ptbr"))),
+            "pub_idx": pub.get("pub_idx", 0)
+        }
+        titles_map[t_title]["publications"].append(new_pub)
+    
+    new_titles_list = [titles_map[t] for t in titles_order]
+    
+    return {
+        "id": merged_data.get("theme_id", ""),
+        "theme": merged_data.get("theme_name"),
+        "theme_ptbr": merged_data.get("theme_name_ptbr", ""),
+        "titles": new_titles_list
+    }
+
+
+def step4_regenerate_main_json(full=False, release=False):
     """Regenera shin_college_data.json a partir dos arquivos merged"""
     print("\n" + "="*60)
     print("ETAPA 4: Regenerando shin_college_data.json")
@@ -338,80 +379,66 @@ def step4_regenerate_main_json():
     
     print(f"  Encontrados {len(merged_files)} arquivos merged.")
     
+    # Manifesto ao lado do OUTPUT_FILE: temas cujo _merged.json não mudou
+    # são reaproveitados sem reler o arquivo
+    cache = BuildCache(OUTPUT_FILE, "merge_translations", full=full, sources=BUILDER_SOURCES)
     volumes_map = {}
+    total_pubs = 0
     
     for file_path in merged_files:
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                merged_data = json.load(f)
-            
-            raw_vol_name = merged_data.get("volume", "")
-            vol_ptbr = VOLUME_MAP.get(raw_vol_name, raw_vol_name)
+            theme_key = os.path.basename(file_path)
+            meta = cache.meta(file_path)
+            theme_entry = cache.theme(theme_key, [file_path], ID_SCHEME) if meta else None
             
-            theme_name = merged_data.get("theme_name")
-            theme_name_ptbr = merged_data.get("theme_name_ptbr", "")
-            
-            if not raw_vol_name or not theme_name:
-                continue
-            
-            flattened_pubs = merged_data.get("publications", [])
-            titles_map = {}
-            titles_order = []
-            
-            for pub in flattened_pubs:
-                t_title = pub.get("title")
+            if theme_entry is None:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    merged_data = json.load(f)
+                
+                raw_vol_name = merged_data.get("volume", "")
+                theme_name = merged_data.get("theme_name")
                 
-                if t_title not in titles_map:
-                    titles_map[t_title] = {
-                        "title": t_title,
-                        "title_ptbr": pub.get("title_ptbr", ""),
-                        "publications": []
-                    }
-                    titles_order.append(t_title)
+                if not raw_vol_name or not theme_name:
+                    cache.set_meta(file_path, {"volume": ""})
+                    cache.store_theme(theme_key, [file_path], None, ID_SCHEME)
+                    continue
                 
-                new_pub = {
-                    "publication_title": pub.get("publication_title", ""),
-                    "publication_title_ptbr": pub.get("publication_title_ptbr", ""),
-                    "content": pub.get("content", ""),
-                    "content_ptbr": pub.get("content_ptbr", ""),
-                    "date": pub.get("date", ""),
-                    "has_translation": pub.get("has_translation", bool(pub.get("content_ptbr"))),
-                    "pub_idx": pub.get("pub_idx", 0)
+                meta = {
+                    "volume": raw_vol_name,
+                    "publications": len(merged_data.get("publications", []))
                 }
-                titles_map[t_title]["publications"].append(new_pub)
+                cache.set_meta(file_path, meta)
+                theme_entry = cache.store_theme(theme_key, [file_path], build_theme_from_merged(merged_data), ID_SCHEME)
             
-            new_titles_list = [titles_map[t] for t in titles_order]
+            if not theme_entry:
+                continue
             
-            new_theme_obj = {
-                "theme": theme_name,
-                "theme_ptbr": theme_name_ptbr,
-                "titles": new_titles_list
-            }
+            raw_vol_name = meta["volume"]
+            vol_ptbr = VOLUME_MAP.get(raw_vol_name, raw_vol_name)
             
             if raw_vol_name not in volumes_map:
                 volumes_map[raw_vol_name] = {
+                    "id": volume_id(raw_vol_name),
                     "volume": raw_vol_name,
                     "volume_ptbr": vol_ptbr,
                     "themes": []
                 }
             
-            volumes_map[raw_vol_name]["themes"].append(new_theme_obj)
+            volumes_map[raw_vol_name]["themes"].append(theme_entry)
+            total_pubs += meta["publications"]
         
         except Exception as e:
             print(f"  ERRO ao processar {os.path.basename(file_path)}: {e}")
     
     final_volumes_list = sorted(volumes_map.values(), key=lambda x: x["volume"])
     
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(final_volumes_list, f, ensure_ascii=False, indent=2)
+    changed = cache.write_output(final_volumes_list)
+    
+    # Manifesto de navegação + conteúdo por tema, carregados sob demanda pelo js/app.js
+    # (com --release, também as cópias minificadas, comprimidas e com hash no nome)
+    publish_site(OUTPUT_FILE, changed, release=release)
     
     total_themes = sum(len(v["themes"]) for v in final_volumes_list)
-    total_pubs = sum(
-        len(t["publications"]) 
-        for v in final_volumes_list 
-        for th in v["themes"] 
-        for t in th["titles"]
-    )
     
     print(f"  Regenerado com sucesso!")
     print(f"    Volumes: {len(final_volumes_list)}")
@@ -426,6 +453,9 @@ def main():
     print("# SCRIPT DE MERGE DE TRADUÇÕES")
     print("#"*60)
     
+    # Desfaz movimentações interrompidas por uma execução anterior
+    recover(TX_DIR)
+    
     # Etapa 1
     step1_rename_copy_to_pt()
     
@@ -435,6 +465,9 @@ def main():
     import argparse
     parser = argparse.ArgumentParser(description='Merge de traduções e originais.')
     parser.add_argument('--filter', type=str, help='Filtrar por nome do tema (ex: "御神体とお光")')
+    parser.add_argument('--full', action='store_true', help='Ignora o manifesto e regenera o JSON principal por completo')
+    parser.add_argument('--release', action='store_true', help='Publica também os artefatos minificados, .gz/.br e com hash no nome')
+    parser.add_argument('--workers', type=int, default=None, help='Processos do merge da etapa 2 (padrão: número de CPUs)')
     args = parser.parse_args()
     
     filter_arg = args.filter
@@ -442,13 +475,13 @@ def main():
     if filter_arg:
         print(f"!!! FILTRO ATIVO: Processando apenas temas contendo '{filter_arg}' !!!")
     
-    step2_merge_parts(filter_theme=filter_arg)
+    step2_merge_parts(filter_theme=filter_arg, workers=args.workers)
     
     # Etapa 3
     step3_move_to_backup()
     
     # Etapa 4
-    step4_regenerate_main_json()
+    step4_regenerate_main_json(full=args.full, release=args.release)
     
     print("\n" + "#"*60)
     print("# MERGE CONCLUÍDO!")
@@ -1,7 +1,9 @@
-import json
 import os
-import glob
 import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from corpus_store import CorpusStore
 
 DATA_DIR = "data"
 MAIN_JSON = os.path.join(DATA_DIR, "shin_college_data.json")
@@ -12,45 +14,16 @@ def normalize(text):
 
 def verify():
     print("Carregando shin_college_data.json...")
+    # O main JSON fica indexado no corpus.sqlite (scripts/corpus_store.py); só é reimportado quando muda
+    store = CorpusStore()
     try:
-        with open(MAIN_JSON, 'r', encoding='utf-8') as f:
-            main_data = json.load(f)
+        store.sync_json(MAIN_JSON, "main")
     except FileNotFoundError:
         print(f"ERRO: {MAIN_JSON} não encontrado.")
         return
 
-    # Indexar o main data para busca rápida
-    # Estrutura: Volume -> Theme -> Title -> PubTitle -> Data
-    # Vamos criar um set de assinaturas: (volume, theme, pub_title)
-    main_index = {}
-    
-    total_main_pubs = 0
-    missing_jp_in_main = 0
-    missing_pt_in_main = 0
-
-    for vol in main_data:
-        v_name = normalize(vol.get("volume", ""))
-        for theme in vol.get("themes", []):
-            t_name = normalize(theme.get("theme", ""))
-            for title in theme.get("titles", []):
-                for pub in title.get("publications", []):
-                    p_title = normalize(pub.get("publication_title", ""))
-                    
-                    # Chave única (aproximada, já que title wrapper pode variar, mas pub_title deve ser constante)
-                    # O merge script usa pub_idx, mas aqui vamos tentar por título para garantir
-                    # Se houver duplicatas de título no mesmo tema, isso pode ser um problema, mas vamos contar.
-                    key = (v_name, t_name, p_title)
-                    
-                    if key not in main_index:
-                        main_index[key] = []
-                    main_index[key].append(pub)
-                    
-                    total_main_pubs += 1
-                    
-                    if not pub.get("content"):
-                        missing_jp_in_main += 1
-                    if not pub.get("content_ptbr"):
-                        missing_pt_in_main += 1
+    total_main_pubs, _, _ = store.translation_counts("main")
+    missing_jp_in_main, missing_pt_in_main = store.content_gaps("main")
 
     print(f"Total de publicações no main JSON: {total_main_pubs}")
     print(f"  - Sem Japonês: {missing_jp_in_main}")
@@ -58,37 +31,40 @@ def verify():
 
     # DEBUG: Show structure
     print("\n[DEBUG] Estrutura encontrada no main_data:")
-    for vol in main_data:
-        vol_name = vol.get("volume", "SEM_VOLUME")
-        themes = vol.get("themes", [])
-        print(f"  Volume: {vol_name} (Temas: {len(themes)})")
-        for t in themes:
-             t_name = t.get("theme", "SEM_TEMA")
-             titles = t.get("titles", [])
-             t_pubs = 0
-             for tit in titles:
-                 t_pubs += len(tit.get("publications", []))
-             print(f"    - Tema: {t_name} (Pubs: {t_pubs})")
+    last_vol = None
+    summary = store.theme_summary("main")
+    for vol_name, t_name, t_pubs, _ in summary:
+        if vol_name != last_vol:
+            themes = sum(1 for row in summary if row[0] == vol_name)
+            print(f"  Volume: {vol_name or 'SEM_VOLUME'} (Temas: {themes})")
+            last_vol = vol_name
+        print(f"    - Tema: {t_name or 'SEM_TEMA'} (Pubs: {t_pubs})")
     
     # Agora varrer os arquivos _pt.json no backup
     print(f"\nVerificando arquivos em {BKP_DIR}...")
-    pt_files = glob.glob(os.path.join(BKP_DIR, "*_pt.json"))
+    store.sync_parts([BKP_DIR])
+    pt_rows = store.part_publications("pt", BKP_DIR)
     
-    if not pt_files:
+    if not pt_rows:
         print("Nenhum arquivo *_pt.json encontrado no backup.")
         return
 
+    # Publicações por arquivo: (volume, tema, [(id, publication_title)])
+    pt_files = {}
+    for fname, vol_name, theme_name, pub_id, p_title in pt_rows:
+        entry = pt_files.setdefault(fname, (vol_name or "", theme_name or "", []))
+        entry[2].append((pub_id, p_title or ""))
+
     files_checked = 0
     pubs_checked = 0
     pubs_found = 0
     pubs_missing = 0
     
     files_with_missing_content = []
+    theme_index = {}
 
-    for pt_file in pt_files:
+    for fname, (vol_name_file, theme_name_file, file_pubs) in pt_files.items():
         files_checked += 1
-        with open(pt_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
         
         # Tentar extrair metadados do arquivo ou do nome (caso o arquivo tenha sido salvo sem no etapa anterior, mas o merge corrigiu)
         # O arquivo no bkp é o original input, então ele pode NÃO ter o metadata se não foi salvo com ele.
@@ -100,16 +76,11 @@ def verify():
         # Ou podemos buscar apenas pelo publication_title em todo o main_index (relaxando a busca globalmente ou por tema)?
         
         # Vamos tentar ser estritos primeiro usando o metadata DO ARQUIVO se existir.
-        fname = os.path.basename(pt_file)
-        
         # Parse filename para ter o "Theme" esperado caso o JSON não tenha
         # Ex: 01_1.Volume_03_Theme_parte01_pt.json
         # volume -> 1.Volume
         # theme -> Theme
         
-        vol_name_file = data.get("volume", "")
-        theme_name_file = data.get("theme_name", "")
-        
         # Fallback de nome se vazio (simulando o que o merge fez)
         if not vol_name_file or not theme_name_file:
              parts = fname.replace("_pt.json", "").split('_')
@@ -123,11 +94,24 @@ def verify():
         theme_name_file = normalize(theme_name_file)
 
         pt_pubs_set = set()
-        for pub_entry in data.get("publications", []):
-            p_title = normalize(pub_entry.get("publication_title", ""))
+        for pub_id, p_title in file_pubs:
+            # Publicações com id estável (scripts/node_ids.py) dispensam a busca por título
+            if pub_id and store.publication("main", pub_id) is not None:
+                pubs_checked += 1
+                pubs_found += 1
+                continue
+            p_title = normalize(p_title)
             if p_title:
                 pt_pubs_set.add(p_title)
 
+        # Publicações do tema no main JSON, por título (consulta indexada por tema)
+        if theme_name_file not in theme_index:
+            theme_pubs = {}
+            for (v_name, p_title), pub_id in store.theme_publications("main", theme_name_file).items():
+                theme_pubs.setdefault(normalize(p_title), (normalize(v_name), pub_id))
+            theme_index[theme_name_file] = theme_pubs
+        theme_pubs = theme_index[theme_name_file]
+
         # Normalização de título para comparação
         # Remover data entre parênteses largos ou normais
         # Ex: 'Title （昭和24年）' -> 'Title'
@@ -145,30 +129,26 @@ def verify():
             matched_pub = None
             
             # 1. Match exato
-            key = (vol_name_file, theme_name_file, p_title)
-            if key in main_index:
+            if p_title in theme_pubs and theme_pubs[p_title][0] == vol_name_file:
                 found = True
-                matched_pub = main_index[key][0]
+                matched_pub = store.publication("main", theme_pubs[p_title][1])
             else:
                 # 2. Match Fuzzy (Ignorando datas e parênteses)
-                # Filtrar candidatos pelo tema
-                candidates = [k for k in main_index if k[1] == theme_name_file]
-                
-                for k in candidates:
-                    orig_title = k[2]
+                # Candidatos: publicações do mesmo tema
+                for orig_title, (_, candidate_id) in theme_pubs.items():
                     norm_orig = normalize_title(orig_title)
                     
                     # Comparação normalizada exata
                     if norm_p_title and norm_p_title == norm_orig:
                         found = True
-                        matched_pub = main_index[k][0]
+                        matched_pub = store.publication("main", candidate_id)
                         break
                     
                     # Comparação substring (fallback)
                     # Apenas se string tiver tamanho razoável para evitar falso positivo
                     if len(norm_p_title) > 4 and (norm_p_title in norm_orig or norm_orig in norm_p_title):
                         found = True
-                        matched_pub = main_index[k][0]
+                        matched_pub = store.publication("main", candidate_id)
                         break
 
             if found:
@@ -201,5 +181,7 @@ def verify():
     else:
          print(f"⚠️  Integração Bilíngue Incompleta:\n    - {missing_jp_in_main} sem Japonês\n    - {missing_pt_in_main} sem Português")
 
+    store.close()
+
 if __name__ == "__main__":
     verify()
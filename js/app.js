@@ -10,17 +10,44 @@ let currentLanguage = localStorage.getItem('appLanguage') || 'pt'; // 'pt' or 'j
 let currentTitleData = null;
 let searchTimeout = null;
 let filterTranslatedOnly = false;
+// Sharded site data (scripts/site_shards.py): the manifest has no bodies,
+// each theme's content is fetched the first time one of its titles opens
+let contentSharded = false;
+const loadedShards = new Map();
+// Release artifacts (scripts/publish_artifacts.py): logical site file -> content-hashed file
+let siteAssets = {};
+// Inverted index (scripts/search_index.py), loaded on the first search
+let searchIndexMeta = null;
+let searchDocuments = null;
+let searchContexts = null;
+const loadedTermShards = new Map();
 
 // ============================================
 // DATA LOADING
 // ============================================
+// URL of a site file, through its content-hashed release copy when one was published
+function siteUrl(name) {
+    return `data/site/${siteAssets[name] || name}`;
+}
+
 async function loadData() {
     try {
-        const response = await fetch('data/shin_college_data.json');
-        data = await response.json();
-
-
+        // Never cached: it names the current hashed files, which can be cached forever
+        const assetsResponse = await fetch('data/site/assets.json', { cache: 'no-cache' });
+        if (assetsResponse.ok) {
+            siteAssets = (await assetsResponse.json()).files || {};
+        }
 
+        const manifestResponse = await fetch(siteUrl('manifest.json'));
+        if (manifestResponse.ok) {
+            const manifest = await manifestResponse.json();
+            data = manifest.volumes;
+            contentSharded = true;
+        } else {
+            // No sharded data published: fall back to the full JSON
+            const response = await fetch('data/shin_college_data.json');
+            data = await response.json();
+        }
 
         initializeApp();
     } catch (error) {
@@ -35,6 +62,67 @@ async function loadData() {
     }
 }
 
+// Fetches (once) the content shard of a theme and fills its publications in place
+function loadThemeContent(theme) {
+    if (!contentSharded || !theme.shard) return Promise.resolve();
+    if (!loadedShards.has(theme.shard)) {
+        const request = fetch(siteUrl(theme.shard))
+            .then(response => {
+                if (!response.ok) throw new Error(`${theme.shard}: HTTP ${response.status}`);
+                return response.json();
+            })
+            .then(shard => {
+                theme.titles.forEach(title => {
+                    title.publications.forEach(pub => {
+                        Object.assign(pub, shard.publications[pub.id] || {});
+                    });
+                });
+            })
+            .catch(error => {
+                loadedShards.delete(theme.shard);
+                throw error;
+            });
+        loadedShards.set(theme.shard, request);
+    }
+    return loadedShards.get(theme.shard);
+}
+
+// Loads the shards of the themes holding the given publications
+function loadContentFor(publications) {
+    if (!contentSharded) return Promise.resolve();
+    const ids = new Set(publications.map(pub => pub.id));
+    const themes = [];
+    data.forEach(volume => volume.themes.forEach(theme => {
+        if (theme.titles.some(title => title.publications.some(pub => ids.has(pub.id)))) {
+            themes.push(theme);
+        }
+    }));
+    return Promise.all(themes.map(loadThemeContent));
+}
+
+function loadAllContent() {
+    if (!contentSharded) return Promise.resolve();
+    return Promise.all(data.flatMap(volume => volume.themes.map(loadThemeContent)));
+}
+
+// Content flags work before the shard is loaded: the manifest carries has_jp / has_pt
+function hasJPContent(pub) {
+    return contentSharded ? !!pub.has_jp : !!(pub.content && pub.content.trim());
+}
+
+function hasPTContent(pub) {
+    return contentSharded ? !!pub.has_pt : !!(pub.content_ptbr && pub.content_ptbr.trim());
+}
+
+// Key of the unique-article count: the text itself, or its id in the manifest
+// (repeated texts carry the id of the first publication holding them)
+function getContentKey(pub) {
+    const hasJP = hasJPContent(pub);
+    if (!hasJP && !hasPTContent(pub)) return null;
+    if (contentSharded) return pub.content_key || pub.id;
+    return hasJP ? pub.content.trim() : pub.content_ptbr.trim();
+}
+
 // ============================================
 // INITIALIZATION
 // ============================================
@@ -260,14 +348,9 @@ function updateStatistics(contextData = null) {
         titlesList.forEach(title => {
             title.publications.forEach(pub => {
                 // Count publications with content in either language
-                const hasJP = pub.content && pub.content.trim();
-                const hasPT = pub.content_ptbr && pub.content_ptbr.trim();
-
-                if (hasJP || hasPT) {
-                    // Use JP content as unique key if available, otherwise PT
-                    const contentKey = hasJP ? pub.content.trim() : pub.content_ptbr.trim();
-                    uniqueContent.add(contentKey);
-                }
+                // (JP content as unique key if available, otherwise PT)
+                const contentKey = getContentKey(pub);
+                if (contentKey) uniqueContent.add(contentKey);
             });
         });
     };
@@ -293,13 +376,8 @@ function updateStatistics(contextData = null) {
                 stats.titles++;
                 result.title.publications.forEach(pub => {
                     // Count publications with content in either language
-                    const hasJP = pub.content && pub.content.trim();
-                    const hasPT = pub.content_ptbr && pub.content_ptbr.trim();
-
-                    if (hasJP || hasPT) {
-                        const contentKey = hasJP ? pub.content.trim() : pub.content_ptbr.trim();
-                        uniqueContent.add(contentKey);
-                    }
+                    const contentKey = getContentKey(pub);
+                    if (contentKey) uniqueContent.add(contentKey);
                 });
             });
 
@@ -357,12 +435,167 @@ function handleSearch(e) {
     }
 
     // Aguarda 500ms após o usuário parar de digitar
-    searchTimeout = setTimeout(() => {
-        const results = searchContent(searchTerm);
+    searchTimeout = setTimeout(async () => {
+        const query = searchTerm;
+        let results = null;
+        try {
+            results = await searchIndexed(query);
+        } catch (error) {
+            console.error('Error using the search index:', error);
+        }
+        if (results === null) {
+            // No index published: scan the bodies (fetching every shard first if sharded)
+            try {
+                await loadAllContent();
+            } catch (error) {
+                console.error('Error loading content:', error);
+            }
+            results = searchContent(query);
+        }
+        // A newer search started while this one was loading
+        if (query !== searchTerm) return;
         displaySearchResults(results);
     }, 500);
 }
 
+// Same folding and terms as scripts/search_index.py: Latin words without
+// accents, Japanese runs as character bigrams (a lone character as itself)
+const SEARCH_TOKEN_PATTERN = /[a-z0-9]+|[ぁ-ゖァ-ヺー々〆ヶ㐀-䶿一-鿿豈-﫿]+/g;
+
+function foldSearchText(text) {
+    return text.normalize('NFKD').replace(/[\u0300-\u036f]/g, '').normalize('NFC').toLowerCase();
+}
+
+function searchShardKey(term) {
+    const first = term[0];
+    const code = first.charCodeAt(0);
+    if (code < 128) return first;
+    if (code >= 0x3040 && code <= 0x30ff) return 'k' + code.toString(16).padStart(4, '0');
+    return 'u' + (code >> 7).toString(16).padStart(3, '0');
+}
+
+// Query parts of a keyword: {term, prefix}. Every Latin word matches the
+// indexed words it starts (no mid-word matches), a lone Japanese character
+// the terms it starts; longer Japanese runs give their bigrams.
+function searchQueryTerms(keyword) {
+    const terms = [];
+    for (const match of foldSearchText(keyword).matchAll(SEARCH_TOKEN_PATTERN)) {
+        const token = match[0];
+        if (/^[a-z0-9]/.test(token) || token.length === 1) {
+            terms.push({ term: token, prefix: true });
+        } else {
+            for (let i = 0; i < token.length - 1; i++) {
+                terms.push({ term: token.slice(i, i + 2), prefix: false });
+            }
+        }
+    }
+    return terms;
+}
+
+// Japanese runs of a keyword longer than one character: their bigrams only
+// say the characters are there, the candidates are checked for the run
+function searchRuns(keyword) {
+    return [...foldSearchText(keyword).matchAll(SEARCH_TOKEN_PATTERN)]
+        .map(match => match[0])
+        .filter(token => !/^[a-z0-9]/.test(token) && token.length > 1);
+}
+
+// Folded text of a document, as indexed by scripts/search_index.py
+function searchDocumentText(doc) {
+    const pub = searchDocuments[doc].publication;
+    const fields = [pub.publication_title, pub.publication_title_ptbr, pub.content, pub.content_ptbr];
+    return foldSearchText([searchContexts[doc], ...fields.map(field => field || '')].join(' '));
+}
+
+function loadTermShard(key) {
+    if (!searchIndexMeta.shards[key]) return Promise.resolve({});
+    if (!loadedTermShards.has(key)) {
+        const request = fetch(siteUrl(`search/${key}.json`))
+            .then(response => {
+                if (!response.ok) throw new Error(`search/${key}.json: HTTP ${response.status}`);
+                return response.json();
+            })
+            .catch(error => {
+                loadedTermShards.delete(key);
+                throw error;
+            });
+        loadedTermShards.set(key, request);
+    }
+    return loadedTermShards.get(key);
+}
+
+function decodePostings(deltas) {
+    const docs = new Array(deltas.length);
+    let total = 0;
+    for (let i = 0; i < deltas.length; i++) {
+        total += deltas[i];
+        docs[i] = total;
+    }
+    return docs;
+}
+
+async function postingsFor({ term, prefix }) {
+    const shard = await loadTermShard(searchShardKey(term));
+    if (!prefix) return new Set(shard[term] ? decodePostings(shard[term]) : []);
+    const docs = new Set();
+    for (const key in shard) {
+        if (key.startsWith(term)) decodePostings(shard[key]).forEach(doc => docs.add(doc));
+    }
+    return docs;
+}
+
+// Returns the results of term from the inverted index, or null when no index was published
+async function searchIndexed(term) {
+    if (!contentSharded) return null;
+    if (!searchIndexMeta) {
+        const response = await fetch(siteUrl('search/meta.json'));
+        if (!response.ok) return null;
+        searchIndexMeta = await response.json();
+    }
+    if (!searchDocuments) {
+        // Documents are numbered in manifest order, as in scripts/search_index.py
+        searchDocuments = [];
+        searchContexts = [];
+        data.forEach(volume => volume.themes.forEach(theme => theme.titles.forEach(title => {
+            const context = [volume.volume, volume.volume_ptbr, theme.theme, theme.theme_ptbr, title.title, title.title_ptbr]
+                .map(text => text || '').join(' ');
+            title.publications.forEach((pub, index) => {
+                searchDocuments.push({ volume: volume.volume, theme: theme.theme, title, publication: pub, pubIndex: index });
+                searchContexts.push(context);
+            });
+        })));
+        if (searchDocuments.length !== searchIndexMeta.documents) {
+            console.warn('Search index does not match the manifest; falling back to a full scan.');
+            return null;
+        }
+    }
+
+    const keywords = term.split(/\s+/).filter(k => k.length > 0);
+    const queryTerms = keywords.flatMap(searchQueryTerms);
+    if (queryTerms.length === 0) return [];
+
+    // Intersect the posting lists, smallest first
+    const postings = await Promise.all(queryTerms.map(postingsFor));
+    postings.sort((a, b) => a.size - b.size);
+    let docs = [...postings[0]];
+    for (const other of postings.slice(1)) {
+        docs = docs.filter(doc => other.has(doc));
+    }
+    docs.sort((a, b) => a - b);
+
+    // Check the candidates for the adjacent characters, as scripts/query_engine.py does for phrases
+    const runs = keywords.flatMap(searchRuns);
+    if (runs.length > 0 && docs.length > 0) {
+        await loadContentFor(docs.map(doc => searchDocuments[doc].publication));
+        docs = docs.filter(doc => {
+            const text = searchDocumentText(doc);
+            return runs.every(run => text.includes(run));
+        });
+    }
+
+    return docs.map(doc => ({ ...searchDocuments[doc], matchType: 'publication' }));
+}
+
 function searchContent(term) {
     const results = [];
     const lowerTerm = term.toLowerCase();
@@ -712,13 +945,13 @@ function openContentFromPath(volIdx, themeIdx, titleIdx) {
 // Strict check: Title is considered translated ONLY if ALL publications have translated content
 function isFullyTranslated(title) {
     if (!title.publications || title.publications.length === 0) return false;
-    return title.publications.every(pub => pub.content_ptbr && pub.content_ptbr.trim().length > 0);
+    return title.publications.every(hasPTContent);
 }
 
 // Loose check: Returns true if AT LEAST ONE publication has translated content
 function hasAnyTranslation(title) {
     if (!title.publications || title.publications.length === 0) return false;
-    return title.publications.some(pub => pub.content_ptbr && pub.content_ptbr.trim().length > 0);
+    return title.publications.some(hasPTContent);
 }
 
 // Helper to get the best display title (PT fallback to JP)
@@ -755,7 +988,7 @@ function hasThemeTranslation(theme) {
         if (title.title_ptbr && title.title_ptbr !== title.title) return true;
 
         // Publications have content_ptbr?
-        return title.publications.some(pub => pub.content_ptbr && pub.content_ptbr.trim().length > 0);
+        return title.publications.some(hasPTContent);
     });
 }
 
@@ -1096,14 +1329,22 @@ function openContentByIndex(index) {
 // ============================================
 // MODAL CONTENT
 // ============================================
-function showContent(title, isInitialLoad = true, scrollToId = null) {
+async function showContent(title, isInitialLoad = true, scrollToId = null) {
+    try {
+        await loadContentFor(title.publications);
+    } catch (error) {
+        console.error('Error loading content:', error);
+    }
+    renderContent(title, isInitialLoad, scrollToId);
+}
+
+function renderContent(title, isInitialLoad = true, scrollToId = null) {
     const modal = document.getElementById('contentModal');
     // First, filter out empty content (must have valid content in at least one language)
-    const basePubs = title.publications
-        .filter(pub => (pub.content && pub.content.trim()) || (pub.content_ptbr && pub.content_ptbr.trim()));
+    const basePubs = title.publications.filter(pub => hasJPContent(pub) || hasPTContent(pub));
 
     // Check availability
-    const hasTranslation = basePubs.some(pub => pub.content_ptbr && pub.content_ptbr.trim());
+    const hasTranslation = basePubs.some(hasPTContent);
 
     const showPT = currentLanguage === 'pt';
 
@@ -0,0 +1,62 @@
+"""
+Asyncio driver for the translation scripts.
+
+Translation is network I/O, so coroutines replace the thread pools: one
+event loop keeps hundreds of requests in flight, a semaphore bounds them,
+every task gets its own timeout, and results are consumed as they complete
+(no polling). Leaving the loop early (error, Ctrl+C) cancels what is still
+pending.
+
+    async for index, result, error in as_completed_bounded(factories, 64, timeout=300):
+        ...
+
+`factories` are zero-argument callables returning a coroutine, so nothing
+starts before a slot is free. Any client with generate_content_async works
+(genai.GenerativeModel, fake_gemini.FakeGeminiModel, AsyncRateController.wrap).
+"""
+
+import asyncio
+
+DEFAULT_CONCURRENCY = 64
+DEFAULT_TIMEOUT = 600
+
+
+async def as_completed_bounded(factories, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT):
+    """
+    Runs the coroutines with at most `concurrency` at a time and yields
+    (index, result, error) in completion order. A task that fails or times
+    out yields its exception as `error` instead of stopping the others.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(index, factory):
+        async with semaphore:
+            try:
+                if timeout:
+                    result = await asyncio.wait_for(factory(), timeout)
+                else:
+                    result = await factory()
+                return index, result, None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                return index, None, e
+
+    tasks = [asyncio.ensure_future(run(i, factory)) for i, factory in enumerate(factories)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        pending = [task for task in tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def gather_bounded(factories, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT):
+    """List of (result, error) in input order."""
+    results = [None] * len(factories)
+    async for index, result, error in as_completed_bounded(factories, concurrency, timeout):
+        results[index] = (result, error)
+    return results
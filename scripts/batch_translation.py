@@ -0,0 +1,140 @@
+"""
+Packs many short fields into a single Gemini request.
+
+Each batch is sent as a JSON list of {"id", "type", "text"} and the model
+answers with a JSON array of {"id", "translation"}. Answers are validated
+against the ids that were sent; anything missing, duplicated or malformed
+is returned as a miss so the caller can translate it on its own.
+"""
+
+import json
+import re
+
+from glossary import SOURCES, THEMES
+
+# Rough input size of a field; Japanese text is about one token per character
+PROMPT_OVERHEAD_TOKENS = 400
+ITEM_OVERHEAD_TOKENS = 15
+
+DEFAULT_BATCH_TOKENS = 6000
+DEFAULT_BATCH_ITEMS = 60
+
+# Short version of the per-field rules of translate_full_json.build_prompt
+FIELD_RULES = {
+    "volume": "Nome do volume. Traduza.",
+    "theme": f"Tema. '御神体とお光' DEVE ser '{THEMES['御神体とお光']}'.",
+    "title": "Título do grupo. '御神体' DEVE ser 'Imagem Sagrada'.",
+    "publication_title": "Título do artigo. Formato: Título em Português (Título Original em kanji/kana). Ex: A Atividade da Luz (光の活動)",
+    "source": f"Nome da publicação. NÃO traduza, transcreva para Romaji. Ex: '地上天国' -> 'Tijou Tengoku'. '明主様御教え' DEVE ser '{SOURCES['明主様御教え']}'.",
+    "date": "Data japonesa no formato 'Dia de Mês de Ano'. Ex: '昭和10年5月21日' -> '21 de maio de 1935'. Se não for uma data clara, traduza normalmente.",
+    "content": "Ensinamento. PT-BR culto e fluido, fiel ao conteúdo. Mantenha 'Kannon' (観音) e nomes próprios.",
+    "generic": "Traduza o termo/frase.",
+}
+
+BATCH_TEMPLATE = """
+{base}
+**Tarefa:** Traduza cada item da lista abaixo seguindo a regra do seu tipo.
+
+Regras por tipo:
+{rules}
+
+Responda APENAS com um array JSON, um objeto por item, no formato:
+[{{"id": "1", "translation": "..."}}]
+Use exatamente os mesmos ids, não omita nem junte itens.
+
+Itens:
+{items}
+"""
+
+CODE_FENCE_PATTERN = re.compile(r'^```(?:json)?\s*|\s*```$')
+
+
+def estimate_tokens(text):
+    return len(text) + ITEM_OVERHEAD_TOKENS
+
+
+def pack_batches(entries, max_tokens=DEFAULT_BATCH_TOKENS, max_items=DEFAULT_BATCH_ITEMS):
+    """
+    Groups entries (dicts with 'text') into batches that stay under max_tokens
+    and max_items. An entry larger than the budget gets a batch of its own.
+    """
+    batches = []
+    current = []
+    current_tokens = PROMPT_OVERHEAD_TOKENS
+
+    for entry in entries:
+        tokens = estimate_tokens(entry["text"])
+        if current and (current_tokens + tokens > max_tokens or len(current) >= max_items):
+            batches.append(current)
+            current = []
+            current_tokens = PROMPT_OVERHEAD_TOKENS
+        current.append(entry)
+        current_tokens += tokens
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+def rules_for(field_types):
+    return "\n".join(
+        f"- {field_type}: {FIELD_RULES.get(field_type, FIELD_RULES['generic'])}"
+        for field_type in sorted(set(field_types))
+    )
+
+
+def build_batch_prompt(entries, base_instruction):
+    """Prompt for a batch; entry ids are their position ('1', '2', ...)."""
+    items = [
+        {"id": str(i), "type": entry["field_type"], "text": entry["text"]}
+        for i, entry in enumerate(entries, 1)
+    ]
+    return BATCH_TEMPLATE.format(
+        base=base_instruction.strip(),
+        rules=rules_for(entry["field_type"] for entry in entries),
+        items=json.dumps(items, ensure_ascii=False, indent=1),
+    )
+
+
+def batch_prompt_version_text(field_type, base_instruction):
+    """Template text identifying batch translations of field_type in the cache."""
+    return BATCH_TEMPLATE.format(base=base_instruction.strip(), rules=rules_for([field_type]), items="")
+
+
+def parse_batch_response(text, count):
+    """
+    Returns {index: translation} for the valid answers of a batch of `count`
+    entries (0-based indexes). Unknown, duplicated or empty ids are dropped.
+    """
+    if not text:
+        return {}
+    text = CODE_FENCE_PATTERN.sub('', text.strip())
+    try:
+        answers = json.loads(text)
+    except ValueError:
+        return {}
+    if isinstance(answers, dict):
+        answers = answers.get("items") or answers.get("translations") or []
+    if not isinstance(answers, list):
+        return {}
+
+    results = {}
+    duplicated = set()
+    for answer in answers:
+        if not isinstance(answer, dict):
+            continue
+        translation = answer.get("translation")
+        try:
+            index = int(str(answer.get("id")).strip()) - 1
+        except ValueError:
+            continue
+        if not 0 <= index < count or not isinstance(translation, str) or not translation.strip():
+            continue
+        if index in results:
+            duplicated.add(index)
+            continue
+        results[index] = translation.strip()
+
+    for index in duplicated:
+        results.pop(index, None)
+    return results
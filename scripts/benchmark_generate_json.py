@@ -0,0 +1,53 @@
+import os
+import time
+import argparse
+
+import generate_json
+
+# Configuration
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MARKDOWN_DIR = os.path.join(PROJECT_ROOT, "Markdown")
+
+def time_parse(file_entries, jobs, repeat):
+    """Returns (best time in seconds, parsed result) over `repeat` runs."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = generate_json.parse_all(file_entries, jobs)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark generate_json ingestion with 1 vs N worker processes.")
+    parser.add_argument("--markdown-dir", default=MARKDOWN_DIR, help="Markdown root with the volume folders")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Number of workers to compare against 1")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    volumes = []
+    for volume_name in sorted(os.listdir(args.markdown_dir)):
+        volume_path = os.path.join(args.markdown_dir, volume_name)
+        if not os.path.isdir(volume_path) or volume_name.startswith('.') or volume_name == 'Indices':
+            continue
+        entries = generate_json.list_volume_files(volume_path)
+        volumes.append((volume_name, [(e[2], e[3]) for e in entries]))
+
+    all_entries = [entry for _, entries in volumes for entry in entries]
+    volumes.append(("TOTAL", all_entries))
+
+    print(f"\n{'Volume':<40} | {'Files':>5} | {'jobs=1':>8} | {f'jobs={args.jobs}':>8} | {'Speedup':>7} | Same")
+    print("-" * 90)
+
+    for volume_name, entries in volumes:
+        size_mb = sum(os.path.getsize(path) for path, _ in entries) / (1024 * 1024)
+        t_single, r_single = time_parse(entries, 1, args.repeat)
+        t_multi, r_multi = time_parse(entries, args.jobs, args.repeat)
+        speedup = t_single / t_multi if t_multi else 0
+        label = f"{volume_name} ({size_mb:.1f} MB)"
+        print(f"{label:<40} | {len(entries):>5} | {t_single:>7.2f}s | {t_multi:>7.2f}s | {speedup:>6.2f}x | {r_single == r_multi}")
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,35 @@
-import json
+from corpus_store import CorpusStore
 
 def main():
-    with open('data/shin_college_data.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    store = CorpusStore()
+    store.sync_json('data/shin_college_data.json', 'main')
 
-    # Looking for Volume 2 (index 1?) data[1]
+    # Looking for Volume 2 (position 1)
     # Theme "自然農法" (Nature Farming)
     
     target_vol_idx = 1 # Volume 2
     
-    if len(data) <= target_vol_idx:
+    themes = store.find_themes('main', "自然農法", volume_position=target_vol_idx)
+    volumes = store.conn.execute("SELECT name FROM volumes WHERE dataset = 'main' AND position = ?",
+                                 (target_vol_idx,)).fetchone()
+    if volumes is None:
         print("Volume 2 not found")
         return
 
-    volume = data[target_vol_idx]
-    print(f"Volume: {volume.get('volume')}")
+    print(f"Volume: {volumes[0]}")
 
-    for theme in volume.get('themes', []):
-        if "自然農法" in theme.get('theme', ''):
-            print(f"Theme: {theme.get('theme')} / {theme.get('theme_ptbr')}")
-            for title in theme.get('titles', []):
-                pubs = title.get('publications', [])
-                if not pubs: continue
-                
-                translated_count = 0
-                for pub in pubs:
-                    content = pub.get('content_ptbr', '')
-                    if content and len(content.strip()) > 0:
-                        translated_count += 1
-                
-                is_fully_translated = (translated_count == len(pubs))
-                print(f"  Title: {title.get('title')} / {title.get('title_ptbr')}")
-                print(f"    Total Pubs: {len(pubs)}, Translated: {translated_count}")
-                print(f"    Strict Check Pass: {is_fully_translated}")
-                if not is_fully_translated and translated_count > 0:
-                     print("    -> PARTIALLY TRANSLATED")
-                print("-")
+    for _, theme in themes:
+        print(f"Theme: {theme.get('theme')} / {theme.get('theme_ptbr')}")
+        for title, total, translated_count in store.title_summary('main', theme['id']):
+            if not total: continue
+            
+            is_fully_translated = (translated_count == total)
+            print(f"  Title: {title.get('title')} / {title.get('title_ptbr')}")
+            print(f"    Total Pubs: {total}, Translated: {translated_count}")
+            print(f"    Strict Check Pass: {is_fully_translated}")
+            if not is_fully_translated and translated_count > 0:
+                 print("    -> PARTIALLY TRANSLATED")
+            print("-")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,435 @@
+"""
+Indexed corpus store (SQLite) for the JSON layouts of the pipeline.
+
+The tree of shin_college_data.json / shin_college_data_translated.json /
+the merged outputs is stored as volumes, themes, titles and publications
+rows, keyed by the stable IDs of node_ids.py, under a dataset name
+("main", "translated", ...). The part files of temasSeparados/partes and
+bkp are listed in part_files / part_publications. Each node keeps its
+JSON (without children) so export_json gives back the same document.
+
+Imports are skipped when the file did not change (mtime and size), so the
+check scripts only pay for a re-import after the JSON is rebuilt:
+
+    store = CorpusStore()
+    store.sync_json("data/shin_college_data.json", "main")
+    total, translated, missing = store.translation_counts("main")
+
+    python3 scripts/corpus_store.py import --json data/shin_college_data.json --dataset main
+    python3 scripts/corpus_store.py import --parts data/temasSeparados/partes data/temasSeparados/bkp
+    python3 scripts/corpus_store.py export --dataset main --output /tmp/shin_college_data.json
+    python3 scripts/corpus_store.py stats
+"""
+
+import os
+import glob
+import json
+import time
+import sqlite3
+import argparse
+
+from node_ids import fill_theme_ids, volume_id, with_id
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_STORE_PATH = os.path.join(PROJECT_ROOT, "data", "corpus.sqlite")
+
+# Child list of each level; kept as null in the stored JSON to preserve key order
+CHILD_KEYS = {"volume": "themes", "theme": "titles", "title": "publications"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    name TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    imported_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS volumes (
+    dataset TEXT NOT NULL,
+    id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (dataset, id)
+);
+CREATE TABLE IF NOT EXISTS themes (
+    dataset TEXT NOT NULL,
+    id TEXT NOT NULL,
+    volume_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (dataset, id)
+);
+CREATE TABLE IF NOT EXISTS titles (
+    dataset TEXT NOT NULL,
+    id TEXT NOT NULL,
+    theme_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (dataset, id)
+);
+CREATE TABLE IF NOT EXISTS publications (
+    dataset TEXT NOT NULL,
+    id TEXT NOT NULL,
+    title_id TEXT NOT NULL,
+    theme_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    pub_idx INTEGER NOT NULL,
+    publication_title TEXT NOT NULL,
+    has_translation INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (dataset, id)
+);
+CREATE TABLE IF NOT EXISTS part_files (
+    path TEXT PRIMARY KEY,
+    basename TEXT NOT NULL,
+    directory TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    original_basename TEXT NOT NULL,
+    volume TEXT,
+    theme_id TEXT,
+    theme_name TEXT,
+    part INTEGER,
+    total_parts INTEGER,
+    publications INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS part_publications (
+    path TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    id TEXT,
+    title TEXT,
+    publication_title TEXT,
+    pub_idx INTEGER,
+    has_translation INTEGER NOT NULL,
+    PRIMARY KEY (path, position)
+);
+CREATE INDEX IF NOT EXISTS themes_by_name ON themes (dataset, name);
+CREATE INDEX IF NOT EXISTS titles_by_theme ON titles (dataset, theme_id, position);
+CREATE INDEX IF NOT EXISTS titles_by_title ON titles (dataset, title);
+CREATE INDEX IF NOT EXISTS publications_by_title ON publications (dataset, title_id, position);
+CREATE INDEX IF NOT EXISTS publications_by_theme ON publications (dataset, theme_id, publication_title);
+CREATE INDEX IF NOT EXISTS publications_by_pub_idx ON publications (dataset, pub_idx);
+CREATE INDEX IF NOT EXISTS publications_by_status ON publications (dataset, has_translation);
+CREATE INDEX IF NOT EXISTS part_files_by_basename ON part_files (basename, kind);
+CREATE INDEX IF NOT EXISTS part_publications_by_id ON part_publications (id);
+"""
+
+
+def node_json(node, level):
+    child_key = CHILD_KEYS.get(level)
+    return json.dumps({k: (None if k == child_key else v) for k, v in node.items()}, ensure_ascii=False)
+
+
+def is_translated(pub):
+    return bool(pub.get("has_translation") or pub.get("content_ptbr"))
+
+
+def part_kind(basename):
+    """('original' | 'pt' | 'copy' | 'merged', basename of the original part)."""
+    if basename.endswith("_pt.json"):
+        return "pt", basename[:-len("_pt.json")] + ".json"
+    if basename.endswith(" copy.json"):
+        return "copy", basename[:-len(" copy.json")] + ".json"
+    if basename.endswith("_merged.json"):
+        return "merged", basename
+    return "original", basename
+
+
+class CorpusStore:
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    # --- Import / export of the main JSON layout ---
+
+    def _unchanged(self, name, path):
+        stat = os.stat(path)
+        row = self.conn.execute("SELECT mtime, size FROM sources WHERE name = ?", (name,)).fetchone()
+        return row is not None and row[0] == stat.st_mtime and row[1] == stat.st_size
+
+    def _mark_source(self, name, path):
+        stat = os.stat(path)
+        self.conn.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?)",
+                          (name, os.path.abspath(path), stat.st_mtime, stat.st_size, time.time()))
+
+    def sync_json(self, path, dataset):
+        """Imports path as dataset unless it is unchanged since the last import. Returns True if imported."""
+        if self._unchanged(f"json:{dataset}", path):
+            return False
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        with self.conn:
+            self.import_data(data, dataset)
+            self._mark_source(f"json:{dataset}", path)
+        return True
+
+    def import_data(self, data, dataset):
+        """Replaces dataset with the volumes of data (shin_college_data layout)."""
+        for table in ("volumes", "themes", "titles", "publications"):
+            self.conn.execute(f"DELETE FROM {table} WHERE dataset = ?", (dataset,))
+
+        volumes, themes, titles, publications = [], [], [], []
+        for v_pos, volume in enumerate(data):
+            volume_name = volume.get("volume", "")
+            v_id = volume.get("id") or volume_id(volume_name)
+            if not volume.get("id"):
+                volume = with_id(volume, v_id)
+            volumes.append((dataset, v_id, v_pos, volume_name, node_json(volume, "volume")))
+
+            for t_pos, theme in enumerate(volume.get("themes", [])):
+                theme = fill_theme_ids(volume_name, theme)
+                themes.append((dataset, theme["id"], v_id, t_pos, theme.get("theme") or "",
+                               node_json(theme, "theme")))
+
+                for ti_pos, title in enumerate(theme.get("titles", [])):
+                    titles.append((dataset, title["id"], theme["id"], ti_pos, title.get("title") or "",
+                                   node_json(title, "title")))
+
+                    for p_pos, pub in enumerate(title.get("publications", [])):
+                        publications.append((
+                            dataset, pub["id"], title["id"], theme["id"], p_pos, pub.get("pub_idx", p_pos),
+                            pub.get("publication_title") or "", int(is_translated(pub)), node_json(pub, "publication")
+                        ))
+
+        self.conn.executemany("INSERT OR REPLACE INTO volumes VALUES (?, ?, ?, ?, ?)", volumes)
+        self.conn.executemany("INSERT OR REPLACE INTO themes VALUES (?, ?, ?, ?, ?, ?)", themes)
+        self.conn.executemany("INSERT OR REPLACE INTO titles VALUES (?, ?, ?, ?, ?, ?)", titles)
+        self.conn.executemany("INSERT OR REPLACE INTO publications VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", publications)
+        return len(publications)
+
+    def _children(self, table, parent_column, dataset):
+        children = {}
+        for parent, data in self.conn.execute(
+                f"SELECT {parent_column}, data FROM {table} WHERE dataset = ? ORDER BY {parent_column}, position",
+                (dataset,)):
+            children.setdefault(parent, []).append(json.loads(data))
+        return children
+
+    def export_data(self, dataset):
+        """Rebuilds the shin_college_data list of dataset."""
+        publications = self._children("publications", "title_id", dataset)
+        titles = self._children("titles", "theme_id", dataset)
+        themes = self._children("themes", "volume_id", dataset)
+
+        data = []
+        for (v_id, v_data) in self.conn.execute(
+                "SELECT id, data FROM volumes WHERE dataset = ? ORDER BY position", (dataset,)):
+            volume = json.loads(v_data)
+            volume["themes"] = themes.get(volume.get("id", v_id), [])
+            for theme in volume["themes"]:
+                theme["titles"] = titles.get(theme["id"], [])
+                for title in theme["titles"]:
+                    title["publications"] = publications.get(title["id"], [])
+            data.append(volume)
+        return data
+
+    def export_json(self, dataset, path):
+        data = self.export_data(dataset)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        return data
+
+    # --- Part files (temasSeparados/partes, bkp) ---
+
+    def sync_parts(self, directories):
+        """
+        Lists the *.json of directories in part_files/part_publications,
+        reading only files that are new or changed. Returns the number read.
+        """
+        known = {path: (mtime, size) for path, mtime, size in self.conn.execute(
+            "SELECT path, mtime, size FROM part_files")}
+        seen = set()
+        read = 0
+
+        with self.conn:
+            for directory in directories:
+                for path in glob.glob(os.path.join(directory, "*.json")):
+                    path = os.path.abspath(path)
+                    seen.add(path)
+                    stat = os.stat(path)
+                    if known.get(path) == (stat.st_mtime, stat.st_size):
+                        continue
+                    self._import_part(path, stat)
+                    read += 1
+
+            scanned = [os.path.abspath(d) for d in directories]
+            for path in set(known) - seen:
+                if os.path.dirname(path) in scanned:
+                    self.conn.execute("DELETE FROM part_files WHERE path = ?", (path,))
+                    self.conn.execute("DELETE FROM part_publications WHERE path = ?", (path,))
+        return read
+
+    def _import_part(self, path, stat):
+        basename = os.path.basename(path)
+        kind, original_basename = part_kind(basename)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (ValueError, OSError) as e:
+            print(f"  ⚠ {basename}: {e}")
+            data = {}
+        if not isinstance(data, dict):
+            data = {}
+        pubs = [pub for pub in data.get("publications", []) if isinstance(pub, dict)]
+
+        self.conn.execute("DELETE FROM part_publications WHERE path = ?", (path,))
+        self.conn.execute("INSERT OR REPLACE INTO part_files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+            path, basename, os.path.dirname(path), kind, original_basename,
+            data.get("volume"), data.get("theme_id"), data.get("theme_name"),
+            data.get("part"), data.get("total_parts"), len(pubs), stat.st_mtime, stat.st_size
+        ))
+        self.conn.executemany("INSERT INTO part_publications VALUES (?, ?, ?, ?, ?, ?, ?)", [
+            (path, i, pub.get("id") or None, pub.get("title"), pub.get("publication_title"),
+             pub.get("pub_idx"), int(is_translated(pub)))
+            for i, pub in enumerate(pubs)
+        ])
+
+    # --- Queries ---
+
+    def translation_counts(self, dataset):
+        """(total, with translation, without translation) publications of dataset."""
+        total, translated = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(has_translation), 0) FROM publications WHERE dataset = ?",
+            (dataset,)).fetchone()
+        return total, translated, total - translated
+
+    def content_gaps(self, dataset):
+        """(without Japanese content, without Portuguese content) publications of dataset."""
+        return self.conn.execute("""
+            SELECT COALESCE(SUM(COALESCE(json_extract(data, '$.content'), '') = ''), 0),
+                   COALESCE(SUM(COALESCE(json_extract(data, '$.content_ptbr'), '') = ''), 0)
+            FROM publications WHERE dataset = ?
+        """, (dataset,)).fetchone()
+
+    def missing_originals(self, directory):
+        """Translation parts (_pt.json, ' copy.json') of directory with no original part anywhere."""
+        return [row[0] for row in self.conn.execute("""
+            SELECT p.basename FROM part_files p
+            WHERE p.directory = ? AND p.kind IN ('pt', 'copy')
+              AND NOT EXISTS (SELECT 1 FROM part_files o
+                              WHERE o.basename = p.original_basename AND o.kind = 'original')
+            ORDER BY p.basename
+        """, (os.path.abspath(directory),))]
+
+    def theme_summary(self, dataset):
+        """(volume, theme, publications, translated) per theme, in document order."""
+        return self.conn.execute("""
+            SELECT v.name, t.name, COUNT(p.id), COALESCE(SUM(p.has_translation), 0)
+            FROM volumes v
+            JOIN themes t ON t.dataset = v.dataset AND t.volume_id = v.id
+            LEFT JOIN publications p ON p.dataset = t.dataset AND p.theme_id = t.id
+            WHERE v.dataset = ?
+            GROUP BY v.id, t.id
+            ORDER BY v.position, t.position
+        """, (dataset,)).fetchall()
+
+    def publication(self, dataset, pub_id):
+        row = self.conn.execute("SELECT data FROM publications WHERE dataset = ? AND id = ?",
+                                (dataset, pub_id)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def theme_publications(self, dataset, theme_name):
+        """{(volume, publication_title): publication id} of the theme(s) named theme_name."""
+        rows = self.conn.execute("""
+            SELECT v.name, p.publication_title, p.id FROM themes t
+            JOIN volumes v ON v.dataset = t.dataset AND v.id = t.volume_id
+            JOIN titles ti ON ti.dataset = t.dataset AND ti.theme_id = t.id
+            JOIN publications p ON p.dataset = ti.dataset AND p.title_id = ti.id
+            WHERE t.dataset = ? AND t.name = ?
+            ORDER BY v.position, t.position, ti.position, p.position
+        """, (dataset, theme_name))
+        found = {}
+        for v_name, p_title, pub_id in rows:
+            found.setdefault((v_name, p_title), pub_id)
+        return found
+
+    def find_themes(self, dataset, text, volume_position=None):
+        """[(volume name, theme node)] of the themes whose name contains text."""
+        rows = self.conn.execute("""
+            SELECT v.name, v.position, t.data FROM themes t
+            JOIN volumes v ON v.dataset = t.dataset AND v.id = t.volume_id
+            WHERE t.dataset = ? AND instr(t.name, ?) > 0
+            ORDER BY v.position, t.position
+        """, (dataset, text))
+        return [(v_name, json.loads(data)) for v_name, v_pos, data in rows
+                if volume_position is None or v_pos == volume_position]
+
+    def title_summary(self, dataset, theme_id):
+        """[(title node, publications, with non-blank content_ptbr)] of a theme, in document order."""
+        rows = self.conn.execute("""
+            SELECT ti.data, COUNT(p.id),
+                   COALESCE(SUM(trim(COALESCE(json_extract(p.data, '$.content_ptbr'), ''), char(32, 9, 10, 13, 12288)) != ''), 0)
+            FROM titles ti
+            LEFT JOIN publications p ON p.dataset = ti.dataset AND p.title_id = ti.id
+            WHERE ti.dataset = ? AND ti.theme_id = ?
+            GROUP BY ti.id
+            ORDER BY ti.position
+        """, (dataset, theme_id))
+        return [(json.loads(data), count, translated) for data, count, translated in rows]
+
+    def part_publications(self, kind, directory):
+        """
+        (basename, volume, theme_name, id, publication_title) of the parts of kind
+        in directory; files without publications give one row with id/title None.
+        """
+        return self.conn.execute("""
+            SELECT f.basename, f.volume, f.theme_name, p.id, p.publication_title
+            FROM part_files f LEFT JOIN part_publications p ON p.path = f.path
+            WHERE f.kind = ? AND f.directory = ?
+            ORDER BY f.basename, p.position
+        """, (kind, os.path.abspath(directory))).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Indexed SQLite store of the corpus JSON files.")
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH, help="SQLite store file")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    imp = sub.add_parser("import", help="Import a JSON tree and/or part directories")
+    imp.add_argument("--json", help="shin_college_data-style JSON file")
+    imp.add_argument("--dataset", default="main", help="Dataset name for --json")
+    imp.add_argument("--parts", nargs="*", default=[], help="Directories of part files")
+
+    exp = sub.add_parser("export", help="Write a dataset back as JSON")
+    exp.add_argument("--dataset", default="main")
+    exp.add_argument("--output", required=True)
+
+    stats = sub.add_parser("stats", help="Publications per theme")
+    stats.add_argument("--dataset", default="main")
+    args = parser.parse_args()
+
+    store = CorpusStore(args.store)
+    start = time.perf_counter()
+
+    if args.command == "import":
+        if args.json:
+            imported = store.sync_json(args.json, args.dataset)
+            print(f"{args.json}: {'imported' if imported else 'unchanged'} as '{args.dataset}'.")
+        if args.parts:
+            read = store.sync_parts(args.parts)
+            print(f"Part files: {read} read.")
+    elif args.command == "export":
+        data = store.export_json(args.dataset, args.output)
+        print(f"Exported '{args.dataset}' ({len(data)} volumes) to {args.output}.")
+    else:
+        for volume, theme, count, translated in store.theme_summary(args.dataset):
+            print(f"{volume} / {theme}: {count} publications, {translated} translated")
+        total, translated, missing = store.translation_counts(args.dataset)
+        print(f"Total: {total} publications, {translated} translated, {missing} without translation.")
+
+    print(f"({time.perf_counter() - start:.2f}s)")
+    store.close()
+
+if __name__ == "__main__":
+    main()
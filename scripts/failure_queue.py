@@ -0,0 +1,221 @@
+"""
+Persistent queue of the fields a translation run could not translate (SQLite).
+
+A failed request used to print an error and return None; the field was
+skipped and the only way to find the gaps was another full traversal.
+Every failure is now stored with its reason, the number of attempts and
+the time it may be tried again:
+
+    reason      429 | blocked | timeout | empty | truncated | error
+    attempts    failures so far; the field is dropped from retries after MAX_ATTEMPTS
+    next_retry  last failure + BACKOFF_BASE * 2^(attempts - 1) (capped), longer for blocked
+
+Entries are keyed by (scope, node, field): the scope is the output a run
+writes, the node a stable reference to the item (its journal path in
+translate_full_json.py, its source_file in translate_missing_articles.py).
+A successful translation removes the entry. The translation scripts take
+--retry-failed to process only the entries that are due; a normal run of
+translate_full_json.py also leaves out the fields still backing off. The
+scope is stored as an absolute path, so --scope takes a relative one.
+
+    python3 scripts/failure_queue.py                 # entries per scope / reason
+    python3 scripts/failure_queue.py --list [--scope data/...json]
+    python3 scripts/failure_queue.py --clear --scope data/...json
+"""
+
+import os
+import json
+import time
+import sqlite3
+import argparse
+import threading
+
+from translation_cache import PROJECT_ROOT
+
+DEFAULT_QUEUE_PATH = os.path.join(PROJECT_ROOT, "data", "translation_failures.sqlite")
+
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = 60.0
+BACKOFF_MAX = 6 * 3600.0
+# Blocked content rarely passes on the next try
+BLOCKED_BACKOFF = 24 * 3600.0
+
+
+class TranslationFailed(Exception):
+    """A field the model did not translate, with the queue reason."""
+
+    def __init__(self, reason, message=""):
+        super().__init__(f"{reason}: {message}" if message else reason)
+        self.reason = reason
+
+
+def classify(error):
+    """Queue reason of an exception raised while translating."""
+    if isinstance(error, TranslationFailed):
+        return error.reason
+    if isinstance(error, TimeoutError) or type(error).__name__ in ("TimeoutError", "DeadlineExceeded"):
+        return "timeout"
+    text = str(error)
+    if type(error).__name__ == "ResourceExhausted" or "429" in text:
+        return "429"
+    if "PROHIBITED_CONTENT" in text or "block_reason" in text or "SAFETY" in text:
+        return "blocked"
+    return "error"
+
+
+def backoff(reason, attempts):
+    """Seconds before a field that failed `attempts` times may be tried again."""
+    if reason == "blocked":
+        return BLOCKED_BACKOFF
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** max(attempts - 1, 0))
+
+
+class FailureQueue:
+    """
+    Failures of one scope (the output file of a run).
+
+        queue = FailureQueue(args.output)
+        queue.record(node, "content", error_or_reason, source_sha)
+        queue.resolve(node, "content")             # after a success
+        for entry in queue.due(): ...              # --retry-failed
+        queue.report()
+    """
+
+    def __init__(self, scope=None, path=DEFAULT_QUEUE_PATH):
+        self.scope = os.path.abspath(scope) if scope else None
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS failures (
+                scope TEXT NOT NULL,
+                node TEXT NOT NULL,
+                field TEXT NOT NULL,
+                source_sha TEXT,
+                reason TEXT NOT NULL,
+                message TEXT,
+                attempts INTEGER NOT NULL,
+                first_failed REAL NOT NULL,
+                last_failed REAL NOT NULL,
+                next_retry REAL NOT NULL,
+                PRIMARY KEY (scope, node, field)
+            )
+        """)
+        self.conn.commit()
+        self.lock = threading.Lock()
+        self.stats = {"recorded": 0, "resolved": 0}
+
+    @staticmethod
+    def node_key(node):
+        return node if isinstance(node, str) else json.dumps(node, ensure_ascii=False)
+
+    def record(self, node, field, error, source_sha=None):
+        """Stores (or bumps) the failure of one field. error is an exception or a reason."""
+        reason = error if isinstance(error, str) else classify(error)
+        message = "" if isinstance(error, str) else str(error)[:500]
+        key = (self.scope, self.node_key(node), field)
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT attempts, source_sha, first_failed FROM failures WHERE scope = ? AND node = ? AND field = ?", key
+            ).fetchone()
+            # A changed source starts over
+            attempts = row[0] + 1 if row and row[1] == source_sha else 1
+            first = row[2] if row and row[1] == source_sha else now
+            self.conn.execute(
+                "INSERT OR REPLACE INTO failures VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                key + (source_sha, reason, message, attempts, first, now, now + backoff(reason, attempts)),
+            )
+            self.conn.commit()
+            self.stats["recorded"] += 1
+
+    def resolve(self, node, field):
+        with self.lock:
+            cursor = self.conn.execute(
+                "DELETE FROM failures WHERE scope = ? AND node = ? AND field = ?", (self.scope, self.node_key(node), field)
+            )
+            self.conn.commit()
+            self.stats["resolved"] += cursor.rowcount
+
+    def entries(self):
+        """Every entry of the scope (of all scopes without one), as dicts, oldest first."""
+        scope = self.scope
+        query = "SELECT * FROM failures" + (" WHERE scope = ?" if scope else "") + " ORDER BY first_failed"
+        with self.lock:
+            cursor = self.conn.execute(query, (scope,) if scope else ())
+            columns = [c[0] for c in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        for row in rows:
+            if row["node"].startswith("["):
+                row["node"] = json.loads(row["node"])
+        return rows
+
+    def due(self, now=None):
+        """Entries whose backoff has passed and that still have attempts left."""
+        now = time.time() if now is None else now
+        return [e for e in self.entries() if e["next_retry"] <= now and e["attempts"] < MAX_ATTEMPTS]
+
+    def backing_off(self, now=None):
+        """Entries whose backoff has not passed yet."""
+        now = time.time() if now is None else now
+        return [e for e in self.entries() if e["next_retry"] > now]
+
+    def clear(self):
+        scope = self.scope
+        with self.lock:
+            self.conn.execute("DELETE FROM failures" + (" WHERE scope = ?" if scope else ""), (scope,) if scope else ())
+            self.conn.commit()
+
+    def report(self):
+        entries = self.entries()
+        now = time.time()
+        reasons = {}
+        for entry in entries:
+            reasons[entry["reason"]] = reasons.get(entry["reason"], 0) + 1
+        due = sum(1 for e in entries if e["next_retry"] <= now and e["attempts"] < MAX_ATTEMPTS)
+        exhausted = sum(1 for e in entries if e["attempts"] >= MAX_ATTEMPTS)
+        summary = ", ".join(f"{count} {reason}" for reason, count in sorted(reasons.items())) or "empty"
+        print(f"Failure queue ({self.path}): {self.stats['recorded']} failures recorded, "
+              f"{self.stats['resolved']} resolved this run; {len(entries)} pending ({summary}), "
+              f"{due} due for --retry-failed, {exhausted} past {MAX_ATTEMPTS} attempts.")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show or clear the queue of failed translations.")
+    parser.add_argument("--queue", default=DEFAULT_QUEUE_PATH, help="SQLite queue file")
+    parser.add_argument("--scope", default=None, help="Only this output file")
+    parser.add_argument("--list", action="store_true", help="List the entries")
+    parser.add_argument("--clear", action="store_true", help="Remove the entries")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.queue):
+        print(f"Queue not found: {args.queue}")
+        return
+
+    queue = FailureQueue(args.scope, args.queue)
+    if args.clear:
+        queue.clear()
+        print("Queue cleared.")
+    elif args.list:
+        now = time.time()
+        for e in queue.entries():
+            wait = max(0, int(e["next_retry"] - now))
+            print(f"{e['reason']:<9} x{e['attempts']:<2} retry in {wait:>6}s  {e['field']:<18} "
+                  f"{json.dumps(e['node'], ensure_ascii=False)}  {e['scope']}")
+    else:
+        counts = {}
+        for e in queue.entries():
+            counts[(e["scope"], e["reason"])] = counts.get((e["scope"], e["reason"]), 0) + 1
+        print(f"{'Scope':<50} | {'Reason':<9} | {'Entries':>7}")
+        print("-" * 72)
+        for (scope, reason), count in sorted(counts.items()):
+            print(f"{scope:<50} | {reason:<9} | {count:>7}")
+    queue.close()
+
+if __name__ == "__main__":
+    main()
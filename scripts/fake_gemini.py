@@ -0,0 +1,222 @@
+"""
+Local stand-in for genai.GenerativeModel, to exercise the translation
+workers offline.
+
+FakeGeminiModel enforces a requests/tokens-per-minute quota over a sliding
+window and raises ResourceExhausted (429) past it, with a configurable
+latency, through generate_content and generate_content_async. Single
+prompts are answered with "[PT] " + the whole text to translate (what
+follows the last SOURCE_MARKERS line), so multi-line bodies pass
+text_chunker.looks_truncated; batch prompts (batch_translation) with a
+JSON array echoing every id.
+
+    python3 scripts/fake_gemini.py --requests 300 --rpm 120 --period 5
+compares the old per-thread sleep-on-429 loop, the shared RateController
+and the asyncio engine (async_engine.py).
+
+    python3 scripts/fake_gemini.py --check
+checks that the fake answers to multi-line bodies (whole and chunked)
+are not taken for truncated ones, so --fake-model runs translate them.
+"""
+
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+import concurrent.futures
+
+from rate_limiter import RateController, AsyncRateController, estimate_prompt_tokens
+from async_engine import gather_bounded
+
+try:
+    from google.api_core.exceptions import ResourceExhausted
+except ImportError:
+    class ResourceExhausted(Exception):
+        pass
+
+
+# Lines after which the prompts of the translators hold the text to translate
+SOURCE_MARKERS = (
+    "Texto Original:\n",                      # translate_full_json.build_prompt
+    "**Texto para tradução:**\n",             # translate_missing_articles.PROMPT_SISTEMA
+    "**Traduza apenas o trecho abaixo.**\n",  # text_chunker.CONTEXT_TEMPLATE
+)
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGeminiModel:
+    def __init__(self, rpm=60, tpm=1_000_000, latency=0.2, jitter=0.05, period=60.0,
+                 model_name="models/fake-gemini"):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.latency = latency
+        self.jitter = jitter
+        self.period = period
+        self.model_name = model_name
+
+        self.lock = threading.Lock()
+        self.window = []  # (time, tokens) of accepted requests
+        self.stats = {"accepted": 0, "rejected": 0, "max_in_flight": 0}
+        self.in_flight = 0
+
+    def _admit(self, tokens):
+        now = time.monotonic()
+        with self.lock:
+            self.window = [(t, n) for t, n in self.window if now - t < self.period]
+            used_tokens = sum(n for _, n in self.window)
+            if len(self.window) >= self.rpm or used_tokens + tokens > self.tpm:
+                self.stats["rejected"] += 1
+                return False
+            self.window.append((now, tokens))
+            self.stats["accepted"] += 1
+            self.in_flight += 1
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.in_flight)
+            return True
+
+    def _prompt(self, contents):
+        if isinstance(contents, str):
+            contents = [contents]
+        return "\n".join(c for c in contents if isinstance(c, str)), estimate_prompt_tokens(contents)
+
+    def _done(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def generate_content(self, contents, generation_config=None, **kwargs):
+        prompt, tokens = self._prompt(contents)
+        if not self._admit(tokens):
+            time.sleep(self.latency / 4)
+            raise ResourceExhausted("429 Resource has been exhausted (fake quota)")
+
+        try:
+            time.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+            return FakeResponse(self.answer(prompt))
+        finally:
+            self._done()
+
+    async def generate_content_async(self, contents, generation_config=None, **kwargs):
+        prompt, tokens = self._prompt(contents)
+        if not self._admit(tokens):
+            await asyncio.sleep(self.latency / 4)
+            raise ResourceExhausted("429 Resource has been exhausted (fake quota)")
+
+        try:
+            await asyncio.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+            return FakeResponse(self.answer(prompt))
+        finally:
+            self._done()
+
+    @staticmethod
+    def answer(prompt):
+        if "Itens:\n" in prompt:
+            try:
+                items = json.loads(prompt.split("Itens:\n", 1)[1])
+                return json.dumps([{"id": it["id"], "translation": f"[PT] {it['text']}"} for it in items],
+                                  ensure_ascii=False)
+            except (ValueError, KeyError, TypeError):
+                return "[]"
+        start = max((prompt.rfind(marker) + len(marker) for marker in SOURCE_MARKERS if marker in prompt), default=0)
+        return f"[PT] {prompt[start:].strip()}"
+
+
+def check_answers():
+    """Multi-line bodies, whole and in chunks, get answers that looks_truncated accepts. Returns True if so."""
+    from text_chunker import context_prompt, looks_truncated, split_text
+
+    paragraph = "信者の質問\n「浄霊の方法について伺います」\n\n明主様御垂示\n" + "浄霊は霊を浄める事である。" * 40
+    body = "\n\n".join([paragraph] * 30)
+    chunks = split_text(body)
+    prompts = [(body, f"Texto Original:\n{body}\n"),
+               (body, f"**Texto para tradução:**\n\n{body}")]
+    for i, chunk in enumerate(chunks):
+        context = context_prompt(i, len(chunks), "浄霊の方法", chunks[i - 1] if i else "")
+        prompts.append((chunk, f"{context}\nTexto Original:\n{chunk}\n"))
+        prompts.append((chunk, f"**Texto para tradução:**\n{context}\n{chunk}"))
+
+    failed = [source for source, prompt in prompts
+              if looks_truncated(source, FakeGeminiModel.answer(prompt))]
+    print(f"Fake answers: {len(prompts) - len(failed)}/{len(prompts)} multi-line bodies accepted "
+          f"(whole, and in {len(chunks)} chunks of a {len(body)}-character text).")
+    return not failed
+
+
+def naive_call(model, prompt):
+    """The old per-thread loop: sleep and retry on every 429."""
+    retry_delay = 0.5
+    for _ in range(20):
+        try:
+            return model.generate_content(prompt)
+        except ResourceExhausted:
+            time.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, 8)
+    return None
+
+
+def run(label, call, prompts, workers, model):
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(call, prompts))
+    report_run(label, results, prompts, time.perf_counter() - start, model)
+
+
+def report_run(label, results, prompts, elapsed, model):
+    done = sum(1 for r in results if r is not None)
+    print(f"{label:<12} | {done:>5}/{len(prompts):<5} | {elapsed:>7.2f}s | {done / elapsed:>7.1f} req/s | "
+          f"{model.stats['rejected']:>5} x 429 | max in flight {model.stats['max_in_flight']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput under quota: per-thread backoff vs shared RateController.")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--rpm", type=int, default=120, help="Fake quota, requests per period")
+    parser.add_argument("--tpm", type=int, default=1_000_000, help="Fake quota, tokens per period")
+    parser.add_argument("--period", type=float, default=5.0, help="Quota window in seconds (60 = real minute)")
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--async-concurrency", type=int, default=256, help="Maximum in-flight coroutines")
+    parser.add_argument("--check", action="store_true", help="Only check the answers to multi-line bodies")
+    args = parser.parse_args()
+
+    if args.check:
+        raise SystemExit(0 if check_answers() else 1)
+
+    prompts = [f"Texto Original:\n記事{i}" for i in range(args.requests)]
+    print(f"{'Mode':<12} | {'Done':>11} | {'Time':>8} | {'Rate':>11} | {'429s':>9} |")
+    print("-" * 80)
+
+    model = FakeGeminiModel(args.rpm, args.tpm, args.latency, period=args.period)
+    run("per-thread", lambda p: naive_call(model, p), prompts, args.workers, model)
+
+    model = FakeGeminiModel(args.rpm, args.tpm, args.latency, period=args.period)
+    controller = RateController(args.rpm, args.tpm, max_concurrency=args.workers, period=args.period)
+    throttled = controller.wrap(model)
+
+    def controlled_call(prompt):
+        try:
+            return throttled.generate_content(prompt)
+        except ResourceExhausted:
+            return None
+
+    run("controller", controlled_call, prompts, args.workers, model)
+    controller.report()
+
+    # Same quota with coroutines on one thread; --async-concurrency can go far above --workers
+    model = FakeGeminiModel(args.rpm, args.tpm, args.latency, period=args.period)
+    async_controller = AsyncRateController(args.rpm, args.tpm, max_concurrency=args.async_concurrency,
+                                           period=args.period)
+    async_model = async_controller.wrap(model)
+    factories = [lambda p=p: async_model.generate_content_async(p) for p in prompts]
+
+    start = time.perf_counter()
+    results = asyncio.run(gather_bounded(factories, args.async_concurrency))
+    report_run("asyncio", [r for r, _ in results], prompts, time.perf_counter() - start, model)
+    async_controller.report()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+All-or-nothing batches of file moves, renames, writes and deletes.
+
+The merge workflow renames and moves hundreds of part files between
+partes/ and bkp/ one at a time; a failure halfway used to leave the two
+directories inconsistent. A FileTransaction is planned first, journaled,
+then applied with os.replace, and rolled back on any error:
+
+    tx = FileTransaction(TX_DIR, "step3")
+    tx.move(src, dst)                  # planned only
+    tx.write_json(path, data)
+    tx.commit()                        # journal -> stage -> apply -> committed
+
+Each transaction lives in TX_DIR/<id>/: journal.json (the planned
+operations and the state), staged/ (new file contents, written before
+anything is touched) and backup/ (files that were overwritten or
+deleted). Operations already in their final state are dropped when
+planning, so a repeated run is a no-op that writes nothing.
+
+A run killed while applying leaves its journal in the "applying" state;
+recover() (called by the workflows on start) or the rollback command
+puts every file back where it was:
+
+    python3 scripts/file_transaction.py --dir data/temasSeparados/.transactions status
+    python3 scripts/file_transaction.py --dir data/temasSeparados/.transactions rollback [id]
+"""
+
+import os
+import json
+import time
+import errno
+import shutil
+import argparse
+import itertools
+
+JOURNAL_NAME = "journal.json"
+JOURNAL_VERSION = 1
+
+# Committed transactions kept (with their backups) for the rollback command
+KEEP_COMMITTED = 20
+
+_sequence = itertools.count(1)
+
+
+class FileTransactionError(Exception):
+    pass
+
+
+def fsync_dir(path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def replace(src, dst):
+    """os.replace, falling back to copy + replace across filesystems."""
+    try:
+        os.replace(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        temp = dst + ".tx-copy"
+        shutil.copy2(src, temp)
+        os.replace(temp, dst)
+        os.remove(src)
+
+
+def same_bytes(path, data):
+    if not os.path.isfile(path) or os.path.getsize(path) != len(data):
+        return False
+    with open(path, 'rb') as f:
+        return f.read() == data
+
+
+class FileTransaction:
+    def __init__(self, tx_dir, name="tx"):
+        self.tx_dir = tx_dir
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_sequence):04d}-{name}"
+        self.dir = os.path.join(tx_dir, self.id)
+        self.ops = []
+        self.contents = []
+        self.skipped = 0
+        # Whether a path exists once the ops planned so far are applied,
+        # so moves can be chained (a -> tmp, tmp -> b)
+        self.planned = {}
+
+    def _exists(self, path):
+        return self.planned.get(path, os.path.exists(path))
+
+    # --- Planning ---
+
+    def move(self, src, dst):
+        """Plans a rename/move. Returns False when there is nothing to do (already moved)."""
+        src, dst = os.path.abspath(src), os.path.abspath(dst)
+        if src == dst or (not self._exists(src) and self._exists(dst)):
+            self.skipped += 1
+            return False
+        if not self._exists(src):
+            raise FileTransactionError(f"{src}: not found")
+        self.ops.append({"kind": "move", "src": src, "path": dst})
+        self.planned[src] = False
+        self.planned[dst] = True
+        return True
+
+    def write_bytes(self, path, data):
+        """Plans writing data to path. Returns False when path already holds it."""
+        path = os.path.abspath(path)
+        if path not in self.planned and same_bytes(path, data):
+            self.skipped += 1
+            return False
+        self.ops.append({"kind": "write", "path": path})
+        self.planned[path] = True
+        self.contents.append((len(self.ops) - 1, data))
+        return True
+
+    def write_json(self, path, data, indent=2):
+        text = json.dumps(data, ensure_ascii=False, indent=indent)
+        return self.write_bytes(path, text.encode('utf-8'))
+
+    def delete(self, path):
+        path = os.path.abspath(path)
+        if not self._exists(path):
+            self.skipped += 1
+            return False
+        self.ops.append({"kind": "delete", "path": path})
+        self.planned[path] = False
+        return True
+
+    # --- Journal ---
+
+    def _save(self, state):
+        journal = {"version": JOURNAL_VERSION, "id": self.id, "state": state,
+                   "updated": time.time(), "ops": self.ops}
+        write_journal(self.dir, journal)
+
+    # --- Commit ---
+
+    def commit(self):
+        """Applies every planned operation, or none of them. Returns the number applied."""
+        if not self.ops:
+            if self.skipped:
+                print(f"Transaction {self.id}: nothing to do ({self.skipped} already done).")
+            return 0
+
+        for i, op in enumerate(self.ops):
+            op["backup"] = os.path.join(self.dir, "backup", str(i))
+            if op["kind"] == "write":
+                op["staged"] = os.path.join(self.dir, "staged", str(i))
+        os.makedirs(os.path.join(self.dir, "backup"), exist_ok=True)
+        self._save("staging")
+
+        # New contents first: nothing in the tree is touched before they are on disk
+        if self.contents:
+            os.makedirs(os.path.join(self.dir, "staged"), exist_ok=True)
+        for i, data in self.contents:
+            with open(self.ops[i]["staged"], 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        self._save("applying")
+
+        try:
+            for op in self.ops:
+                apply_op(op)
+        except BaseException as e:
+            print(f"Transaction {self.id} failed ({e}); rolling back.")
+            rollback_ops(self.ops)
+            self._save("rolled_back")
+            raise
+
+        for directory in {os.path.dirname(op["path"]) for op in self.ops}:
+            fsync_dir(directory)
+        self._save("committed")
+        prune(self.tx_dir)
+        print(f"Transaction {self.id}: {len(self.ops)} operations applied"
+              f"{f', {self.skipped} already done' if self.skipped else ''}.")
+        return len(self.ops)
+
+
+def write_journal(tx_path, journal):
+    os.makedirs(tx_path, exist_ok=True)
+    path = os.path.join(tx_path, JOURNAL_NAME)
+    temp = path + ".tmp"
+    with open(temp, 'w', encoding='utf-8') as f:
+        json.dump(journal, f, ensure_ascii=False, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, path)
+
+
+def apply_op(op):
+    os.makedirs(os.path.dirname(op["path"]), exist_ok=True)
+    if op["kind"] == "delete":
+        replace(op["path"], op["backup"])
+        return
+    if os.path.exists(op["path"]):
+        replace(op["path"], op["backup"])
+    replace(op["src"] if op["kind"] == "move" else op["staged"], op["path"])
+
+
+def rollback_ops(ops):
+    """Undoes the applied operations, last first. Works on a half-applied journal."""
+    for op in reversed(ops):
+        path, backup = op["path"], op.get("backup")
+        if op["kind"] == "move":
+            if os.path.exists(path) and not os.path.exists(op["src"]):
+                replace(path, op["src"])
+        elif op["kind"] == "write":
+            # Applied when the staged file was moved into place
+            if op.get("staged") and not os.path.exists(op["staged"]) and os.path.exists(path):
+                os.remove(path)
+        if backup and os.path.exists(backup):
+            replace(backup, path)
+
+
+def load_journals(tx_dir):
+    """Journals of tx_dir, oldest first."""
+    journals = []
+    if not os.path.isdir(tx_dir):
+        return journals
+    for name in sorted(os.listdir(tx_dir)):
+        path = os.path.join(tx_dir, name, JOURNAL_NAME)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                journals.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return journals
+
+
+def rollback(tx_dir, journal):
+    # While staging nothing in the tree was touched yet
+    if journal["state"] != "staging":
+        rollback_ops(journal["ops"])
+    journal["state"] = "rolled_back"
+    journal["updated"] = time.time()
+    write_journal(os.path.join(tx_dir, journal["id"]), journal)
+    print(f"Transaction {journal['id']}: {len(journal['ops'])} operations rolled back.")
+
+
+def recover(tx_dir):
+    """Rolls back the transactions a crash left half applied. Returns how many."""
+    pending = [j for j in load_journals(tx_dir) if j.get("state") in ("staging", "applying")]
+    for journal in reversed(pending):
+        print(f"Transaction {journal['id']} was interrupted ({journal['state']}).")
+        rollback(tx_dir, journal)
+    return len(pending)
+
+
+def prune(tx_dir):
+    """Removes the oldest finished transactions beyond KEEP_COMMITTED."""
+    finished = [j for j in load_journals(tx_dir) if j.get("state") in ("committed", "rolled_back")]
+    for journal in finished[:-KEEP_COMMITTED]:
+        shutil.rmtree(os.path.join(tx_dir, journal["id"]), ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Journaled file transactions of the merge workflow.")
+    parser.add_argument("--dir", required=True, help="Transaction directory (e.g. data/temasSeparados/.transactions)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="List the transactions")
+    rb = sub.add_parser("rollback", help="Undo a transaction (default: the last one)")
+    rb.add_argument("id", nargs="?")
+    sub.add_parser("recover", help="Roll back the interrupted transactions")
+    args = parser.parse_args()
+
+    journals = load_journals(args.dir)
+    if args.command == "status":
+        for journal in journals:
+            kinds = {}
+            for op in journal["ops"]:
+                kinds[op["kind"]] = kinds.get(op["kind"], 0) + 1
+            summary = ", ".join(f"{count} {kind}" for kind, count in sorted(kinds.items()))
+            print(f"{journal['id']}  {journal['state']:12} {summary}")
+        if not journals:
+            print("No transactions.")
+    elif args.command == "recover":
+        if not recover(args.dir):
+            print("No interrupted transactions.")
+    else:
+        candidates = [j for j in journals if j["state"] != "rolled_back"]
+        if args.id:
+            candidates = [j for j in candidates if j["id"] == args.id]
+        if not candidates:
+            print("No transaction to roll back.")
+            return
+        rollback(args.dir, candidates[-1])
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@ import os
 import json
 import re
 
+from markdown_tokenizer import parse_heading
+
 JSON_PATH = '/Users/michael/Documents/Ensinamentos/ShinCollege/data/shin_college_data.json'
 INDICES_DIR = '/Users/michael/Documents/Ensinamentos/ShinCollege/Markdown/Indices'
 BASE_MARKDOWN_DIR = '/Users/michael/Documents/Ensinamentos/ShinCollege/Markdown'
@@ -104,8 +106,9 @@ def fix_excess_headers():
                     for line in lines:
                         # Match the header line
                         # The line in file starts with '# ' and may have 'について'
-                        if line.strip().startswith('# '):
-                            header_content = line.strip()[2:].strip()
+                        heading = parse_heading(line)
+                        if heading and heading[0] == 1:
+                            header_content = heading[1]
                             # Apply 'replace' logic that generate_json used
                             cleaned_header_content = header_content.replace('について', '')
                             
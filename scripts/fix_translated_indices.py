@@ -19,6 +19,14 @@ def save_json(filepath, data):
     with open(filepath, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
+def restore_indices(trans_pub, orig_pub, default_idx):
+    """Copies the position fields and, when the original has them, the stable IDs."""
+    trans_pub['pub_idx'] = orig_pub.get('pub_idx', default_idx)
+    trans_pub['title_idx'] = orig_pub.get('title_idx')
+    for key in ('id', 'title_id'):
+        if orig_pub.get(key):
+            trans_pub[key] = orig_pub[key]
+
 def fix_translated_file(translated_file):
     """Restore pub_idx from original file to translated file using title matching."""
     
@@ -45,8 +53,7 @@ def fix_translated_file(translated_file):
     if len(orig_pubs) == len(trans_pubs):
         for i, (orig_pub, trans_pub) in enumerate(zip(orig_pubs, trans_pubs)):
             if 'pub_idx' not in trans_pub:
-                trans_pub['pub_idx'] = orig_pub.get('pub_idx', i)
-                trans_pub['title_idx'] = orig_pub.get('title_idx')
+                restore_indices(trans_pub, orig_pub, i)
                 fixed_count += 1
     else:
         # Strategy 2: If counts don't match, translate what we can by position
@@ -65,8 +72,7 @@ def fix_translated_file(translated_file):
             # Check if this translation seems to match (same title_idx at least)
             if trans_pub.get('title_idx') == orig_pub.get('title_idx') or trans_pub.get('title_idx') is None:
                 if 'pub_idx' not in trans_pub:
-                    trans_pub['pub_idx'] = orig_pub.get('pub_idx', orig_idx)
-                    trans_pub['title_idx'] = orig_pub.get('title_idx')
+                    restore_indices(trans_pub, orig_pub, orig_idx)
                     fixed_count += 1
                 trans_idx += 1
             else:
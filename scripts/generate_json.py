@@ -1,18 +1,33 @@
 import os
-import json
 import re
+import argparse
+import concurrent.futures
+
+from markdown_tokenizer import tokenize, H1, H2, BODY
+from incremental_build import BuildCache
+from node_ids import assign_theme_ids, volume_id, ID_SCHEME
 
 # Base directory
 BASE_DIR = "/Users/michael/Documents/Ensinamentos/ShinCollege/Markdown"
 OUTPUT_FILE = "/Users/michael/Documents/Ensinamentos/ShinCollege/data/shin_college_data.json"
 
+# Code that shapes the parsed output: editing it invalidates the build cache
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+BUILDER_SOURCES = [os.path.join(SCRIPTS_DIR, name) for name in ("generate_json.py", "markdown_tokenizer.py", "node_ids.py")]
+
+# Header patterns, compiled once
+BOLD_PATTERN = re.compile(r'^(\*\*|＊＊)|(\*\*|＊＊)$')
+TITLE_PATTERN = re.compile(r'「(.*?)」')
+DATE_PATTERN = re.compile(r'（(.*?)）')
+FILENAME_PATTERN = re.compile(r'^(\d+)\s*-\s*(.+?)(?:_(\d+))?(?:_edited)?\.md$')
+
 def parse_header(header_line):
     """
     Parses the H2 header line to extract Source, Title, and Date.
     Example: 明主様御教え　「救世主の出現」　（昭和10年8月5日発行）
     """
     # Clean markdown formatting (bold)
-    header_line = re.sub(r'^(\*\*|＊＊)|(\*\*|＊＊)$', '', header_line.strip()).strip()
+    header_line = BOLD_PATTERN.sub('', header_line.strip()).strip()
 
     # Initialize defaults
     source = ""
@@ -20,13 +35,13 @@ def parse_header(header_line):
     date = ""
 
     # Try to find content inside 「」 for title
-    title_match = re.search(r'「(.*?)」', header_line)
+    title_match = TITLE_PATTERN.search(header_line)
     if title_match:
         title = title_match.group(1)
     
     # Try to find content inside （） for date (looking for date-like chars or ends with 发行/published)
     # Using a broad catch for parentheses at the end of the string usually containing date info
-    date_match = re.search(r'（(.*?)）', header_line)
+    date_match = DATE_PATTERN.search(header_line)
     if date_match:
         date = date_match.group(1)
 
@@ -48,11 +63,188 @@ def parse_header(header_line):
         "date": date
     }
 
-def convert_to_json():
+def parse_markdown_file(lines, filename):
+    """
+    Parses one *_edited.md file into its list of title entries.
+    H1 starts a new title, H2 adds a publication whose content is the
+    following BODY event.
+    """
+    titles = []
+    current_title_entry = None
+    current_pub = None
+    pending_source = None
+
+    for kind, value in tokenize(lines):
+        if kind == H1:
+            # Normalize title: Remove 'について' (About) to match Index format
+            title_text = value.replace('について', '')
+
+            current_title_entry = {
+                "title": title_text,
+                "publications": []
+            }
+            current_pub = None
+
+            # Add pending source if any (H2 appeared before H1)
+            if pending_source:
+                parsed = parse_header(pending_source)
+                pub_entry = {
+                    "header": parsed["full_header"],
+                    "source": parsed["source"],
+                    "publication_title": parsed["publication_title"],
+                    "date": parsed["date"],
+                    "content": "", # Intro content attached to H2 usually? Or empty.
+                    "type": "intro"
+                }
+
+                current_title_entry["publications"].append(pub_entry)
+                pending_source = None
+
+            # Store origin filename to handle separators later
+            current_title_entry["origin_filename"] = filename
+            titles.append(current_title_entry)
+
+        elif kind == H2:
+            # H2 - Publication Source
+            if current_title_entry:
+                parsed = parse_header(value)
+
+                current_pub = {
+                    "header": parsed["full_header"],
+                    "source": parsed["source"],
+                    "publication_title": parsed["publication_title"],
+                    "date": parsed["date"],
+                    "content": "",
+                    "type": "publication"
+                }
+                current_title_entry["publications"].append(current_pub)
+            else:
+                # Treat as pending source for next H1
+                current_pub = None
+                pending_source = value
+
+        elif kind == BODY:
+            # Only publication bodies are kept; H1 bodies are dropped
+            if current_pub is not None:
+                current_pub["content"] = value
+                current_pub = None
+
+    return titles
+
+def parse_file(file_path, filename):
+    """Parses a single Markdown file. Top-level so it can run in a worker process."""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return parse_markdown_file(f, filename)
+
+def list_volume_files(volume_path, verbose=False):
+    """
+    Returns the files of a volume in processing order as
+    (theme_order, theme_name, file_path, filename) tuples; verbose prints
+    every file picked or skipped.
+    """
+    entries = []
+
+    # Iterate over themes (files)
+    # We process all files, sorting ensures _01, _02, etc are processed in order
+    all_files = sorted(os.listdir(volume_path))
+    all_files_set = set(all_files)
+
+    for filename in all_files:
+        if filename.startswith('.'):
+            continue
+        
+        # Allow .md or no extension provided it matches pattern
+        # Regex to parse: [Order] - [Name]_[Group]...
+        match = FILENAME_PATTERN.match(filename)
+        
+        if not match:
+            continue
+
+        # Skip unedited file if edited version exists
+        if not filename.endswith('_edited.md'):
+            potential_edited = filename[:-3] + "_edited.md"
+            if potential_edited in all_files_set:
+                if verbose:
+                    print(f"DEBUG: Skipping {filename} in favor of {potential_edited}")
+                continue
+
+        if verbose:
+            print(f"DEBUG: Processing file: {filename}")
+
+        theme_order = int(match.group(1))
+        theme_name = match.group(2).strip()
+        # group_order is ignored now - we merge all files for the same theme
+
+        entries.append((theme_order, theme_name, os.path.join(volume_path, filename), filename))
+
+    return entries
+
+def parse_all(file_entries, jobs=1):
+    """
+    Parses every (file_path, filename) pair and returns the results in input order.
+    With jobs > 1 files are parsed in a process pool; map() keeps the order
+    so the assembled JSON does not depend on which worker finishes first.
+    """
+    paths = [entry[0] for entry in file_entries]
+    names = [entry[1] for entry in file_entries]
+
+    if jobs <= 1 or len(file_entries) <= 1:
+        return [parse_file(path, name) for path, name in zip(paths, names)]
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(parse_file, paths, names))
+
+def build_theme_entry(theme_name, titles):
+    """Builds the theme entry from its titles, or None if no title has publications."""
+    # Filter out empty titles
+    filtered_titles = [
+        title for title in titles
+        if title.get("publications") and len(title["publications"]) > 0
+    ]
+    
+    if not filtered_titles:
+        return None
+
+    final_titles_list = []
+    last_filename = None
+
+    for title in filtered_titles:
+        current_filename = title.get("origin_filename")
+        
+        # If filename changed and it's not the first item, add separator
+        if last_filename and current_filename and current_filename != last_filename:
+             final_titles_list.append({
+                "title": "---",
+                "publications": []
+            })
+        
+        # Remove origin_filename before adding to final list to keep JSON clean (optional, but good practice)
+        # title_copy = title.copy()
+        # if "origin_filename" in title_copy:
+        #    del title_copy["origin_filename"]
+        # final_titles_list.append(title_copy)
+        # Actually, keeping it might be useful for debugging, but let's keep it clean
+        
+        # For now just append the object, extra keys are ignored by frontend usually
+        final_titles_list.append(title)
+        last_filename = current_filename
+
+    return {
+        "theme": theme_name,
+        "titles": final_titles_list
+    }
+
+def build_data(jobs=1, cache=None, verbose=False):
+    """
+    Parses all volumes and returns the shin_college_data structure.
+    With a BuildCache, unchanged themes come back as placeholders and only
+    the files of changed themes that are not in the cache are parsed.
+    """
     data = []
 
     # Iterate over volumes (directories)
     # Sorting to ensure "1.xxx", "2.xxx" order
+    volumes = []
     for volume_name in sorted(os.listdir(BASE_DIR)):
         volume_path = os.path.join(BASE_DIR, volume_name)
         
@@ -62,180 +254,105 @@ def convert_to_json():
         if volume_name == 'Indices':
             continue
 
-        volume_data = {
-            "volume": volume_name,
-            "themes": []
-        }
-        
         # Structure:
         # themes_map[theme_order] = {
         #   "name": theme_name,
-        #   "groups": {
-        #   "titles": [list of titles]
+        #   "files": [(file_path, filename)]
         # }
+        # group_order is ignored - we merge all files for the same theme
         themes_map = {}
-
-        # Iterate over themes (files)
-        # We process all files, sorting ensures _01, _02, etc are processed in order
-        all_files = sorted(os.listdir(volume_path))
-        all_files_set = set(all_files)
-
-        for filename in all_files:
-            if filename.startswith('.'):
-                continue
-            
-            # Allow .md or no extension provided it matches pattern
-            # Regex to parse: [Order] - [Name]_[Group]...
-            match = re.match(r'^(\d+)\s*-\s*(.+?)(?:_(\d+))?(?:_edited)?\.md$', filename)
-            
-            if not match:
-                continue
-
-            # Skip unedited file if edited version exists
-            if not filename.endswith('_edited.md'):
-                potential_edited = filename[:-3] + "_edited.md"
-                if potential_edited in all_files_set:
-                    print(f"DEBUG: Skipping {filename} in favor of {potential_edited}")
-                    continue
-
-            print(f"DEBUG: Processing file: {filename}")
-
-            theme_order = int(match.group(1))
-            theme_name = match.group(2).strip()
-            # group_order is ignored now - we merge all files for the same theme
-
+        for theme_order, theme_name, file_path, filename in list_volume_files(volume_path, verbose):
             # Initialize theme entry if not exists
             if theme_order not in themes_map:
                 themes_map[theme_order] = {
                     "name": theme_name,
-                    "titles": []
+                    "files": []
                 }
-            
-            file_path = os.path.join(volume_path, filename)
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            themes_map[theme_order]["files"].append((file_path, filename))
 
-            # Split by H1 (# ) or H2 (## )
-            # We want to capture the header itself to identify type
-            tokens = re.split(r'^((?:#|##)\s+.+)$', content, flags=re.MULTILINE)
-            
-            current_title_entry = None
-            pending_source = None
-            
-            # Token 0 is text before first header (usually empty or intro)
-            # Token 1 is Header
-            # Token 2 is Content following Header
-            # ...
-            
-            for i in range(1, len(tokens), 2):
-                header_line = tokens[i].strip()
-                section_content = tokens[i+1].strip() if i+1 < len(tokens) else ""
-                
-                if header_line.startswith('# '):
-                    # H1 - New Title
-                    title_text = header_line[1:].strip() # remove '# '
-                    
-                    # Normalize title: Remove 'について' (About) to match Index format
-                    title_text = title_text.replace('について', '')
-                    
-                    current_title_entry = {
-                        "title": title_text,
-                        "publications": []
-                    }
-                    
-                    # Add pending source if any (H2 appeared before H1)
-                    if pending_source:
-                        parsed = parse_header(pending_source)
-                        pub_entry = {
-                            "header": parsed["full_header"],
-                            "source": parsed["source"],
-                            "publication_title": parsed["publication_title"],
-                            "date": parsed["date"],
-                            "content": "", # Intro content attached to H2 usually? Or empty.
-                            "type": "intro"
-                        }
-                        
-                        current_title_entry["publications"].append(pub_entry)
-                        pending_source = None
-
-                    # Store origin filename to handle separators later
-                    current_title_entry["origin_filename"] = filename
-                    themes_map[theme_order]["titles"].append(current_title_entry)
-                    
-                    pass
-
-                elif header_line.startswith('## '):
-                    # H2 - Publication Source
-                    if current_title_entry:
-                        # Parse header
-                        parsed = parse_header(header_line[3:]) # remove '## '
-                        
-                        pub_entry = {
-                            "header": parsed["full_header"],
-                            "source": parsed["source"],
-                            "publication_title": parsed["publication_title"],
-                            "date": parsed["date"],
-                            "content": section_content,
-                            "type": "publication"
-                        }
-                        current_title_entry["publications"].append(pub_entry)
-                    else:
-                        # Treat as pending source for next H1
-                        pending_source = header_line[3:]
+        volumes.append((volume_name, themes_map))
+
+    # Reuse unchanged themes and cached file fragments, collect what must be parsed
+    reused = {}
+    fragments = {}
+    to_parse = []
+    for volume_name, themes_map in volumes:
+        for theme_order, theme_obj in themes_map.items():
+            key = f"{volume_name}/{theme_order:02d}"
+            paths = [path for path, _ in theme_obj["files"]]
+            if cache:
+                placeholder = cache.theme(key, paths, [theme_obj["name"], ID_SCHEME])
+                if placeholder is not None:
+                    reused[key] = placeholder
+                    continue
+            for file_path, filename in theme_obj["files"]:
+                fragment = cache.fragment(file_path) if cache else None
+                if fragment is None:
+                    to_parse.append((file_path, filename))
+                else:
+                    fragments[file_path] = fragment
+
+    # Parse the remaining files in one batch
+    for (file_path, _), titles in zip(to_parse, parse_all(to_parse, jobs)):
+        fragments[file_path] = titles
+        if cache:
+            cache.store_fragment(file_path, titles)
+
+    for volume_name, themes_map in volumes:
+        volume_data = {
+            "id": volume_id(volume_name),
+            "volume": volume_name,
+            "themes": []
+        }
         
         # After processing all files in volume, flatten into volume_data
         sorted_theme_keys = sorted(themes_map.keys())
         
         for t_key in sorted_theme_keys:
             theme_obj = themes_map[t_key]
-            
-            # Filter out empty titles
-            filtered_titles = [
-                title for title in theme_obj["titles"]
-                if title.get("publications") and len(title["publications"]) > 0
-            ]
-            
-            if not filtered_titles:
-                continue
+            key = f"{volume_name}/{t_key:02d}"
 
-            final_titles_list = []
-            last_filename = None
-
-            for title in filtered_titles:
-                current_filename = title.get("origin_filename")
-                
-                # If filename changed and it's not the first item, add separator
-                if last_filename and current_filename and current_filename != last_filename:
-                     final_titles_list.append({
-                        "title": "---",
-                        "publications": []
-                    })
-                
-                # Remove origin_filename before adding to final list to keep JSON clean (optional, but good practice)
-                # title_copy = title.copy()
-                # if "origin_filename" in title_copy:
-                #    del title_copy["origin_filename"]
-                # final_titles_list.append(title_copy)
-                # Actually, keeping it might be useful for debugging, but let's keep it clean
-                
-                # For now just append the object, extra keys are ignored by frontend usually
-                final_titles_list.append(title)
-                last_filename = current_filename
-
-            theme_entry = {
-                "theme": theme_obj["name"],
-                "titles": final_titles_list
-            }
+            if key in reused:
+                theme_entry = reused[key]
+            else:
+                titles = []
+                for file_path, _ in theme_obj["files"]:
+                    titles.extend(fragments[file_path])
+                theme_entry = build_theme_entry(theme_obj["name"], titles)
+                if theme_entry:
+                    theme_entry = assign_theme_ids(volume_name, theme_entry)
+                if cache:
+                    paths = [path for path, _ in theme_obj["files"]]
+                    theme_entry = cache.store_theme(key, paths, theme_entry, [theme_obj["name"], ID_SCHEME])
+
+            if not theme_entry:
+                continue
             
             volume_data["themes"].append(theme_entry)
         
         data.append(volume_data)
 
+    return data
+
+def convert_to_json(jobs=1, full=False, verbose=False):
+    # The manifest next to OUTPUT_FILE lets unchanged themes skip parsing;
+    # full=True ignores it and rebuilds everything.
+    cache = BuildCache(OUTPUT_FILE, "generate_json", full=full, sources=BUILDER_SOURCES)
+    data = build_data(jobs, cache, verbose)
+
     # Write JSON output
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    cache.write_output(data)
 
     print(f"JSON generated at: {OUTPUT_FILE}")
 
+def main():
+    parser = argparse.ArgumentParser(description="Generate shin_college_data.json from the Markdown volumes.")
+    parser.add_argument("--jobs", type=int, default=1, help="Number of worker processes used to parse the Markdown files")
+    parser.add_argument("--full", action="store_true", help="Ignore the build manifest and reparse every file")
+    parser.add_argument("--verbose", action="store_true", help="Print every Markdown file that is picked or skipped")
+    args = parser.parse_args()
+
+    convert_to_json(jobs=args.jobs, full=args.full, verbose=args.verbose)
+
 if __name__ == "__main__":
-    convert_to_json()
+    main()
@@ -0,0 +1,266 @@
+"""
+Glossary of the structural fields (theme, title, source...).
+
+Every translator looks the text up here first; only misses go to the model.
+Keys are matched exactly, then by a normalized key (NFKC, no spaces or
+full-width spaces, no について), then with a trailing number split off:
+'真　理　１' -> THEMES['真理'] + ' 1' -> 'Verdade 1'.
+
+Titles that only hold inside one theme are kept in a table of their own,
+consulted when the caller passes the theme (title@<theme>).
+
+Extra entries can be kept in data/glossary.json, grouped by field:
+    {"source": {"明主様御教え": "..."}, "title": {...}, "title@御神体とお光": {...}}
+
+    python3 scripts/glossary.py 真　理　１ --field title
+"""
+
+import os
+import re
+import json
+import argparse
+import threading
+import unicodedata
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_GLOSSARY_PATH = os.path.join(PROJECT_ROOT, "data", "glossary.json")
+
+TRAILING_NUMBER = re.compile(r'^(.*?\D)(\d+)$')
+
+# Publications and books: kept in Romaji, not translated.
+# The source rules of the translation prompts are read from here.
+SOURCES = {
+    "明主様御教え": "Meishu-sama Mioshie",
+}
+
+# Themes (previously MANUAL_THEME_MAP in populate_structural_translations.py).
+# The theme rules of the translation prompts are read from here.
+THEMES = {
+    "序文": "Introdução",
+    "神と経綸": "Deus e o Plano Divino",
+    "霊主体従": "Espírito Precede a Matéria",
+    "霊界の構成": "Constituição do Mundo Espiritual",
+    "諸霊の活動": "Atuação dos Espíritos",
+    "夜昼転換と最後の審判": "Transição Noite-Dia e o Juízo Final",
+    "御神格": "Divindade",
+    "正神と邪神": "Deus Verdadeiro e Deus Maligno",
+    "祖霊祭祀": "Culto aos Antepassados", 
+    "浄霊の原理": "Princípio do Johrei",
+    "浄霊の方法": "Método de Johrei",
+    "浄化作用": "Ação de Purificação",
+    "三　毒": "Três Toxinas",
+    "病気の体的分析": "Análise Física da Doença",
+    "病気の霊的分析": "Análise Espiritual da Doença",
+    "現代医学批判": "Crítica à Medicina Moderna",
+    "神示の健康法": "Método de Saúde Revelado por Deus",
+    "自然農法": "Agricultura Natural",
+    "真理": "Verdade",
+    "幸福を生む宗教": "Religião que Gera Felicidade",
+    "信仰地獄": "Inferno da Fé",
+    "信仰生活の道標": "Guia da Vida de Fé",
+    "信仰と社会生活": "Fé e Vida Social",
+    "信仰と家庭生活": "Fé e Vida Familiar",
+    "罪と徳": "Pecado e Virtude",
+    "御神業の心得": "Atitude na Obra Divina",
+    "御神体とお光": "Imagem Sagrada e Luz Divina",
+    "明主様の御事跡": "Feitos de Meishu-Sama",
+    "地上天国の雛形建設": "Construção do Modelo do Paraíso Terrestre",
+    "外野の無理解": "Incompreensão de Terceiros", 
+    "宗教断片集": "Fragmentos Religiosos",
+    "森羅万象の解析": "Análise de Todas as Coisas",
+    "芸術について": "Sobre a Arte",
+    "時局について": "Sobre a Situação Atual",
+    "その他": "Outros"
+}
+
+# Titles of the 御神体とお光 theme (previously TRANSLATIONS in translate_missing_titles.py)
+GOSHINTAI_TITLES = {
+    "御神体の奇瑞": "Milagres do Goshintai",
+    "御神体と奇象": "Goshintai e Fenômenos Estranhos",
+    "御神体の意義": "Significado do Goshintai",
+    "御神体奉斎の意義": "Significado de Entronizar o Goshintai",
+    "御神体奉斎と薬毒病": "Entronização do Goshintai e Doenças por Toxinas de Remédios",
+    "御神体奉斎と知的障害": "Entronização do Goshintai e Deficiência Intelectual",
+    "御神体奉斎と精神病": "Entronização do Goshintai e Doenças Mentais",
+    "御神体奉斎と憑霊現象": "Entronização do Goshintai e Fenômenos de Possessão Espiritual",
+    "御神体奉斎と祟り": "Entronização do Goshintai e Encosto Espiritual (Tatari)",
+    "御神体奉斎と墓地、処刑場、社寺跡地": "Entronização do Goshintai e Cemitérios, Locais de Execução e Ruínas de Templos",
+    "御神体奉斎と罪": "Entronização do Goshintai e Pecado",
+    "御神体奉斎と墓供養の因縁": "Entronização do Goshintai e Afinidade com Sufrágio aos Túmulos",
+    "御神体奉斎と祖霊": "Entronização do Goshintai e Ancestrais",
+    "御神体奉斎と仏壇": "Entronização do Goshintai e Oratório Budista",
+    "御神体奉斎と神棚": "Entronização do Goshintai e Altar Xintoísta",
+    "御神体の取り扱い": "Manuseio do Goshintai",
+    "御神体の位置": "Posição do Goshintai",
+    "御神体と方位": "Goshintai e Direção",
+    "御神体の拝受": "Recebimento do Goshintai",
+    "御神体の汚損": "Danos e Sujeira no Goshintai",
+    "御神体の仮巻": "Montagem Provisória do Goshintai",
+    "御屏風観音様": "Biombo de Kannon",
+    "御写真": "Foto Sagrada (Goshashin)",
+    "お光": "Ohikari",
+    "お光の意義": "Significado do Ohikari",
+    "お光と奇瑞": "Ohikari e Milagres",
+    "お光と霊的現象": "Ohikari e Fenômenos Espirituais",
+    "お光の授与": "Outorga do Ohikari",
+    "お光の取り扱い": "Manuseio do Ohikari",
+    "お光と紛失": "Perda do Ohikari",
+    "お光と紐": "Ohikari e o Cordão",
+    "お光と袋": "Ohikari e o Saquinho",
+    "お守り": "Omamori (Amuleto)",
+    "お屏風観音様": "Biombo de Kannon",
+    "御神体奉斎による浄化": "Purificação pela Entronização do Goshintai",
+    "御書体": "Goshotai",
+    "御書体の作法": "Etiqueta do Goshotai",
+    "御書体の奇瑞": "Milagres do Goshotai",
+    "明主様の御写真": "Foto Sagrada de Meishu-Sama",
+    "お光の奇瑞": "Milagres do Ohikari",
+    "お光の作法": "Etiqueta do Ohikari",
+    "お光に対する粗相": "Descuido com o Ohikari",
+    "お光の企画案": "Projetos sobre o Ohikari",
+    "お光の忌避": "Evitar o Ohikari",
+    "妊婦の御腹帯": "Cinta para Grávidas (Obi)",
+    "御霊紙": "Papel Espiritual (Mitama-gami)",
+    "御神体奉斎と前世の因縁": "Entronização do Goshintai e Afinidade de Vidas Passadas",
+    "御神体奉斎の時期": "Época da Entronização do Goshintai",
+    "御神体奉斎と家族の反対": "Entronização do Goshintai e Oposição da Família",
+    "御神体奉斎の場所": "Local da Entronização do Goshintai",
+    "御神体奉斎の規矩": "Normas da Entronização do Goshintai",
+    "御神体の再奉斎": "Reentronização do Goshintai",
+    "御神体の作法": "Etiqueta do Goshintai",
+    "御神体の献饌": "Oferendas ao Goshintai",
+    "御神体に対する粗相": "Descuido com o Goshintai",
+    "御神体の御焼却": "Queima do Goshintai",
+    "御神体の譲渡等": "Transferência do Goshintai, etc.",
+    "御神体と他の仏像等": "Goshintai e Outras Imagens Budistas, etc.",
+    "御神体奉斎による発狂": "Loucura causada pela Entronização do Goshintai"
+}
+
+# Title tables that only apply inside one theme
+THEME_TITLES = {
+    "御神体とお光": GOSHINTAI_TITLES,
+}
+
+# Numbered titles whose translation differs from "<base> <n>"
+# (previously MANUAL_TITLE_MAP in populate_structural_translations.py)
+NUMBERED_TITLES = {
+    "御神体の奇瑞１": "Milagres da Imagem Divina 1",
+    "御神体の奇瑞２": "Milagres da Imagem Divina 2",
+    "御神体の奇瑞について１": "Milagres da Imagem Divina 1",
+    "御神体の奇瑞について２": "Milagres da Imagem Divina 2"
+}
+
+# Lookup order per field; themes and titles share names ('真理' / '真　理　１').
+# publication_title is left to the model: it keeps the original in parentheses.
+FIELD_TABLES = {
+    "theme": ["theme", "title"],
+    "title": ["title", "theme"],
+    "source": ["source"],
+    "volume": ["volume"],
+}
+
+
+def normalize_key(text):
+    """NFKC, without whitespace (incl. full-width) and without 'について'."""
+    text = unicodedata.normalize('NFKC', text)
+    text = re.sub(r'\s+', '', text)
+    return text.replace('について', '')
+
+
+class Glossary:
+    """
+        glossary = load_glossary()
+        glossary.lookup("真　理　１", "title")   # -> 'Verdade 1'
+        glossary.lookup("お光の意義", "title", theme="御神体とお光")
+        glossary.lookup("未知の題", "title")     # -> None (ask the model)
+    """
+
+    def __init__(self, tables):
+        self.tables = {field: dict(entries) for field, entries in tables.items()}
+        self.normalized = {
+            field: {normalize_key(k): v for k, v in entries.items()}
+            for field, entries in self.tables.items()
+        }
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _find(self, text, fields):
+        for field in fields:
+            if text in self.tables.get(field, {}):
+                return self.tables[field][text]
+
+        key = normalize_key(text)
+        if not key:
+            return None
+        for field in fields:
+            if key in self.normalized.get(field, {}):
+                return self.normalized[field][key]
+
+        # '真理1' -> '真理' + ' 1'
+        match = TRAILING_NUMBER.match(key)
+        if match:
+            base, number = match.groups()
+            for field in fields:
+                if base in self.normalized.get(field, {}):
+                    return f"{self.normalized[field][base]} {int(number)}"
+        return None
+
+    def lookup(self, text, field_type, theme=None):
+        """
+        Translation of text for field_type, or None if it is not in the
+        glossary. Titles look in the table of their theme first.
+        """
+        fields = FIELD_TABLES.get(field_type)
+        if not fields or not text or not isinstance(text, str):
+            return None
+        if theme and field_type == "title":
+            fields = [f"title@{theme}"] + fields
+
+        result = self._find(text.strip(), fields)
+        with self.lock:
+            self.stats["hits" if result else "misses"] += 1
+        return result
+
+    def report(self):
+        s = self.stats
+        print(f"Glossary: {s['hits']} hits, {s['misses']} misses.")
+
+
+def load_glossary(path=DEFAULT_GLOSSARY_PATH):
+    """Built-in tables plus the entries of the JSON file at path, if it exists."""
+    tables = {
+        "theme": dict(THEMES),
+        "title": dict(NUMBERED_TITLES),
+        "source": dict(SOURCES),
+    }
+    for theme, titles in THEME_TITLES.items():
+        tables[f"title@{theme}"] = dict(titles)
+
+    if path and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            extra = json.load(f)
+        for field, entries in extra.items():
+            tables.setdefault(field, {}).update(entries)
+
+    return Glossary(tables)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Look up structural translations in the glossary.")
+    parser.add_argument("text", nargs="*", help="Japanese text to look up")
+    parser.add_argument("--field", default="title", help="Field type (theme, title, source, volume)")
+    parser.add_argument("--theme", default=None, help="Theme of the title (for theme-scoped titles)")
+    parser.add_argument("--glossary", default=DEFAULT_GLOSSARY_PATH, help="Extra glossary JSON file")
+    args = parser.parse_args()
+
+    glossary = load_glossary(args.glossary)
+    if not args.text:
+        for field, entries in sorted(glossary.tables.items()):
+            print(f"{field}: {len(entries)} entries")
+        return
+
+    for text in args.text:
+        print(f"{text} -> {glossary.lookup(text, args.field, args.theme)}")
+
+if __name__ == "__main__":
+    main()
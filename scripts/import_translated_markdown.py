@@ -5,6 +5,9 @@ import os
 import glob
 from datetime import datetime
 
+from japanese_dates import parse_japanese_date
+from japanese_text import has_japanese
+
 # Configuration
 JSON_PATH = "/Users/michael/Documents/Ensinamentos/Sites/ShinCollege_Pt/data/shin_college_data_translated.json"
 MARKDOWN_DIR = "/Users/michael/Documents/Ensinamentos/Sites/ShinCollege_Pt/TranslatedMarkdown"
@@ -23,46 +26,6 @@ MONTH_MAP = {
     'julho': 7, 'agosto': 8, 'setembro': 9, 'outubro': 10, 'novembro': 11, 'dezembro': 12
 }
 
-def has_japanese_chars(text):
-    return any('\u3000' <= char <= '\u9fff' for char in text)
-
-def parse_japanese_date(date_str):
-    """
-    Parses strings like '昭和10年2月4日発行' to (1935, 2, 4)
-    Returns tuple (year, month, day) or None
-    """
-    if not date_str:
-        return None
-    
-    # Remove '発行' or similar tails
-    clean_str = re.sub(r'発行.*', '', date_str).strip()
-    
-    # Match patterns like 昭和10年2月4日
-    match = re.match(r'(昭和|大正|明治|平成|令和)(\d{1,2}|元)年(\d{1,2})月(\d{1,2})日', clean_str)
-    if not match:
-        return None
-        
-    era, era_year, month, day = match.groups()
-    if era_year == '元':
-        year_num = 1
-    else:
-        year_num = int(era_year)
-        
-    if era == '昭和':
-        year = 1925 + year_num
-    elif era == '大正':
-        year = 1911 + year_num
-    elif era == '明治':
-        year = 1867 + year_num
-    elif era == '平成':
-        year = 1988 + year_num
-    elif era == '令和':
-        year = 2018 + year_num
-    else:
-        return None
-        
-    return (year, int(month), int(day))
-
 def parse_portuguese_date(text):
     """
     Finds date in text like '... 5 de setembro de 1948 ...'
@@ -129,10 +92,10 @@ def extract_markdown_entries(file_path):
                 part1 = title_match.group(1).strip('"“').strip()
                 part2 = title_match.group(2).strip('"“').strip()
                 
-                if has_japanese_chars(part1):
+                if has_japanese(part1):
                     current_entry['jp_title'] = part1
                     current_entry['pt_title'] = part2
-                elif has_japanese_chars(part2):
+                elif has_japanese(part2):
                     current_entry['jp_title'] = part2
                     current_entry['pt_title'] = part1
                 else:
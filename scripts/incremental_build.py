@@ -0,0 +1,292 @@
+"""
+Fingerprint-driven cache for the scripts that rebuild shin_college_data.json
+(generate_json.py, merge_translations.step4_regenerate_main_json and
+publish_translations.publish_to_main_json).
+
+Next to the output it keeps:
+    <output>.manifest.json   (path, size, mtime, sha256) of every input, plus
+                             the signature of every theme built from them
+    <output>.cache/          parsed per-file fragments and the already
+                             serialized JSON text of every theme
+
+Unchanged inputs are not re-read or re-parsed, unchanged themes are not
+re-serialized: their cached text is spliced into the output as is.
+
+The manifest also records the sha256 of the builder's own code (the
+sources it passes, plus this file). When that code changes, the cached
+fragments and themes are dropped and everything is rebuilt.
+"""
+
+import os
+import json
+import hashlib
+
+MANIFEST_VERSION = 1
+MANIFEST_SUFFIX = ".manifest.json"
+CACHE_SUFFIX = ".cache"
+
+# Stand-in for a theme inside the JSON skeleton, replaced by its cached text.
+PLACEHOLDER_PREFIX = "\x00theme:"
+
+
+def hash_file(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def hash_text(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def code_signature(sources):
+    """sha256 over the given source files and this module: changes when the parsing code does."""
+    paths = [os.path.abspath(p) for p in sources] + [os.path.abspath(__file__)]
+    members = [[os.path.basename(p), hash_file(p)] for p in sorted(set(paths))]
+    return hash_text(json.dumps(members))
+
+
+def indent_text(text, indent):
+    """Indents every line but the first, so a dumped object can be nested."""
+    return text.replace('\n', '\n' + indent)
+
+
+class BuildCache:
+    """
+    Usage:
+        cache = BuildCache(OUTPUT_FILE, "generate_json", sources=BUILDER_SOURCES)
+        fragment = cache.fragment(path)          # None if path changed
+        ...
+        placeholder = cache.theme(key, paths)    # None if theme must be rebuilt
+        placeholder = cache.store_theme(key, paths, theme_obj)
+        cache.write_output(skeleton)             # skeleton holds placeholders
+    """
+
+    def __init__(self, output_file, builder, full=False, sources=()):
+        self.output_file = output_file
+        self.builder = builder
+        self.code = code_signature(sources)
+        self.base_dir = os.path.dirname(os.path.abspath(output_file))
+        self.manifest_path = output_file + MANIFEST_SUFFIX
+        self.cache_dir = output_file + CACHE_SUFFIX
+
+        old = {}
+        if not full and os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    old = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Warning: ignoring unreadable manifest {self.manifest_path}: {e}")
+                old = {}
+            if old.get("version") != MANIFEST_VERSION or old.get("builder") != builder:
+                old = {}
+            elif old.get("code") != self.code:
+                print("Builder code changed since the last build: rebuilding everything.")
+                old = {}
+
+        self.old_files = old.get("files", {})
+        self.old_themes = old.get("themes", {})
+
+        self.files = {}
+        self.themes = {}
+        self.theme_texts = {}
+        self.stats = {
+            "files_reused": 0,
+            "files_changed": 0,
+            "themes_reused": 0,
+            "themes_rebuilt": 0,
+        }
+
+    # --- Inputs ---
+
+    def _key(self, path):
+        return os.path.relpath(os.path.abspath(path), self.base_dir)
+
+    def _record(self, path):
+        """Returns the current manifest record of path, hashing it only if size/mtime moved."""
+        key = self._key(path)
+        if key in self.files:
+            return self.files[key]
+
+        st = os.stat(path)
+        previous = self.old_files.get(key)
+        if previous and previous["size"] == st.st_size and previous["mtime_ns"] == st.st_mtime_ns:
+            record = dict(previous)
+        else:
+            sha256 = hash_file(path)
+            if previous and previous["sha256"] == sha256:
+                # Touched but not modified
+                record = dict(previous, mtime_ns=st.st_mtime_ns)
+            else:
+                record = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha256}
+
+        if previous and previous["sha256"] == record["sha256"]:
+            self.stats["files_reused"] += 1
+        else:
+            self.stats["files_changed"] += 1
+        self.files[key] = record
+        return record
+
+    def sha256(self, path):
+        return self._record(path)["sha256"]
+
+    def meta(self, path):
+        """Small per-file values stored in the manifest (e.g. volume/theme names), or None."""
+        return self._record(path).get("meta")
+
+    def set_meta(self, path, meta):
+        self._record(path)["meta"] = meta
+
+    def fragment(self, path):
+        """Cached parse result of an unchanged file, or None."""
+        record = self._record(path)
+        fragment_file = record.get("fragment")
+        if not fragment_file:
+            return None
+        try:
+            with open(os.path.join(self.cache_dir, fragment_file), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            record.pop("fragment", None)
+            return None
+
+    def store_fragment(self, path, fragment):
+        record = self._record(path)
+        fragment_file = f"{record['sha256']}.fragment.json"
+        self._write_cache_file(fragment_file, json.dumps(fragment, ensure_ascii=False))
+        record["fragment"] = fragment_file
+
+    # --- Themes ---
+
+    def _signature(self, paths, extra=None):
+        members = [[self._key(p), self.sha256(p)] for p in paths]
+        return hash_text(json.dumps([members, extra], ensure_ascii=False))
+
+    def theme(self, key, paths, extra=None):
+        """
+        Returns a placeholder for an unchanged theme, False for an unchanged theme
+        that produced no output, or None when the theme has to be rebuilt.
+        """
+        signature = self._signature(paths, extra)
+        previous = self.old_themes.get(key)
+        if not previous or previous["signature"] != signature:
+            return None
+
+        text_file = previous.get("text")
+        if text_file is None:
+            self.themes[key] = previous
+            self.stats["themes_reused"] += 1
+            return False
+
+        try:
+            with open(os.path.join(self.cache_dir, text_file), 'r', encoding='utf-8') as f:
+                text = f.read()
+        except OSError:
+            return None
+
+        self.themes[key] = previous
+        self.stats["themes_reused"] += 1
+        return self._placeholder(key, text)
+
+    def store_theme(self, key, paths, theme_obj, extra=None):
+        """Serializes a rebuilt theme (None = theme skipped) and returns its placeholder."""
+        signature = self._signature(paths, extra)
+        self.stats["themes_rebuilt"] += 1
+
+        if theme_obj is None:
+            self.themes[key] = {"signature": signature, "text": None}
+            return False
+
+        text = json.dumps(theme_obj, ensure_ascii=False, indent=2)
+        text_file = f"{hash_text(key + signature)}.theme.json"
+        self._write_cache_file(text_file, text)
+        self.themes[key] = {"signature": signature, "text": text_file}
+        return self._placeholder(key, text)
+
+    def _placeholder(self, key, text):
+        placeholder = f"{PLACEHOLDER_PREFIX}{len(self.theme_texts)}"
+        self.theme_texts[json.dumps(placeholder)] = text
+        return placeholder
+
+    # --- Output ---
+
+    def render(self, skeleton):
+        """Dumps the skeleton with indent=2 and splices the theme texts in place of the placeholders."""
+        lines = json.dumps(skeleton, ensure_ascii=False, indent=2).split('\n')
+        out = []
+        for line in lines:
+            stripped = line.lstrip(' ')
+            token = stripped[:-1] if stripped.endswith(',') else stripped
+            text = self.theme_texts.get(token)
+            if text is None:
+                out.append(line)
+                continue
+            indent = line[:len(line) - len(stripped)]
+            out.append(indent + indent_text(text, indent) + stripped[len(token):])
+        return '\n'.join(out)
+
+    def write_output(self, skeleton):
+        """Writes the output only if its content changed, then saves the manifest."""
+        text = self.render(skeleton)
+        output_sha256 = hash_text(text)
+
+        unchanged = (
+            os.path.exists(self.output_file)
+            and os.path.getsize(self.output_file) == len(text.encode('utf-8'))
+            and hash_file(self.output_file) == output_sha256
+        )
+        if not unchanged:
+            temp_file = self.output_file + ".tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(temp_file, self.output_file)
+
+        self.save(output_sha256)
+        self.report(unchanged)
+        return not unchanged
+
+    def save(self, output_sha256):
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "builder": self.builder,
+            "code": self.code,
+            "output_sha256": output_sha256,
+            "files": self.files,
+            "themes": self.themes,
+        }
+        temp_file = self.manifest_path + ".tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(temp_file, self.manifest_path)
+        self._collect_garbage()
+
+    def report(self, unchanged):
+        s = self.stats
+        print(f"Incremental build: {s['files_reused']} inputs unchanged, {s['files_changed']} changed; "
+              f"{s['themes_reused']} themes reused, {s['themes_rebuilt']} rebuilt.")
+        if unchanged:
+            print(f"Output unchanged, {self.output_file} not rewritten.")
+
+    # --- Cache files ---
+
+    def _write_cache_file(self, name, text):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir, name)
+        if os.path.exists(path):
+            return
+        temp_file = path + ".tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(temp_file, path)
+
+    def _collect_garbage(self):
+        """Removes cache files no longer referenced by the manifest."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        referenced = {r["fragment"] for r in self.files.values() if r.get("fragment")}
+        referenced |= {t["text"] for t in self.themes.values() if t.get("text")}
+        for name in os.listdir(self.cache_dir):
+            if name not in referenced:
+                os.remove(os.path.join(self.cache_dir, name))
@@ -0,0 +1,145 @@
+"""
+Japanese era dates (昭和10年5月21日発行 etc.) without calling the model.
+"""
+
+import re
+import datetime
+
+# Gregorian year = offset + era year
+ERA_OFFSETS = {
+    '明治': 1867,
+    '大正': 1911,
+    '昭和': 1925,
+    '平成': 1988,
+    '令和': 2018,
+}
+
+# Last year of each era (None: current era)
+ERA_LAST_YEARS = {
+    '明治': 45,
+    '大正': 15,
+    '昭和': 64,
+    '平成': 31,
+    '令和': None,
+}
+
+# Lowercase, as in the existing date_ptbr values ('23 de julho de 1949')
+MONTHS_PT = [
+    'janeiro', 'fevereiro', 'março', 'abril', 'maio', 'junho',
+    'julho', 'agosto', 'setembro', 'outubro', 'novembro', 'dezembro'
+]
+
+FULLWIDTH_DIGITS = str.maketrans('０１２３４５６７８９', '0123456789')
+KANJI_DIGITS = {'〇': 0, '一': 1, '二': 2, '三': 3, '四': 4, '五': 5, '六': 6, '七': 7, '八': 8, '九': 9}
+
+NUMBER = r'(\d{1,2}|元|[〇一二三四五六七八九十]{1,3})'
+
+# 昭和10年 / 昭和10年5月 / 昭和10年5月21日 / 昭和24年11・12月 (+ 発行)
+DATE_PATTERN = re.compile(
+    r'^(明治|大正|昭和|平成|令和)' + NUMBER + r'年'
+    r'(?:' + NUMBER + r'(?:・' + NUMBER + r')?月'
+    r'(?:' + NUMBER + r'日?)?)?'
+    r'\s*(?:発行)?$'
+)
+
+
+def to_int(value):
+    """'10', '１０', '元', '二十五' -> int (None if not a number)."""
+    if value is None:
+        return None
+    if value == '元':
+        return 1
+    if value.isdigit():
+        return int(value)
+    if '十' in value:
+        tens, _, units = value.partition('十')
+        return (KANJI_DIGITS.get(tens, 0) if tens else 1) * 10 + (KANJI_DIGITS.get(units, 0) if units else 0)
+    if len(value) == 1 and value in KANJI_DIGITS:
+        return KANJI_DIGITS[value]
+    return None
+
+
+def era_to_year(era, era_year):
+    """Gregorian year, or None for an unknown era or a year outside it (昭和70年)."""
+    offset = ERA_OFFSETS.get(era)
+    if offset is None or not era_year:
+        return None
+    last = ERA_LAST_YEARS.get(era)
+    if last is not None and era_year > last:
+        return None
+    return offset + era_year
+
+
+def parse_japanese_date(date_str):
+    """
+    Parses strings like '昭和10年2月4日発行' to (1935, 2, 4)
+    Returns tuple (year, month, day) or None
+    """
+    if not date_str:
+        return None
+
+    # Remove '発行' or similar tails
+    clean_str = re.sub(r'発行.*', '', date_str).strip()
+
+    # Match patterns like 昭和10年2月4日
+    match = re.match(r'(昭和|大正|明治|平成|令和)(\d{1,2}|元)年(\d{1,2})月(\d{1,2})日', clean_str)
+    if not match:
+        return None
+
+    era, era_year, month, day = match.groups()
+    year = era_to_year(era, to_int(era_year))
+    if year is None:
+        return None
+
+    return (year, int(month), int(day))
+
+
+def format_day(day):
+    return '1º' if day == 1 else str(day)
+
+
+def convert_japanese_date(text):
+    """
+    Converts a Japanese era date to the PT-BR format used by the translations.
+    '昭和10年5月21日発行' -> '21 de maio de 1935'
+    '昭和25年2月'         -> 'fevereiro de 1950'
+    '昭和24年11・12月'    -> 'novembro e dezembro de 1949'
+    '昭和23年'            -> '1948'
+    Returns None for anything else (e.g. '昭和27年御執筆', '昭和10年2月31日'),
+    which still goes to the model.
+    """
+    if not text or not isinstance(text, str):
+        return None
+
+    clean = text.strip().translate(FULLWIDTH_DIGITS).replace(' ', '').replace('　', '')
+    match = DATE_PATTERN.match(clean)
+    if not match:
+        return None
+
+    era, era_year, month, month_end, day = match.groups()
+    year = era_to_year(era, to_int(era_year))
+    if year is None:
+        return None
+
+    if month is None:
+        return str(year)
+
+    month = to_int(month)
+    if not month or not 1 <= month <= 12:
+        return None
+
+    if month_end is not None:
+        month_end = to_int(month_end)
+        if day is not None or not month_end or not month < month_end <= 12:
+            return None
+        return f"{MONTHS_PT[month - 1]} e {MONTHS_PT[month_end - 1]} de {year}"
+
+    if day is None:
+        return f"{MONTHS_PT[month - 1]} de {year}"
+
+    day = to_int(day)
+    try:
+        datetime.date(year, month, day or 0)
+    except ValueError:
+        return None
+    return f"{format_day(day)} de {MONTHS_PT[month - 1]} de {year}"
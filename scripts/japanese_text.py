@@ -0,0 +1,30 @@
+"""
+Detection of Japanese text (kana and kanji).
+
+translate_full_json.py tested `any(ord(c) > 0x2E80 for c in text)` and
+import_translated_markdown.py `any('\\u3000' <= c <= '\\u9fff' ...)`, one
+Python comparison per character over whole publication bodies. One
+compiled character class does it in C and stops at the first match.
+Punctuation (、。「」), the ideographic space and full-width Latin letters
+and digits do not count: a text made only of them needs no translation.
+"""
+
+import re
+
+JAPANESE_PATTERN = re.compile(
+    '['
+    '\u2e80-\u2fdf'     # CJK and Kangxi radicals
+    '\u3005-\u3007'     # 々 〆 〇
+    '\u3040-\u30ff'     # hiragana, katakana
+    '\u31f0-\u31ff'     # katakana phonetic extensions
+    '\u3400-\u4dbf'     # CJK extension A
+    '\u4e00-\u9fff'     # CJK unified ideographs
+    '\uf900-\ufaff'     # CJK compatibility ideographs
+    '\uff66-\uff9f'     # half-width katakana
+    ']'
+)
+
+
+def has_japanese(text):
+    """True if text (a str) holds at least one kana or kanji."""
+    return isinstance(text, str) and JAPANESE_PATTERN.search(text) is not None
@@ -0,0 +1,479 @@
+"""
+Local job queue for the translation of the part files (SQLite).
+
+The part workflow was manual: pick a _parteNN.json, translate it, drop
+the "* copy.json" next to it, run merge_translations.py. Jobs now live
+in data/jobs.sqlite and any number of worker processes pull from it:
+
+    part          translate a whole part into <part>_pt.json (in partes/)
+    publication   (re)translate one publication inside an existing _pt.json
+
+    priority 0    untranslated: parts without _pt.json, publications without content_ptbr
+    priority 1    stale: the Japanese content changed after the _pt.json was made
+    priority 2    quality re-runs, enqueued by hand (translated again; the new text replaces the cached one)
+
+A worker leases one job at a time (LEASE_SECONDS, renewed while it
+runs); jobs of a part whose file is leased by another worker are not
+handed out, so two workers never write the same _pt.json. A lease that
+expires (worker killed) makes the job available again, and a worker
+that lost its lease does not write. Failed jobs are retried with the
+backoff of failure_queue.py until MAX_ATTEMPTS. Translations go through
+the shared translation cache, so a retried part only pays for what was
+not translated yet.
+
+    python3 scripts/job_queue.py scan                      # enqueue from partes/ and bkp/
+    python3 scripts/job_queue.py enqueue --quality "*_浄霊の方法_parte0[1-3].json"
+    python3 scripts/job_queue.py worker [--fake-model] [--rpm 30]   # one per process
+    python3 scripts/job_queue.py status
+    python3 scripts/job_queue.py requeue                   # failed -> pending
+"""
+
+import os
+import json
+import time
+import fnmatch
+import asyncio
+import sqlite3
+import argparse
+
+from failure_queue import backoff, classify
+from japanese_text import has_japanese
+from translation_cache import PROJECT_ROOT
+from translation_journal import write_json_atomic
+
+DEFAULT_QUEUE_PATH = os.path.join(PROJECT_ROOT, "data", "jobs.sqlite")
+TEMAS_DIR = os.path.join(PROJECT_ROOT, "data", "temasSeparados")
+PARTES_DIR = os.path.join(TEMAS_DIR, "partes")
+BKP_DIR = os.path.join(TEMAS_DIR, "bkp")
+
+PRIORITY_UNTRANSLATED = 0
+PRIORITY_STALE = 1
+PRIORITY_QUALITY = 2
+
+LEASE_SECONDS = 600
+MAX_ATTEMPTS = 5
+# Seconds an idle worker waits before asking again (--wait)
+IDLE_POLL = 30
+
+# Publication fields translated by the workers (field type = key)
+PUB_FIELDS = ("title", "publication_title", "content")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    part TEXT NOT NULL,
+    pub_key TEXT NOT NULL DEFAULT '',
+    priority INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    not_before REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    UNIQUE (kind, part, pub_key)
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (state, priority, id);
+"""
+
+
+def pt_name(part):
+    return part[:-len(".json")] + "_pt.json"
+
+
+def find_file(name, directories=(PARTES_DIR, BKP_DIR)):
+    for directory in directories:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def load_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def pub_key(pub, index):
+    """Stable key of a part publication: its ID, else its position in the part."""
+    return pub.get("id") or f"#{index}"
+
+
+def find_pub(pubs, orig_pub, index):
+    """Index in pubs (a _pt.json) of the translation of orig_pub, found by ID, then pub_idx; or None."""
+    if orig_pub.get("id"):
+        for i, pub in enumerate(pubs):
+            if pub.get("id") == orig_pub["id"]:
+                return i
+    for i, pub in enumerate(pubs):
+        if str(pub.get("pub_idx", i)) == str(orig_pub.get("pub_idx", index)) and \
+                str(pub.get("title_idx", "")) == str(orig_pub.get("title_idx", "")):
+            return i
+    return None
+
+
+def same_text(a, b):
+    return "".join((a or "").split()) == "".join((b or "").split())
+
+
+def describe(error):
+    """'reason: message' of a failed job; TranslationFailed messages already start with their reason."""
+    reason, text = classify(error), str(error)
+    if not text or text == reason or text.startswith(f"{reason}: "):
+        return text or reason
+    return f"{reason}: {text}"
+
+
+class JobQueue:
+    """
+    Usage:
+        queue = JobQueue()
+        queue.add("part", part_name, priority=PRIORITY_UNTRANSLATED)
+        job = queue.lease(owner)           # None when nothing is ready
+        queue.renew(job, owner)            # False once the lease is lost
+        queue.complete(job, owner) / queue.fail(job, owner, error)
+    """
+
+    def __init__(self, path=DEFAULT_QUEUE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # isolation_level=None: transactions are explicit (BEGIN IMMEDIATE),
+        # which serializes the lease of several worker processes
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def add(self, kind, part, pub=None, priority=PRIORITY_UNTRANSLATED):
+        """
+        Enqueues a job. A done or failed job of the same part/publication
+        becomes pending again; a pending one only moves up in priority.
+        Returns True if the job is new or reopened.
+        """
+        now = time.time()
+        cursor = self.conn.execute("""
+            INSERT INTO jobs (kind, part, pub_key, priority, created, updated) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (kind, part, pub_key) DO UPDATE SET
+                state = CASE WHEN state IN ('done', 'failed') THEN 'pending' ELSE state END,
+                attempts = CASE WHEN state IN ('done', 'failed') THEN 0 ELSE attempts END,
+                not_before = CASE WHEN state IN ('done', 'failed') THEN 0 ELSE not_before END,
+                priority = CASE WHEN state IN ('done', 'failed') THEN excluded.priority
+                                ELSE MIN(priority, excluded.priority) END,
+                updated = excluded.updated
+            WHERE state IN ('done', 'failed') OR priority > excluded.priority
+        """, (kind, part, pub or "", priority, now, now))
+        return cursor.rowcount > 0
+
+    def lease(self, owner, now=None):
+        """Leases the next ready job (lowest priority, oldest first) of a part nobody holds. Returns a dict or None."""
+        now = time.time() if now is None else now
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute("""
+                SELECT * FROM jobs AS j
+                WHERE (j.state = 'pending' OR (j.state = 'leased' AND j.lease_expires < :now))
+                  AND j.not_before <= :now
+                  AND NOT EXISTS (SELECT 1 FROM jobs AS o WHERE o.part = j.part AND o.id != j.id
+                                  AND o.state = 'leased' AND o.lease_expires >= :now)
+                ORDER BY j.priority, j.id LIMIT 1
+            """, {"now": now}).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            self.conn.execute("""
+                UPDATE jobs SET state = 'leased', lease_owner = ?, lease_expires = ?,
+                       attempts = attempts + 1, updated = ? WHERE id = ?
+            """, (owner, now + LEASE_SECONDS, now, row["id"]))
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        job = dict(row)
+        job["attempts"] += 1
+        return job
+
+    def renew(self, job, owner):
+        """Extends the lease. False if it expired and another worker took the job."""
+        now = time.time()
+        cursor = self.conn.execute(
+            "UPDATE jobs SET lease_expires = ?, updated = ? WHERE id = ? AND state = 'leased' AND lease_owner = ?",
+            (now + LEASE_SECONDS, now, job["id"], owner)
+        )
+        return cursor.rowcount > 0
+
+    def complete(self, job, owner):
+        self.conn.execute(
+            "UPDATE jobs SET state = 'done', lease_owner = NULL, lease_expires = NULL, last_error = NULL, updated = ? "
+            "WHERE id = ? AND lease_owner = ?", (time.time(), job["id"], owner)
+        )
+
+    def fail(self, job, owner, error):
+        """Back to pending after the failure_queue backoff, or failed after MAX_ATTEMPTS."""
+        now = time.time()
+        state = "failed" if job["attempts"] >= MAX_ATTEMPTS else "pending"
+        self.conn.execute(
+            "UPDATE jobs SET state = ?, lease_owner = NULL, lease_expires = NULL, not_before = ?, "
+            "last_error = ?, updated = ? WHERE id = ? AND lease_owner = ?",
+            (state, now + backoff(classify(error), job["attempts"]), describe(error)[:500],
+             now, job["id"], owner)
+        )
+        return state
+
+    def requeue_failed(self):
+        return self.conn.execute(
+            "UPDATE jobs SET state = 'pending', attempts = 0, not_before = 0, updated = ? WHERE state = 'failed'",
+            (time.time(),)
+        ).rowcount
+
+    def counts(self):
+        """{(state, priority): count}"""
+        return {(row[0], row[1]): row[2] for row in self.conn.execute(
+            "SELECT state, priority, COUNT(*) FROM jobs GROUP BY state, priority")}
+
+    def failed(self):
+        return [dict(row) for row in self.conn.execute(
+            "SELECT * FROM jobs WHERE state = 'failed' ORDER BY priority, id")]
+
+    def close(self):
+        self.conn.close()
+
+
+# --- Scan ---
+
+def scan(queue, directories=(PARTES_DIR, BKP_DIR)):
+    """
+    Enqueues the parts without a _pt.json, and the publications of the
+    existing _pt.json files that are missing or stale. Returns {kind: jobs added}.
+    """
+    added = {"part": 0, "publication": 0}
+    originals = {}
+    for directory in directories:
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".json") and not name.endswith("_pt.json") and "_parte" in name:
+                originals.setdefault(name, os.path.join(directory, name))
+
+    for name, path in sorted(originals.items()):
+        pt_path = find_file(pt_name(name), directories)
+        try:
+            orig_pubs = load_json(path).get("publications", [])
+            pt_pubs = load_json(pt_path).get("publications", []) if pt_path else None
+        except (OSError, ValueError) as e:
+            print(f"  ⚠ {name}: {e}")
+            continue
+
+        if pt_pubs is None:
+            if any(has_japanese(pub.get("content")) for pub in orig_pubs):
+                added["part"] += queue.add("part", name, priority=PRIORITY_UNTRANSLATED)
+            continue
+
+        for index, orig_pub in enumerate(orig_pubs):
+            if not has_japanese(orig_pub.get("content")):
+                continue
+            found = find_pub(pt_pubs, orig_pub, index)
+            pt_pub = pt_pubs[found] if found is not None else {}
+            if not pt_pub.get("content_ptbr"):
+                priority = PRIORITY_UNTRANSLATED
+            elif pt_pub.get("content") and not same_text(pt_pub["content"], orig_pub["content"]):
+                priority = PRIORITY_STALE
+            else:
+                continue
+            added["publication"] += queue.add("publication", name, pub_key(orig_pub, index), priority)
+    return added
+
+
+# --- Worker ---
+
+async def translate_pub(model, pub, cache, theme=None):
+    """
+    Translates the PUB_FIELDS of pub into their _ptbr keys; theme is the JP
+    theme_name of its part (theme-scoped glossary titles). Raises the first
+    field error.
+    """
+    from translate_full_json import translate_text
+
+    keys = [key for key in PUB_FIELDS if has_japanese(pub.get(key))]
+    results = await asyncio.gather(
+        *(translate_text(model, pub[key], field_type=key, cache=cache, title=pub.get("publication_title"),
+                         theme=theme)
+          for key in keys),
+        return_exceptions=True
+    )
+    for key, result in zip(keys, results):
+        if isinstance(result, Exception):
+            raise result
+        pub[f"{key}_ptbr"] = result
+    pub["has_translation"] = bool(pub.get("content_ptbr"))
+    return pub
+
+
+async def run_part_job(job, model, cache):
+    """Translation of a whole part: returns (path of the _pt.json, data)."""
+    path = find_file(job["part"])
+    if path is None:
+        raise FileNotFoundError(job["part"])
+    data = load_json(path)
+    pt_path = find_file(pt_name(job["part"])) or os.path.join(PARTES_DIR, pt_name(job["part"]))
+
+    if has_japanese(data.get("theme_name")) and not data.get("theme_name_ptbr"):
+        from translate_full_json import translate_text
+        data["theme_name_ptbr"] = await translate_text(model, data["theme_name"], field_type="theme", cache=cache)
+    await asyncio.gather(*(translate_pub(model, pub, cache, data.get("theme_name"))
+                           for pub in data.get("publications", [])))
+    return pt_path, data
+
+
+async def run_publication_job(job, model, cache):
+    """Translation of one publication inside the existing _pt.json: returns (its path, data)."""
+    path = find_file(job["part"])
+    pt_path = find_file(pt_name(job["part"]))
+    if path is None or pt_path is None:
+        raise FileNotFoundError(pt_name(job["part"]))
+    orig = load_json(path)
+    orig_pubs = orig.get("publications", [])
+    data = load_json(pt_path)
+    pt_pubs = data.setdefault("publications", [])
+
+    for index, orig_pub in enumerate(orig_pubs):
+        if pub_key(orig_pub, index) == job["pub_key"]:
+            break
+    else:
+        raise KeyError(f"{job['pub_key']} not in {job['part']}")
+
+    translated = await translate_pub(model, dict(orig_pub), cache, orig.get("theme_name"))
+    found = find_pub(pt_pubs, orig_pub, index)
+    if found is None:
+        pt_pubs.insert(min(index, len(pt_pubs)), translated)
+    else:
+        pt_pubs[found] = translated
+    return pt_path, data
+
+
+async def lease_keeper(queue, job, owner, lost):
+    """Renews the lease every third of LEASE_SECONDS; sets lost if another worker took it."""
+    while True:
+        await asyncio.sleep(LEASE_SECONDS / 3)
+        if not queue.renew(job, owner):
+            lost.set()
+            return
+
+
+async def work(queue, model, owner, wait=False, max_jobs=0):
+    """Runs jobs until the queue has none ready (or max_jobs). Returns (done, failed)."""
+    from translation_cache import TranslationCache, RefreshingCache
+
+    cache = TranslationCache()
+    refreshing = RefreshingCache(cache)
+    done = failed = 0
+    while not max_jobs or done + failed < max_jobs:
+        job = queue.lease(owner)
+        if job is None:
+            if not wait:
+                break
+            await asyncio.sleep(IDLE_POLL)
+            continue
+
+        label = f"{job['kind']} {job['part']}{' ' + job['pub_key'] if job['pub_key'] else ''}"
+        print(f"[{owner}] {label} (priority {job['priority']}, attempt {job['attempts']})", flush=True)
+        lost = asyncio.Event()
+        keeper = asyncio.ensure_future(lease_keeper(queue, job, owner, lost))
+        started = time.time()
+        try:
+            run = run_part_job if job["kind"] == "part" else run_publication_job
+            # Quality re-runs ask the model again and store the new text over the cached one
+            pt_path, data = await run(job, model, refreshing if job["priority"] == PRIORITY_QUALITY else cache)
+            if lost.is_set() or not queue.renew(job, owner):
+                print(f"[{owner}] lease of {label} lost; result discarded.", flush=True)
+                continue
+            write_json_atomic(data, pt_path)
+            queue.complete(job, owner)
+            done += 1
+            print(f"[{owner}] done {label} -> {os.path.basename(pt_path)} ({time.time() - started:.0f}s)", flush=True)
+        except Exception as e:
+            state = queue.fail(job, owner, e)
+            failed += 1
+            print(f"[{owner}] {label} failed ({describe(e)}); {state}.", flush=True)
+        finally:
+            keeper.cancel()
+
+    cache.report()
+    return done, failed
+
+
+def print_status(queue):
+    names = {PRIORITY_UNTRANSLATED: "untranslated", PRIORITY_STALE: "stale", PRIORITY_QUALITY: "quality"}
+    counts = queue.counts()
+    states = ("pending", "leased", "done", "failed")
+    print(f"{'Priority':<14} | " + " | ".join(f"{s:>8}" for s in states))
+    print("-" * 54)
+    for priority, name in names.items():
+        print(f"{name:<14} | " + " | ".join(f"{counts.get((s, priority), 0):>8}" for s in states))
+    for job in queue.failed():
+        print(f"  failed: {job['kind']} {job['part']} {job['pub_key']} ({job['last_error']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Job queue and workers for the translation of the part files.")
+    parser.add_argument("--queue", default=DEFAULT_QUEUE_PATH, help="SQLite job queue")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("scan", help="Enqueue untranslated parts and missing / stale publications")
+    enqueue = sub.add_parser("enqueue", help="Enqueue parts by hand")
+    enqueue.add_argument("pattern", nargs="?", default=None, help="Part file name pattern (fnmatch)")
+    enqueue.add_argument("--quality", default=None, help="Pattern of parts to translate again (priority 2)")
+    worker = sub.add_parser("worker", help="Pull and run jobs (start several processes to use the whole quota)")
+    worker.add_argument("--id", default=None, help="Worker name (default: host pid)")
+    worker.add_argument("--wait", action="store_true", help="Keep polling when the queue is empty")
+    worker.add_argument("--max-jobs", type=int, default=0, help="Stop after this many jobs")
+    worker.add_argument("--rpm", type=int, default=None, help="Requests per minute of this process (split the quota)")
+    worker.add_argument("--tpm", type=int, default=None, help="Tokens per minute of this process")
+    worker.add_argument("--fake-model", action="store_true", help="Use the local fake model (offline test runs)")
+    sub.add_parser("status", help="Jobs per priority and state")
+    sub.add_parser("requeue", help="Make the failed jobs pending again")
+    args = parser.parse_args()
+
+    queue = JobQueue(args.queue)
+    if args.command == "scan":
+        added = scan(queue)
+        print(f"Enqueued {added['part']} parts and {added['publication']} publications.")
+        print_status(queue)
+    elif args.command == "enqueue":
+        pattern = args.quality or args.pattern
+        if not pattern:
+            parser.error("enqueue needs a pattern or --quality")
+        priority = PRIORITY_QUALITY if args.quality else PRIORITY_UNTRANSLATED
+        names = sorted({n for d in (PARTES_DIR, BKP_DIR) if os.path.isdir(d) for n in os.listdir(d)
+                        if fnmatch.fnmatch(n, pattern) and not n.endswith("_pt.json")})
+        added = sum(queue.add("part", name, priority=priority) for name in names)
+        print(f"Enqueued {added} of {len(names)} matching parts.")
+    elif args.command == "worker":
+        from rate_limiter import AsyncRateController, DEFAULT_RPM, DEFAULT_TPM
+
+        rpm, tpm = args.rpm or DEFAULT_RPM, args.tpm or DEFAULT_TPM
+        if args.fake_model:
+            from fake_gemini import FakeGeminiModel
+            model = FakeGeminiModel(rpm, tpm)
+        else:
+            from translate_full_json import setup_gemini
+            model = setup_gemini()
+        if not model:
+            return
+        controller = AsyncRateController(rpm, tpm)
+        owner = args.id or f"{os.uname().nodename}-{os.getpid()}"
+        try:
+            done, failed = asyncio.run(work(queue, controller.wrap(model), owner, args.wait, args.max_jobs))
+            print(f"[{owner}] {done} jobs done, {failed} failed.")
+        except KeyboardInterrupt:
+            # The leased job expires and goes back to the queue
+            print(f"[{owner}] Interrupted.")
+        controller.report()
+    elif args.command == "status":
+        print_status(queue)
+    else:
+        print(f"{queue.requeue_failed()} failed jobs are pending again.")
+    queue.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Streaming tokenizer for the *_edited.md volume files.
+
+Reads a Markdown file line by line and yields (kind, value) events:
+    (H1, "title text")        -> '# ' heading
+    (H2, "header text")       -> '## ' heading
+    (BODY, "section text")    -> stripped text following the last heading
+
+The split rules mirror the old whole-file
+re.split(r'^((?:#|##)\\s+.+)$', content, flags=re.MULTILINE) exactly, so
+callers get the same sections without holding several copies of a 1.7 MB
+file in memory.
+"""
+
+import re
+
+H1 = "h1"
+H2 = "h2"
+BODY = "body"
+
+# One or two '#' followed by whitespace (or end of line), then the heading text.
+# '###' and '#foo' are not headings.
+HEADING_PATTERN = re.compile(r'(#{1,2})(?!\S)(\s*)(.*)', re.DOTALL)
+
+
+def match_heading(line):
+    """
+    Matches a single line (without its trailing newline) against HEADING_PATTERN.
+    Returns (level, separator, text) or None.
+    """
+    match = HEADING_PATTERN.match(line)
+    if not match:
+        return None
+    return len(match.group(1)), match.group(2), match.group(3)
+
+
+def parse_heading(line):
+    """
+    Returns (level, text) for a '# title' / '## header' line, None otherwise.
+    Only a plain space after the hashes counts, same as generate_json.
+    Example: '## 明主様御教え　「救世主の出現」' -> (2, '明主様御教え　「救世主の出現」')
+    """
+    heading = match_heading(line.strip())
+    if not heading:
+        return None
+    level, separator, text = heading
+    if not separator.startswith(' ') or not text.strip():
+        return None
+    return level, text.strip()
+
+
+def tokenize(lines):
+    """
+    Yields H1/H2/BODY events from an iterable of lines (e.g. an open file).
+
+    Every recognized heading is followed by exactly one BODY event.
+    Headings that split the text but are not '# '/'## ' (e.g. '#　title')
+    close the previous section and swallow their own body, as before.
+    """
+    heading = None      # (kind or None, text) of the section being read
+    body = []           # raw lines of the current section
+    pending = None      # heading line with no text yet: (level, separator, [continuation lines])
+
+    def close_section():
+        if heading and heading[0]:
+            yield BODY, ''.join(body).strip()
+
+    for raw in lines:
+        line = raw[:-1] if raw.endswith('\n') else raw
+
+        if pending is not None:
+            # A bare '#' / '# ' line continues through whitespace-only lines
+            # and takes the first non-blank line as its text.
+            if not line.strip():
+                pending[2].append(raw)
+                continue
+            yield from close_section()
+            level, separator, _ = pending
+            pending = None
+            kind = (H1 if level == 1 else H2) if separator.startswith(' ') else None
+            heading = (kind, line.strip())
+            body = []
+            if kind:
+                yield kind, line.strip()
+            continue
+
+        match = match_heading(line)
+        if not match:
+            body.append(raw)
+            continue
+
+        level, separator, text = match
+        if not text:
+            pending = (level, separator, [raw])
+            continue
+
+        yield from close_section()
+        kind = (H1 if level == 1 else H2) if separator.startswith(' ') else None
+        heading = (kind, text.strip())
+        body = []
+        if kind:
+            yield kind, text.strip()
+
+    if pending is not None:
+        level, separator, held = pending
+        tail = ''.join(held)[level:]
+        if any(c != '\n' for c in tail[1:]):
+            # Whitespace-only heading: it still ends the previous section.
+            yield from close_section()
+            heading = None
+        else:
+            body.extend(held)
+
+    yield from close_section()
@@ -0,0 +1,168 @@
+"""
+Stable identifiers for the volumes, themes, titles and publications of
+shin_college_data.json.
+
+IDs are derived from the Japanese source, so regenerating the JSON gives
+the same IDs, and they travel with the nodes through the part files, the
+`_pt.json` translations and the merged outputs. Joins become dict lookups
+by "id" instead of matching pub_idx positions or (volume, theme, title)
+tuples.
+
+    volume       v-<h8(volume)>
+    theme        t-<h8(volume / theme)>
+    title        ti-<h8(theme id / title)>
+    publication  p-<h12(theme id, header, first CONTENT_PREFIX_CHARS of content)>
+
+The same article is reprinted under several themes, so title and
+publication IDs are namespaced by their theme. Repeats inside one theme
+get "-2", "-3", ... in document order.
+
+    python3 scripts/node_ids.py data/shin_college_data.json   # adds IDs to an existing JSON
+"""
+
+import re
+import sys
+import json
+import hashlib
+import unicodedata
+
+CONTENT_PREFIX_CHARS = 200
+
+# Part of the build cache signature: bump when the ID recipe changes
+ID_SCHEME = "ids-1"
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize_for_id(text):
+    """NFKC, without whitespace: reformatting the Markdown does not change the IDs."""
+    if not text:
+        return ""
+    return WHITESPACE_PATTERN.sub('', unicodedata.normalize('NFKC', text))
+
+
+def short_hash(*parts, length=8):
+    text = "\n".join(normalize_for_id(part) for part in parts)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:length]
+
+
+def volume_id(volume_name):
+    return "v-" + short_hash(volume_name)
+
+
+def theme_id(volume_name, theme_name):
+    return "t-" + short_hash(volume_name, theme_name)
+
+
+def title_id(parent_id, title):
+    return "ti-" + short_hash(parent_id, title)
+
+
+def publication_id(parent_id, pub):
+    header = pub.get("header") or pub.get("publication_title", "")
+    content = (pub.get("content") or "")[:CONTENT_PREFIX_CHARS]
+    return "p-" + short_hash(parent_id, header, content, length=12)
+
+
+def with_id(node, node_id):
+    """Copy of node with "id" as its first key."""
+    new_node = {"id": node_id}
+    new_node.update((k, v) for k, v in node.items() if k != "id")
+    return new_node
+
+
+def unique(node_id, seen):
+    count = seen.get(node_id, 0) + 1
+    seen[node_id] = count
+    return node_id if count == 1 else f"{node_id}-{count}"
+
+
+def assign_theme_ids(volume_name, theme_entry):
+    """Returns theme_entry with IDs on the theme, its titles and publications."""
+    t_id = theme_id(volume_name, theme_entry.get("theme", ""))
+    seen = {}
+    titles = []
+    for title in theme_entry.get("titles", []):
+        publications = [
+            with_id(pub, unique(publication_id(t_id, pub), seen))
+            for pub in title.get("publications", [])
+        ]
+        title = with_id(title, unique(title_id(t_id, title.get("title", "")), seen))
+        title["publications"] = publications
+        titles.append(title)
+
+    theme_entry = with_id(theme_entry, t_id)
+    theme_entry["titles"] = titles
+    return theme_entry
+
+
+def fill_theme_ids(volume_name, theme):
+    """theme unchanged when all its nodes have IDs, otherwise with the missing ones filled in."""
+    titles = theme.get("titles", [])
+    if theme.get("id") and all(t.get("id") for t in titles) and \
+            all(p.get("id") for t in titles for p in t.get("publications", [])):
+        return theme
+
+    generated = assign_theme_ids(volume_name, theme)
+    filled = dict(generated, id=theme.get("id") or generated["id"])
+    filled["titles"] = []
+    for title, gen_title in zip(titles, generated["titles"]):
+        new_title = dict(gen_title, id=title.get("id") or gen_title["id"])
+        new_title["publications"] = [
+            dict(gen_pub, id=pub.get("id") or gen_pub["id"])
+            for pub, gen_pub in zip(title.get("publications", []), gen_title["publications"])
+        ]
+        filled["titles"].append(new_title)
+    return filled
+
+
+def assign_ids(data):
+    """Returns the whole shin_college_data list with IDs on every node."""
+    volumes = []
+    for volume in data:
+        volume_name = volume.get("volume", "")
+        themes = [assign_theme_ids(volume_name, theme) for theme in volume.get("themes", [])]
+        volume = with_id(volume, volume_id(volume_name))
+        volume["themes"] = themes
+        volumes.append(volume)
+    return volumes
+
+
+def fill_ids(data):
+    """assign_ids keeping the IDs already present."""
+    volumes = []
+    for volume in data:
+        volume_name = volume.get("volume", "")
+        themes = [fill_theme_ids(volume_name, theme) for theme in volume.get("themes", [])]
+        volume = with_id(volume, volume.get("id") or volume_id(volume_name))
+        volume["themes"] = themes
+        volumes.append(volume)
+    return volumes
+
+
+def index_by_id(nodes):
+    """{id: node} for the nodes that have one."""
+    return {node["id"]: node for node in nodes if node.get("id")}
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python3 scripts/node_ids.py <shin_college_data.json>")
+        return
+
+    path = sys.argv[1]
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    data = assign_ids(data)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+    count = sum(
+        1 + len(title.get("publications", []))
+        for volume in data for theme in volume.get("themes", []) for title in theme.get("titles", [])
+    )
+    print(f"IDs assigned to {count} titles and publications in {path}.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Alignment of translated parts (_pt.json) to their original parts.
+
+data/align_parts.py used to compare the title sets of every PT file with
+those of every original of its theme, a substring scan per pair; the
+merge then only warned when a publication's original_title did not
+match. Here every original publication of a theme is indexed once under
+its keys:
+
+    id                        stable ID (node_ids.py)
+    content                   first CONTENT_KEY_CHARS of the normalized JP content
+    title                     normalized publication_title
+    title_base                the same without the trailing （date） parenthesis
+    position                  (title_idx, pub_idx), the place of the article in the theme
+    date                      normalized date
+
+Each PT publication looks its keys up (dict hits, no pairwise scan) and
+gets a score per candidate: the best key weight, divided by the number
+of originals sharing a title or a date. Part scores are the sums of
+their publications' best scores; parts are then assigned one-to-one by
+the Hungarian method (maximum total score), and so are the publications
+of each assigned pair. Confidence is the score divided by the number of
+PT publications (parts) or the key weight (publications).
+
+    python3 data/align_parts.py [--dir data/temasSeparados/bkp] [--json report.json] [--apply]
+"""
+
+import os
+import re
+import json
+import unicodedata
+from collections import defaultdict
+
+CONTENT_KEY_CHARS = 120
+PART_PATTERN = re.compile(r"^(.+?)_parte(\d+)(_pt)?\.json$")
+
+# Weight of a match on each key, before ambiguity
+KEY_WEIGHTS = {
+    "id": 1.0,
+    "content": 1.0,
+    "title": 0.9,
+    "title_base": 0.7,
+    "position": 0.6,
+    "date": 0.2,
+}
+# Keys shared by many publications: weight divided by the number of holders
+AMBIGUOUS_KEYS = ("title", "title_base", "date")
+
+# Score of pairing parts with the same number, so parts without any key
+# (PT files that dropped the JP fields) keep their own number
+SAME_NUMBER_PRIOR = 0.05
+
+# Assignments below this confidence are reported as doubtful
+LOW_CONFIDENCE = 0.5
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+TRAILING_PAREN_PATTERN = re.compile(r'[（(][^（()）]*[)）]$')
+
+
+def normalize(text):
+    """NFKC, without whitespace."""
+    if not text:
+        return ""
+    return WHITESPACE_PATTERN.sub('', unicodedata.normalize('NFKC', str(text)))
+
+
+def publication_keys(pub):
+    """[(key kind, value)] of a publication, original or translated."""
+    keys = []
+    if pub.get("id"):
+        keys.append(("id", pub["id"]))
+    content = normalize(pub.get("content"))
+    if content:
+        keys.append(("content", content[:CONTENT_KEY_CHARS]))
+    # Translators were asked to keep the Japanese title in original_title
+    for field in ("publication_title", "original_title"):
+        title = normalize(pub.get(field))
+        if title:
+            keys.append(("title", title))
+            base = TRAILING_PAREN_PATTERN.sub('', title)
+            if base and base != title:
+                keys.append(("title_base", base))
+    if pub.get("title_idx") not in (None, "") and pub.get("pub_idx") not in (None, ""):
+        keys.append(("position", f"{pub['title_idx']}/{pub['pub_idx']}"))
+    date = normalize(pub.get("date"))
+    if date:
+        keys.append(("date", date))
+    return keys
+
+
+def assign(scores, rows, cols):
+    """
+    Maximum-score one-to-one assignment (Hungarian method, O(n^3)).
+    scores: {(row, col): score}. Returns [(row, col)] of the pairs with a score.
+    """
+    if not rows or not cols:
+        return []
+    n = max(len(rows), len(cols))
+    top = max(scores.values(), default=0.0)
+    # cost[i][j] on a square matrix padded with zero-score cells
+    cost = [[top - scores.get((rows[i], cols[j]), 0.0) if i < len(rows) and j < len(cols) else top
+             for j in range(n)] for i in range(n)]
+
+    INF = float('inf')
+    u = [0.0] * (n + 1)
+    v = [0.0] * (n + 1)
+    p = [0] * (n + 1)
+    way = [0] * (n + 1)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = [INF] * (n + 1)
+        used = [False] * (n + 1)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            delta = INF
+            j1 = 0
+            row = cost[i0 - 1]
+            for j in range(1, n + 1):
+                if not used[j]:
+                    cur = row[j - 1] - u[i0] - v[j]
+                    if cur < minv[j]:
+                        minv[j] = cur
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(n + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while True:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+            if j0 == 0:
+                break
+
+    pairs = []
+    for j in range(1, n + 1):
+        i = p[j] - 1
+        if i < len(rows) and j - 1 < len(cols) and (rows[i], cols[j - 1]) in scores:
+            pairs.append((rows[i], cols[j - 1]))
+    return pairs
+
+
+class ThemeIndex:
+    """Original publications of one theme, by key."""
+
+    def __init__(self):
+        self.by_key = defaultdict(list)
+        self.parts = {}
+
+    def add_part(self, part_num, publications):
+        self.parts[part_num] = publications
+        for idx, pub in enumerate(publications):
+            for key in set(publication_keys(pub)):
+                self.by_key[key].append((part_num, idx))
+
+    def candidates(self, pub):
+        """{(part, pub index): (score, key kind)} of the originals matching pub."""
+        found = {}
+        for key in publication_keys(pub):
+            holders = self.by_key.get(key)
+            if not holders:
+                continue
+            weight = KEY_WEIGHTS[key[0]]
+            if key[0] in AMBIGUOUS_KEYS:
+                weight /= len(holders)
+            for holder in holders:
+                if holder not in found or found[holder][0] < weight:
+                    found[holder] = (weight, key[0])
+        return found
+
+
+def align_theme(index, pt_parts):
+    """
+    Aligns the PT parts {part: publications} of one theme to index.
+    Returns [{"pt_part", "orig_part", "confidence", "publications": [...]}] in PT part order.
+    """
+    candidates = {}
+    part_scores = defaultdict(float)
+    for pt_num, pubs in pt_parts.items():
+        for pt_idx, pub in enumerate(pubs):
+            found = index.candidates(pub)
+            candidates[(pt_num, pt_idx)] = found
+            best = {}
+            for (orig_num, _), (score, _) in found.items():
+                best[orig_num] = max(best.get(orig_num, 0.0), score)
+            for orig_num, score in best.items():
+                part_scores[(pt_num, orig_num)] += score
+        if pt_num in index.parts:
+            part_scores[(pt_num, pt_num)] += SAME_NUMBER_PRIOR * max(len(pubs), 1)
+
+    pt_nums = sorted(pt_parts)
+    pairs = dict(assign(part_scores, pt_nums, sorted(index.parts)))
+
+    results = []
+    for pt_num in pt_nums:
+        pubs = pt_parts[pt_num]
+        orig_num = pairs.get(pt_num)
+        result = {"pt_part": pt_num, "orig_part": orig_num, "publications": []}
+        if orig_num is None:
+            result["confidence"] = 0.0
+            results.append(result)
+            continue
+
+        pub_scores = {}
+        kinds = {}
+        for pt_idx in range(len(pubs)):
+            for (num, orig_idx), (score, kind) in candidates[(pt_num, pt_idx)].items():
+                if num == orig_num:
+                    pub_scores[(pt_idx, orig_idx)] = score
+                    kinds[(pt_idx, orig_idx)] = kind
+        pub_pairs = dict(assign(pub_scores, list(range(len(pubs))), list(range(len(index.parts[orig_num])))))
+
+        total = 0.0
+        for pt_idx in range(len(pubs)):
+            orig_idx = pub_pairs.get(pt_idx)
+            score = pub_scores.get((pt_idx, orig_idx), 0.0)
+            total += score
+            result["publications"].append({
+                "pt_index": pt_idx,
+                "orig_index": orig_idx,
+                "confidence": round(score, 3),
+                "key": kinds.get((pt_idx, orig_idx)),
+            })
+        result["confidence"] = round(total / max(len(pubs), 1), 3)
+        results.append(result)
+    return results
+
+
+def load_parts(directory):
+    """({theme_key: {part: publications}} of the originals, the same of the PT files, errors)."""
+    originals = defaultdict(dict)
+    translated = defaultdict(dict)
+    errors = []
+    for name in sorted(os.listdir(directory)):
+        match = PART_PATTERN.match(name)
+        if not match:
+            continue
+        try:
+            with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+                publications = json.load(f).get("publications", [])
+        except (OSError, ValueError) as e:
+            errors.append(f"{name}: {e}")
+            continue
+        target = translated if match.group(3) else originals
+        target[match.group(1)][int(match.group(2))] = publications
+    return originals, translated, errors
+
+
+def align_directory(directory):
+    """{theme_key: align_theme results} of every theme of directory with PT parts."""
+    originals, translated, errors = load_parts(directory)
+    report = {}
+    for theme_key in sorted(translated):
+        index = ThemeIndex()
+        for part_num, pubs in sorted(originals.get(theme_key, {}).items()):
+            index.add_part(part_num, pubs)
+        report[theme_key] = align_theme(index, translated[theme_key])
+    return report, errors
@@ -3,6 +3,8 @@ import re
 import os
 import glob
 
+from glossary import load_glossary, NUMBERED_TITLES
+
 # Configuration
 JSON_PATH = "/Users/michael/Documents/Ensinamentos/Sites/ShinCollege_Pt/data/shin_college_data_translated.json"
 MARKDOWN_DIR = "/Users/michael/Documents/Ensinamentos/Sites/ShinCollege_Pt/TranslatedMarkdown"
@@ -15,51 +17,8 @@ FILENAME_PATTERN = re.compile(r'^(.*)\((.*)\)\.md$')
 # Group 2: PT Title (approx), Group 3: JP Title
 HEADER_PATTERN = re.compile(r'^#+\s*(\d+[\.\s]*)?(.*?)\s*\(Orig\.:\s*(.*?)\)\s*$', re.IGNORECASE)
 
-# Manual Theme Map for common sections that might not have matching filenames
-MANUAL_THEME_MAP = {
-    "序文": "Introdução",
-    "神と経綸": "Deus e o Plano Divino",
-    "霊主体従": "Espírito Precede a Matéria",
-    "霊界の構成": "Constituição do Mundo Espiritual",
-    "諸霊の活動": "Atuação dos Espíritos",
-    "夜昼転換と最後の審判": "Transição Noite-Dia e o Juízo Final",
-    "御神格": "Divindade",
-    "正神と邪神": "Deus Verdadeiro e Deus Maligno",
-    "祖霊祭祀": "Culto aos Antepassados", 
-    "浄霊の原理": "Princípio do Johrei",
-    "浄霊の方法": "Método de Johrei",
-    "浄化作用": "Ação de Purificação",
-    "三　毒": "Três Toxinas",
-    "病気の体的分析": "Análise Física da Doença",
-    "病気の霊的分析": "Análise Espiritual da Doença",
-    "現代医学批判": "Crítica à Medicina Moderna",
-    "神示の健康法": "Método de Saúde Revelado por Deus",
-    "自然農法": "Agricultura Natural",
-    "真理": "Verdade",
-    "幸福を生む宗教": "Religião que Gera Felicidade",
-    "信仰地獄": "Inferno da Fé",
-    "信仰生活の道標": "Guia da Vida de Fé",
-    "信仰と社会生活": "Fé e Vida Social",
-    "信仰と家庭生活": "Fé e Vida Familiar",
-    "罪と徳": "Pecado e Virtude",
-    "御神業の心得": "Atitude na Obra Divina",
-    "御神体とお光": "Imagem Divina e Ohikari",
-    "明主様の御事跡": "Feitos de Meishu-Sama",
-    "地上天国の雛形建設": "Construção do Modelo do Paraíso Terrestre",
-    "外野の無理解": "Incompreensão de Terceiros", 
-    "宗教断片集": "Fragmentos Religiosos",
-    "森羅万象の解析": "Análise de Todas as Coisas",
-    "芸術について": "Sobre a Arte",
-    "時局について": "Sobre a Situação Atual",
-    "その他": "Outros"
-}
-
-MANUAL_TITLE_MAP = {
-    "御神体の奇瑞１": "Milagres da Imagem Divina 1",
-    "御神体の奇瑞２": "Milagres da Imagem Divina 2",
-    "御神体の奇瑞について１": "Milagres da Imagem Divina 1",
-    "御神体の奇瑞について２": "Milagres da Imagem Divina 2"
-}
+# Manual theme/title translations live in glossary.py
+GLOSSARY = load_glossary()
 
 def normalize_text(text):
     if not text: return ""
@@ -76,8 +35,8 @@ def main():
     theme_map = {} # { JP_Theme_Normalized: PT_Theme }
     title_map = {} # { JP_Title_Normalized: PT_Title }
     
-    # Pre-populate with Manual Map
-    for jp, pt in MANUAL_THEME_MAP.items():
+    # Pre-populate with the glossary themes
+    for jp, pt in GLOSSARY.tables["theme"].items():
         theme_map[normalize_text(jp)] = pt
 
     print(f"Scanning {len(markdown_files)} markdown files...")
@@ -139,10 +98,14 @@ def main():
                 if jp_title:
                     norm_title = normalize_text(jp_title)
                     
+                    glossary_title = None
+                    if not title_group.get('title_ptbr'):
+                        glossary_title = GLOSSARY.lookup(jp_title, "title", theme=jp_theme)
+
                     # 1. Try Manual Title Map
-                    if norm_title in MANUAL_TITLE_MAP:
-                         if title_group.get('title_ptbr') != MANUAL_TITLE_MAP[norm_title]:
-                            title_group['title_ptbr'] = MANUAL_TITLE_MAP[norm_title]
+                    if norm_title in NUMBERED_TITLES:
+                         if title_group.get('title_ptbr') != NUMBERED_TITLES[norm_title]:
+                            title_group['title_ptbr'] = NUMBERED_TITLES[norm_title]
                             updates_count += 1
                             print(f"Updated Title (Manual Map): {jp_title} -> {title_group['title_ptbr']}")
 
@@ -152,8 +115,14 @@ def main():
                             title_group['title_ptbr'] = title_map[norm_title]
                             updates_count += 1
                             print(f"Updated Title (Markdown Map): {jp_title} -> {title_group['title_ptbr']}")
+
+                    # 3. Glossary, only for titles still without translation
+                    elif glossary_title:
+                        title_group['title_ptbr'] = glossary_title
+                        updates_count += 1
+                        print(f"Updated Title (Glossary): {jp_title} -> {glossary_title}")
                     else:
-                        # 3. Heuristic: If Title starts with Theme Name (JP), replace with Theme Name (PT)
+                        # 4. Heuristic: If Title starts with Theme Name (JP), replace with Theme Name (PT)
                         # e.g. JP Theme: "神と経綸", PT Theme: "Deus e o Plano Divino"
                         # JP Title: "神と経綸　１" -> PT Title: "Deus e o Plano Divino 1"
                         
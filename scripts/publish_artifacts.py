@@ -0,0 +1,166 @@
+"""
+Release artifacts of the site data: minified, precompressed, content-hashed.
+
+The main JSON is written with indent=2, and the static host served it
+and the site files as they are. In release mode the publish step also
+writes, under site/:
+
+    dist/<name>.<hash>.json       minified bytes, named after their content
+    dist/<name>.<hash>.json.gz    gzip -9
+    dist/<name>.<hash>.json.br    brotli (only when the brotli package is installed)
+    assets.json                   {"version", "files": {logical name: "dist/<name>.<hash>.json"}}
+
+Logical names are paths relative to site/ ("manifest.json",
+"content/<theme id>.json", "search/<key>.json"), plus the main JSON
+under its own name. js/app.js reads assets.json first (not cached) and
+fetches the hashed names, which can then be cached forever; a host that
+serves precompressed siblings (nginx gzip_static / brotli_static, or a
+CDN) sends the .gz / .br as they are. An artifact whose hash did not
+change is not recompressed, and files of dist/ no longer listed are
+removed. A publish without release mode removes assets.json, so the app
+never mixes hashed files with newer plain ones.
+
+    python3 scripts/publish_artifacts.py data/shin_college_data.json
+"""
+
+import os
+import sys
+import gzip
+import json
+import glob
+import hashlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ASSETS_NAME = "assets.json"
+ASSETS_VERSION = 1
+DIST_DIR_NAME = "dist"
+HASH_LENGTH = 10
+
+# Report groups: logical names under these directories are summed up
+GROUP_DIRS = ("content", "search")
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def hashed_name(logical_name, data):
+    return f"{DIST_DIR_NAME}/{logical_name[:-len('.json')]}.{content_hash(data)}.json"
+
+
+def minify(text):
+    from site_shards import dump_compact
+
+    return dump_compact(json.loads(text)).encode('utf-8')
+
+
+def write_bytes(path, data):
+    temp_path = path + ".tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+def write_artifact(path, data):
+    """
+    Writes data and its compressed siblings to the hashed path, unless
+    they are already there. Returns (minified, gzip, brotli) sizes.
+    """
+    gz_path, br_path = path + ".gz", path + ".br"
+    if not os.path.exists(path) or not os.path.exists(gz_path):
+        write_bytes(gz_path, gzip.compress(data, compresslevel=9, mtime=0))
+        write_bytes(path, data)
+    if brotli is not None and not os.path.exists(br_path):
+        write_bytes(br_path, brotli.compress(data, quality=11))
+    br_size = os.path.getsize(br_path) if os.path.exists(br_path) else None
+    return len(data), os.path.getsize(gz_path), br_size
+
+
+def site_sources(site_dir):
+    """(logical name, path) of the site files (manifest, content and search shards)."""
+    from site_shards import PUBLISH_NAME
+
+    paths = glob.glob(os.path.join(site_dir, "*.json"))
+    for directory in GROUP_DIRS:
+        paths += glob.glob(os.path.join(site_dir, directory, "*.json"))
+    for path in sorted(paths):
+        name = os.path.relpath(path, site_dir).replace(os.sep, "/")
+        if name not in (ASSETS_NAME, PUBLISH_NAME):
+            yield name, path
+
+
+def report_group(name):
+    first = name.split("/", 1)[0]
+    return f"{first}/" if first in GROUP_DIRS and "/" in name else name
+
+
+def format_size(size):
+    if size is None:
+        return "-"
+    if size >= 1024 * 1024:
+        return f"{size / (1024 * 1024):.1f} MB"
+    return f"{size / 1024:.0f} KB"
+
+
+def publish_artifacts(output_file, site_dir=None):
+    """Writes the release artifacts of the main JSON and its site data. Returns the assets map."""
+    from site_shards import dump_compact, site_dir_for, write_if_changed
+
+    site_dir = site_dir or site_dir_for(output_file)
+    files = {}
+    sizes = {}
+    written = 0
+
+    sources = [(os.path.basename(output_file), output_file)] + list(site_sources(site_dir))
+    for name, path in sources:
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        data = minify(text)
+        files[name] = hashed_name(name, data)
+        target = os.path.join(site_dir, files[name])
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        written += not os.path.exists(target)
+        minified, gz, br = write_artifact(target, data)
+
+        group = sizes.setdefault(report_group(name), [0, 0, 0, 0, 0])
+        group[0] += 1
+        group[1] += len(text.encode('utf-8'))
+        group[2] += minified
+        group[3] += gz
+        group[4] = group[4] + br if br is not None and group[4] is not None else None
+
+    # Files of earlier publishes
+    current = {os.path.join(site_dir, hashed) + suffix
+               for hashed in files.values() for suffix in ("", ".gz", ".br")}
+    removed = 0
+    for root, _, names in os.walk(os.path.join(site_dir, DIST_DIR_NAME)):
+        for file_name in names:
+            path = os.path.join(root, file_name)
+            if path not in current:
+                os.remove(path)
+                removed += 1
+
+    assets = {"version": ASSETS_VERSION, "files": files}
+    write_if_changed(os.path.join(site_dir, ASSETS_NAME), dump_compact(assets))
+
+    print(f"Release artifacts: {len(files)} files ({written} new, {removed} stale files removed)"
+          f"{'' if brotli is not None else ', no brotli module: .br skipped'}.")
+    for group, (count, before, minified, gz, br) in sizes.items():
+        label = f"{group} ({count} files)" if count > 1 else group
+        print(f"  {label:32} {format_size(before):>9} -> min {format_size(minified):>9}, "
+              f"gz {format_size(gz):>9}, br {format_size(br):>9}")
+    return assets
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python3 scripts/publish_artifacts.py <shin_college_data.json> [site dir]")
+        return
+    publish_artifacts(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+
+if __name__ == "__main__":
+    main()
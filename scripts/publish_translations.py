@@ -2,8 +2,13 @@
 import glob
 import os
 import re
-import shutil
 import json
+import argparse
+
+from incremental_build import BuildCache
+from file_transaction import FileTransaction, recover
+from node_ids import volume_id, ID_SCHEME
+from site_shards import publish_site
 
 # Configuration
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -11,6 +16,10 @@ DATA_DIR = os.path.join(PROJECT_ROOT, "data")
 PARTES_DIR = os.path.join(DATA_DIR, "temasSeparados", "partes")
 BKP_DIR = os.path.join(DATA_DIR, "temasSeparados", "bkp_translations")
 MAIN_JSON_OUTPUT = os.path.join(DATA_DIR, "shin_college_data.json")
+# Journal of the bulk renames/moves (scripts/file_transaction.py)
+TX_DIR = os.path.join(DATA_DIR, "temasSeparados", ".transactions")
+# Code that shapes the aggregated output: editing it invalidates the build cache
+BUILDER_SOURCES = [os.path.abspath(__file__), os.path.join(os.path.dirname(os.path.abspath(__file__)), "node_ids.py")]
 
 def natural_sort_key(s):
     return [int(text) if text.isdigit() else text.lower()
@@ -24,8 +33,8 @@ def sync_merged_status():
     print("--- Syncing Merged Status ---")
     part_files = glob.glob(os.path.join(PARTES_DIR, "*.json"))
     
-    count = 0
-    for p_file in part_files:
+    tx = FileTransaction(TX_DIR, "sync_merged_status")
+    for p_file in sorted(part_files):
         # Skip _pt.json files
         if p_file.endswith("_pt.json"):
             continue
@@ -50,13 +59,13 @@ def sync_merged_status():
             
             if has_translation:
                 new_name = p_file.replace(".json", "_merged.json")
-                os.rename(p_file, new_name)
-                # print(f"Renamed {os.path.basename(p_file)} -> {os.path.basename(new_name)}")
-                count += 1
+                tx.move(p_file, new_name)
                 
         except Exception as e:
             print(f"Error checking {os.path.basename(p_file)}: {e}")
             
+    # All renames or none
+    count = tx.commit()
     print(f"Marked {count} existing files as merged.")
 
 def merge_local_translations():
@@ -69,8 +78,11 @@ def merge_local_translations():
     if not pt_files:
         print("No new translation files (*_pt.json) found.")
     
+    # The part updates, renames to _merged.json and moves to the backup
+    # directory of the whole batch are applied all together or not at all
+    tx = FileTransaction(TX_DIR, "merge_local_translations")
     merged_count = 0
-    for pt_file in pt_files:
+    for pt_file in sorted(pt_files):
         # Target could be .json or _merged.json
         base_name = pt_file.replace("_pt.json", "")
         
@@ -114,32 +126,89 @@ def merge_local_translations():
                                 main_pub["has_translation"] = True
                                 updated = True
                             
+            # If target wasn't merged yet (didn't have suffix), it is renamed
+            new_target = target_file
+            if not target_file.endswith("_merged.json"):
+                new_target = target_file.replace(".json", "_merged.json")
+            
             # Save updates
             if updated:
-                with open(target_file, 'w', encoding='utf-8') as f:
-                    json.dump(main_data, f, ensure_ascii=False, indent=2)
+                tx.write_json(new_target, main_data)
+                if new_target != target_file:
+                    tx.delete(target_file)
                 merged_count += 1
-            
-            # If target wasn't merged yet (didn't have suffix), rename it now
-            if not target_file.endswith("_merged.json"):
-                new_target = target_file.replace(".json", "_merged.json")
-                os.rename(target_file, new_target)
+            else:
+                tx.move(target_file, new_target)
             
             # Move source _pt.json to backup directory
-            if not os.path.exists(BKP_DIR):
-                os.makedirs(BKP_DIR)
-                
-            shutil.move(pt_file, os.path.join(BKP_DIR, os.path.basename(pt_file)))
+            tx.move(pt_file, os.path.join(BKP_DIR, os.path.basename(pt_file)))
             
         except Exception as e:
             print(f"Error processing {os.path.basename(pt_file)}: {e}")
             
+    tx.commit()
     print(f"Merged translations into {merged_count} files.")
 
 
-def publish_to_main_json():
+def build_theme_entry(theme_name, theme_name_ptbr, parts):
+    """Regroups the publications of a theme's parts (sorted by part) by title."""
+    merged_publications = []
+    for p in parts:
+        merged_publications.extend(p.get("publications", []))
+        
+    # Regroup by title
+    grouped_titles = []
+    current_title_group = None
+    last_title_jp = None
+    
+    for pub in merged_publications:
+        this_title_jp = pub.get("title", "")
+        this_title_pt = pub.get("title_ptbr", "")
+        
+        if this_title_jp != last_title_jp:
+            if current_title_group:
+                grouped_titles.append(current_title_group)
+            
+            current_title_group = {
+                "id": pub.get("title_id", ""),
+                "title": this_title_jp,
+                "title_ptbr": this_title_pt,
+                "publications": []
+            }
+            last_title_jp = this_title_jp
+        
+        # Minimal necessary fields for main JSON
+        pub_entry = {
+            "id": pub.get("id", ""),
+            "publication_title": pub.get("publication_title", ""),
+            "publication_title_ptbr": pub.get("publication_title_ptbr", ""),
+            "content": pub.get("content", ""),
+            "content_ptbr": pub.get("content_ptbr", ""),
+            "date": pub.get("date", ""),
+            "has_translation": pub.get("has_translation", False)
+        }
+        # Optional fields
+        for k in ["pub_idx", "source", "header", "type"]:
+            if k in pub: pub_entry[k] = pub[k]
+        
+        current_title_group["publications"].append(pub_entry)
+
+    if current_title_group:
+        grouped_titles.append(current_title_group)
+
+    return {
+        "id": parts[0].get("theme_id", "") if parts else "",
+        "theme": theme_name,
+        "theme_ptbr": theme_name_ptbr,
+        "titles": grouped_titles
+    }
+
+
+def publish_to_main_json(full=False, release=False):
     """
     Step 2: Aggregate all part files into shin_college_data.json
+    Themes whose part files did not change since the last publish are reused
+    from the build manifest instead of being re-read (full=True disables this).
     """
     print("\n--- Step 2: Publishing to Main JSON ---")
     part_files = glob.glob(os.path.join(PARTES_DIR, "*.json"))
@@ -160,14 +229,27 @@ def publish_to_main_json():
     
     print(f"Aggregating {len(valid_parts)} files...")
 
+    cache = BuildCache(MAIN_JSON_OUTPUT, "publish_translations", full=full, sources=BUILDER_SOURCES)
+    loaded = {}
+
     for p_file in sorted(valid_parts, key=lambda x: natural_sort_key(os.path.basename(x))):
         try:
-            with open(p_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            meta = cache.meta(p_file)
+            if meta is None:
+                with open(p_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                meta = {
+                    "volume": data.get("volume", ""),
+                    "theme_name": data.get("theme_name", ""),
+                    "theme_name_ptbr": data.get("theme_name_ptbr", ""),
+                    "part": data.get("part", 0)
+                }
+                cache.set_meta(p_file, meta)
+                loaded[p_file] = data
                 
-            vol_name = data.get("volume", "")
-            theme_name = data.get("theme_name", "")
-            theme_name_ptbr = data.get("theme_name_ptbr", "")
+            vol_name = meta["volume"]
+            theme_name = meta["theme_name"]
+            theme_name_ptbr = meta["theme_name_ptbr"]
             
             group_key = (vol_name, theme_name)
             
@@ -179,7 +261,7 @@ def publish_to_main_json():
                     "parts": []
                 }
             
-            files_by_group[group_key]["parts"].append(data)
+            files_by_group[group_key]["parts"].append((meta["part"], p_file))
             
         except Exception as e:
             print(f"Error reading {os.path.basename(p_file)}: {e}")
@@ -197,60 +279,26 @@ def publish_to_main_json():
         
         if vol_name not in volume_construction:
             volume_construction[vol_name] = {
+                "id": volume_id(vol_name),
                 "volume": vol_name,
                 "themes": []
             }
             
         # Sort parts by 'part' number
-        parts = sorted(group_data["parts"], key=lambda x: x.get("part", 0))
-        
-        merged_publications = []
-        for p in parts:
-            merged_publications.extend(p.get("publications", []))
-            
-        # Regroup by title
-        grouped_titles = []
-        current_title_group = None
-        last_title_jp = None
-        
-        for pub in merged_publications:
-            this_title_jp = pub.get("title", "")
-            this_title_pt = pub.get("title_ptbr", "")
-            
-            if this_title_jp != last_title_jp:
-                if current_title_group:
-                    grouped_titles.append(current_title_group)
-                
-                current_title_group = {
-                    "title": this_title_jp,
-                    "title_ptbr": this_title_pt,
-                    "publications": []
-                }
-                last_title_jp = this_title_jp
-            
-            # Minimal necessary fields for main JSON
-            pub_entry = {
-                "publication_title": pub.get("publication_title", ""),
-                "publication_title_ptbr": pub.get("publication_title_ptbr", ""),
-                "content": pub.get("content", ""),
-                "content_ptbr": pub.get("content_ptbr", ""),
-                "date": pub.get("date", ""),
-                "has_translation": pub.get("has_translation", False)
-            }
-            # Optional fields
-            for k in ["pub_idx", "source", "header", "type"]:
-                if k in pub: pub_entry[k] = pub[k]
-            
-            current_title_group["publications"].append(pub_entry)
+        parts = sorted(group_data["parts"], key=lambda x: x[0])
+        part_paths = [p_file for _, p_file in parts]
+        theme_key = f"{vol_name}/{theme_name}"
 
-        if current_title_group:
-            grouped_titles.append(current_title_group)
-
-        theme_entry = {
-            "theme": theme_name,
-            "theme_ptbr": group_data["theme_name_ptbr"],
-            "titles": grouped_titles
-        }
+        theme_entry = cache.theme(theme_key, part_paths, ID_SCHEME)
+        if theme_entry is None:
+            parts_data = []
+            for p_file in part_paths:
+                if p_file not in loaded:
+                    with open(p_file, 'r', encoding='utf-8') as f:
+                        loaded[p_file] = json.load(f)
+                parts_data.append(loaded[p_file])
+            theme_entry = build_theme_entry(theme_name, group_data["theme_name_ptbr"], parts_data)
+            theme_entry = cache.store_theme(theme_key, part_paths, theme_entry, ID_SCHEME)
         
         volume_construction[vol_name]["themes"].append(theme_entry)
 
@@ -260,15 +308,25 @@ def publish_to_main_json():
         final_data.append(volume_construction[v_key])
 
     print(f"Writing {len(final_data)} volumes to {MAIN_JSON_OUTPUT}...")
-    with open(MAIN_JSON_OUTPUT, 'w', encoding='utf-8') as f:
-        json.dump(final_data, f, ensure_ascii=False, indent=2)
+    changed = cache.write_output(final_data)
+
+    # Navigation manifest + per-theme content shards loaded lazily by js/app.js
+    # (with release, also their minified, precompressed, content-hashed copies)
+    publish_site(MAIN_JSON_OUTPUT, changed, release=release)
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Merge local translations and publish them to the main JSON.")
+    parser.add_argument("--full", action="store_true", help="Ignore the build manifest and rebuild every theme")
+    parser.add_argument("--release", action="store_true",
+                        help="Also publish minified, .gz/.br, content-hashed artifacts (scripts/publish_artifacts.py)")
+    args = parser.parse_args()
+
     print("Starting Translation Deployment Pipeline...")
+    recover(TX_DIR) # Undo the bulk moves of an interrupted run
     sync_merged_status() # Check existing files first
     merge_local_translations()
-    publish_to_main_json()
+    publish_to_main_json(full=args.full, release=args.release)
     print("\nDeployment Complete! Site data updated.")
 
 if __name__ == "__main__":
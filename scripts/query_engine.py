@@ -0,0 +1,428 @@
+"""
+Ranked search over the corpus store, for offline tooling.
+
+The static index of search_index.py only says which publications hold a
+term. This module indexes the same documents (one per publication) with
+the same Japanese analysis, in the SQLite corpus store, keeping what a
+ranked search needs:
+
+    search_docs    (dataset, doc, pub_id, title_len, body_len)
+    search_terms   (dataset, field, term, df, docs, tfs)   posting lists as uint32 arrays
+    search_meta    (dataset, source, docs, avg_title_len, avg_body_len)
+
+Fields are "title" (volume, theme, title and publication titles, JP and
+PT) and "body" (content and content_ptbr). Japanese runs give bigrams
+plus the run-final character, as in the site index; Portuguese words are
+accent-folded and stemmed ('purificação', 'purificações' -> 'purific'),
+so a query finds the inflected forms. The index is rebuilt when the
+dataset is re-imported.
+
+Query syntax: words and "quoted phrases", all required; a title: or
+body: prefix restricts one of them to a field. A single Japanese
+character matches as a prefix. Phrases are checked against the text of
+the candidates. Results are ranked by BM25.
+
+    python3 scripts/query_engine.py --json data/shin_college_data.json 浄霊 薬毒
+    python3 scripts/query_engine.py 'body:"purificação"' --limit 5
+    python3 scripts/query_engine.py --json data/shin_college_data.json --benchmark
+"""
+
+import re
+import json
+import math
+import time
+import argparse
+from array import array
+from collections import Counter
+
+from corpus_store import CorpusStore, DEFAULT_STORE_PATH
+from search_index import LATIN_PATTERN, TOKEN_PATTERN, fold
+
+FIELDS = ("title", "body")
+TITLE_FIELDS = ("publication_title", "publication_title_ptbr")
+BODY_FIELDS = ("content", "content_ptbr")
+
+# BM25 parameters; title hits weigh more than body hits when no field is given
+K1 = 1.2
+B = 0.75
+FIELD_WEIGHTS = {"title": 2.0, "body": 1.0}
+
+# Folded Portuguese suffixes, longest first; a stem keeps at least MIN_STEM characters
+PT_SUFFIXES = (
+    "amentos", "imentos", "amento", "imento", "acoes", "icoes", "idades", "mente", "idade",
+    "ismos", "istas", "adores", "ismo", "ista", "ador", "acao", "icao", "coes", "cao",
+    "ados", "adas", "idos", "idas", "ado", "ada", "ido", "ida", "ar", "er", "ir",
+    "os", "as", "es", "o", "a", "e", "s",
+)
+MIN_STEM = 4
+
+QUERY_PATTERN = re.compile(r'(?:(title|body):)?(?:"([^"]*)"|(\S+))')
+
+BENCHMARK_QUERIES = ("浄霊 薬毒", "purificação", "霊界", "title:自然農法", '"霊界の構成"', "Meishu-Sama fé")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_meta (
+    dataset TEXT PRIMARY KEY,
+    source REAL NOT NULL,
+    docs INTEGER NOT NULL,
+    avg_title_len REAL NOT NULL,
+    avg_body_len REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS search_docs (
+    dataset TEXT NOT NULL,
+    doc INTEGER NOT NULL,
+    pub_id TEXT NOT NULL,
+    title_len INTEGER NOT NULL,
+    body_len INTEGER NOT NULL,
+    PRIMARY KEY (dataset, doc)
+);
+CREATE TABLE IF NOT EXISTS search_terms (
+    dataset TEXT NOT NULL,
+    field TEXT NOT NULL,
+    term TEXT NOT NULL,
+    df INTEGER NOT NULL,
+    docs BLOB NOT NULL,
+    tfs BLOB NOT NULL,
+    PRIMARY KEY (dataset, field, term)
+);
+"""
+
+
+def stem_pt(word):
+    """Strips the longest Portuguese suffix of a folded word (light stemmer, no dictionary)."""
+    if len(word) <= MIN_STEM or word.isdigit():
+        return word
+    for suffix in PT_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            return word[:-len(suffix)]
+    return word
+
+
+def analyze(text):
+    """Index terms of text: stemmed Portuguese words, Japanese bigrams and run-final characters."""
+    for match in TOKEN_PATTERN.finditer(fold(text)):
+        token = match.group(0)
+        if LATIN_PATTERN.fullmatch(token):
+            yield stem_pt(token)
+        else:
+            for i in range(len(token) - 1):
+                yield token[i:i + 2]
+            yield token[-1]
+
+
+def query_terms(text):
+    """[(term, is_prefix)] of one query keyword or phrase."""
+    terms = []
+    for match in TOKEN_PATTERN.finditer(fold(text)):
+        token = match.group(0)
+        if LATIN_PATTERN.fullmatch(token):
+            terms.append((stem_pt(token), False))
+        elif len(token) == 1:
+            terms.append((token, True))
+        else:
+            terms.extend((token[i:i + 2], False) for i in range(len(token) - 1))
+    return terms
+
+
+def parse_query(query, field=None):
+    """[(field or None, text, is_phrase)] of the query."""
+    clauses = []
+    for match in QUERY_PATTERN.finditer(query):
+        prefix, phrase, word = match.groups()
+        text = phrase if phrase is not None else word
+        if text and text.strip():
+            clauses.append((prefix or field, text, phrase is not None))
+    return clauses
+
+
+def field_texts(volume, theme, title, pub):
+    """{"title": text, "body": text} of a publication and its parents."""
+    names = [volume.get("volume"), volume.get("volume_ptbr"), theme.get("theme"), theme.get("theme_ptbr"),
+             title.get("title"), title.get("title_ptbr")] + [pub.get(k) for k in TITLE_FIELDS]
+    return {
+        "title": " ".join(n for n in names if n),
+        "body": " ".join(pub.get(k) or "" for k in BODY_FIELDS),
+    }
+
+
+class QueryEngine:
+    def __init__(self, store):
+        self.store = store
+        self.conn = store.conn
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+        self._docs = {}
+
+    # --- Index ---
+
+    def _source_stamp(self, dataset):
+        row = self.conn.execute("SELECT imported_at FROM sources WHERE name = ?", (f"json:{dataset}",)).fetchone()
+        return row[0] if row else 0.0
+
+    def ensure_index(self, dataset):
+        """Builds the index of dataset unless it is current. Returns True if built."""
+        row = self.conn.execute("SELECT source FROM search_meta WHERE dataset = ?", (dataset,)).fetchone()
+        if row is not None and row[0] == self._source_stamp(dataset):
+            return False
+        self.build_index(dataset)
+        return True
+
+    def _documents(self, dataset):
+        """Yields (pub id, field texts) in document order."""
+        volumes = {v_id: json.loads(data) for v_id, data in self.conn.execute(
+            "SELECT id, data FROM volumes WHERE dataset = ?", (dataset,))}
+        themes = {t_id: (v_id, json.loads(data)) for t_id, v_id, data in self.conn.execute(
+            "SELECT id, volume_id, data FROM themes WHERE dataset = ?", (dataset,))}
+        titles = {ti_id: json.loads(data) for ti_id, data in self.conn.execute(
+            "SELECT id, data FROM titles WHERE dataset = ?", (dataset,))}
+
+        for pub_id, title_id, theme_id, data in self.conn.execute("""
+                SELECT p.id, p.title_id, p.theme_id, p.data FROM publications p
+                JOIN themes t ON t.dataset = p.dataset AND t.id = p.theme_id
+                JOIN volumes v ON v.dataset = t.dataset AND v.id = t.volume_id
+                JOIN titles ti ON ti.dataset = p.dataset AND ti.id = p.title_id
+                WHERE p.dataset = ?
+                ORDER BY v.position, t.position, ti.position, p.position
+                """, (dataset,)).fetchall():
+            v_id, theme = themes[theme_id]
+            yield pub_id, field_texts(volumes[v_id], theme, titles[title_id], json.loads(data))
+
+    def build_index(self, dataset):
+        postings = {field: {} for field in FIELDS}
+        docs = []
+        for doc, (pub_id, texts) in enumerate(self._documents(dataset)):
+            lengths = []
+            for field in FIELDS:
+                counts = Counter(analyze(texts[field]))
+                lengths.append(sum(counts.values()))
+                field_postings = postings[field]
+                for term, tf in counts.items():
+                    entry = field_postings.get(term)
+                    if entry is None:
+                        entry = field_postings[term] = (array('I'), array('I'))
+                    entry[0].append(doc)
+                    entry[1].append(tf)
+            docs.append((dataset, doc, pub_id, lengths[0], lengths[1]))
+
+        count = len(docs)
+        with self.conn:
+            for table in ("search_meta", "search_docs", "search_terms"):
+                self.conn.execute(f"DELETE FROM {table} WHERE dataset = ?", (dataset,))
+            self.conn.executemany("INSERT INTO search_docs VALUES (?, ?, ?, ?, ?)", docs)
+            self.conn.executemany("INSERT INTO search_terms VALUES (?, ?, ?, ?, ?, ?)", (
+                (dataset, field, term, len(doc_list), doc_list.tobytes(), tfs.tobytes())
+                for field in FIELDS for term, (doc_list, tfs) in postings[field].items()
+            ))
+            self.conn.execute("INSERT INTO search_meta VALUES (?, ?, ?, ?, ?)", (
+                dataset, self._source_stamp(dataset), count,
+                sum(d[3] for d in docs) / count if count else 0.0,
+                sum(d[4] for d in docs) / count if count else 0.0,
+            ))
+        self._docs.pop(dataset, None)
+        terms = sum(len(postings[field]) for field in FIELDS)
+        print(f"Query index of '{dataset}': {count} publications, {terms} terms.")
+
+    # --- Search ---
+
+    def _doc_table(self, dataset):
+        if dataset not in self._docs:
+            meta = self.conn.execute(
+                "SELECT docs, avg_title_len, avg_body_len FROM search_meta WHERE dataset = ?",
+                (dataset,)).fetchone()
+            if meta is None:
+                raise ValueError(f"No query index for dataset '{dataset}' (import it first).")
+            rows = self.conn.execute(
+                "SELECT pub_id, title_len, body_len FROM search_docs WHERE dataset = ? ORDER BY doc",
+                (dataset,)).fetchall()
+            self._docs[dataset] = {
+                "count": meta[0],
+                "avg": {"title": meta[1] or 1.0, "body": meta[2] or 1.0},
+                "ids": [r[0] for r in rows],
+                "lengths": {"title": [r[1] for r in rows], "body": [r[2] for r in rows]},
+            }
+        return self._docs[dataset]
+
+    def _postings(self, dataset, field, term, is_prefix):
+        """{doc: tf} of term in field; a prefix sums the terms starting with it."""
+        if is_prefix:
+            rows = self.conn.execute(
+                "SELECT docs, tfs FROM search_terms WHERE dataset = ? AND field = ? AND term >= ? AND term < ?",
+                (dataset, field, term, term + "\uffff"))
+        else:
+            rows = self.conn.execute(
+                "SELECT docs, tfs FROM search_terms WHERE dataset = ? AND field = ? AND term = ?",
+                (dataset, field, term))
+        found = {}
+        for doc_bytes, tf_bytes in rows:
+            docs, tfs = array('I'), array('I')
+            docs.frombytes(doc_bytes)
+            tfs.frombytes(tf_bytes)
+            for doc, tf in zip(docs, tfs):
+                found[doc] = found.get(doc, 0) + tf
+        return found
+
+    def _texts(self, dataset, pub_ids):
+        """{pub id: field texts} of the given publications."""
+        texts = {}
+        for pub_id in pub_ids:
+            row = self.conn.execute("""
+                SELECT v.data, t.data, ti.data, p.data FROM publications p
+                JOIN themes t ON t.dataset = p.dataset AND t.id = p.theme_id
+                JOIN volumes v ON v.dataset = t.dataset AND v.id = t.volume_id
+                JOIN titles ti ON ti.dataset = p.dataset AND ti.id = p.title_id
+                WHERE p.dataset = ? AND p.id = ?
+                """, (dataset, pub_id)).fetchone()
+            if row:
+                texts[pub_id] = {k: fold(v) for k, v in field_texts(*map(json.loads, row)).items()}
+        return texts
+
+    def search(self, query, dataset="main", field=None, limit=20):
+        """[(score, publication id)] of the publications matching every clause of query, best first."""
+        docs = self._doc_table(dataset)
+        count = docs["count"]
+        scores = None
+        phrases = []
+
+        for clause_field, text, is_phrase in parse_query(query, field):
+            fields = (clause_field,) if clause_field else FIELDS
+            terms = query_terms(text)
+            if not terms:
+                continue
+            if is_phrase:
+                phrases.append((fields, fold(text)))
+
+            clause_docs = None
+            clause_scores = {}
+            for term, is_prefix in terms:
+                term_docs = set()
+                for f in fields:
+                    postings = self._postings(dataset, f, term, is_prefix)
+                    if not postings:
+                        continue
+                    term_docs.update(postings)
+                    idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    avg = docs["avg"][f]
+                    lengths = docs["lengths"][f]
+                    weight = FIELD_WEIGHTS[f] if len(fields) > 1 else 1.0
+                    for doc, tf in postings.items():
+                        norm = K1 * (1 - B + B * lengths[doc] / avg)
+                        clause_scores[doc] = clause_scores.get(doc, 0.0) + weight * idf * tf * (K1 + 1) / (tf + norm)
+                clause_docs = term_docs if clause_docs is None else clause_docs & term_docs
+                if not clause_docs:
+                    return []
+
+            if scores is None:
+                scores = {doc: clause_scores[doc] for doc in clause_docs}
+            else:
+                scores = {doc: scores[doc] + clause_scores[doc] for doc in clause_docs if doc in scores}
+            if not scores:
+                return []
+
+        if not scores:
+            return []
+        ranked = sorted(((score, docs["ids"][doc]) for doc, score in scores.items()), key=lambda r: -r[0])
+
+        if phrases:
+            # Bigrams only say the characters are there: keep the candidates that hold the phrase
+            verified = []
+            for start in range(0, len(ranked), 200):
+                batch = ranked[start:start + 200]
+                texts = self._texts(dataset, [pub_id for _, pub_id in batch])
+                verified.extend(
+                    (score, pub_id) for score, pub_id in batch
+                    if all(any(phrase in texts[pub_id][f] for f in fields) for fields, phrase in phrases)
+                )
+                if limit and len(verified) >= limit:
+                    break
+            ranked = verified
+        return ranked[:limit] if limit else ranked
+
+    def describe(self, dataset, pub_id):
+        """(volume, theme, title, publication title) of a publication."""
+        return self.conn.execute("""
+            SELECT v.name, t.name, ti.title, p.publication_title FROM publications p
+            JOIN themes t ON t.dataset = p.dataset AND t.id = p.theme_id
+            JOIN volumes v ON v.dataset = t.dataset AND v.id = t.volume_id
+            JOIN titles ti ON ti.dataset = p.dataset AND ti.id = p.title_id
+            WHERE p.dataset = ? AND p.id = ?
+        """, (dataset, pub_id)).fetchone()
+
+
+def open_engine(json_path=None, dataset="main", store_path=DEFAULT_STORE_PATH):
+    """QueryEngine over the store, with json_path synced as dataset and its index current."""
+    store = CorpusStore(store_path)
+    if json_path:
+        store.sync_json(json_path, dataset)
+    engine = QueryEngine(store)
+    engine.ensure_index(dataset)
+    return engine
+
+
+def scan(data, query, field=None):
+    """
+    The full scan the tooling used: every keyword as a substring of the
+    lowercased text, of its field when the clause has one (title:/body:).
+    """
+    clauses = [(clause_field, text.lower()) for clause_field, text, _ in parse_query(query, field)]
+    hits = 0
+    for volume in data:
+        for theme in volume.get("themes", []):
+            for title in theme.get("titles", []):
+                for pub in title.get("publications", []):
+                    texts = {f: text.lower() for f, text in field_texts(volume, theme, title, pub).items()}
+                    texts[None] = texts["title"] + " " + texts["body"]
+                    hits += all(k in texts[clause_field] for clause_field, k in clauses)
+    return hits
+
+
+def benchmark(engine, json_path, dataset, queries):
+    start = time.perf_counter()
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    load_time = time.perf_counter() - start
+    print(f"Loading {json_path}: {load_time * 1000:.0f} ms (paid by every full-scan script)")
+
+    engine._doc_table(dataset)
+    for query in queries:
+        start = time.perf_counter()
+        scanned = scan(data, query)
+        scan_time = time.perf_counter() - start
+        start = time.perf_counter()
+        found = engine.search(query, dataset, limit=0)
+        engine_time = time.perf_counter() - start
+        print(f"{query!r:28} scan {scan_time * 1000:8.1f} ms, {scanned:5} hits | "
+              f"index {engine_time * 1000:7.1f} ms, {len(found):5} hits")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ranked search over the corpus store.")
+    parser.add_argument("query", nargs="*", help='Words, "phrases", title:/body: prefixes')
+    parser.add_argument("--json", help="Sync this JSON into the store first")
+    parser.add_argument("--dataset", default="main")
+    parser.add_argument("--field", choices=FIELDS, help="Search only this field")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH)
+    parser.add_argument("--benchmark", action="store_true", help="Compare with a full scan of --json")
+    args = parser.parse_args()
+
+    engine = open_engine(args.json, args.dataset, args.store)
+
+    if args.benchmark:
+        if not args.json:
+            parser.error("--benchmark needs --json")
+        benchmark(engine, args.json, args.dataset, [" ".join(args.query)] if args.query else BENCHMARK_QUERIES)
+        return
+    if not args.query:
+        parser.print_usage()
+        return
+
+    start = time.perf_counter()
+    results = engine.search(" ".join(args.query), args.dataset, args.field, args.limit)
+    elapsed = time.perf_counter() - start
+    for score, pub_id in results:
+        volume, theme, title, pub_title = engine.describe(args.dataset, pub_id)
+        print(f"{score:7.2f}  {pub_id}  {volume} / {theme} / {title} / {pub_title}")
+    print(f"{len(results)} results ({elapsed * 1000:.1f} ms)")
+
+if __name__ == "__main__":
+    main()
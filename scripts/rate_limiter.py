@@ -0,0 +1,271 @@
+"""
+Shared rate limiter / concurrency controller for the Gemini workers.
+
+All workers go through one RateController instead of sleeping on their own
+after a 429:
+  - two token buckets keep requests-per-minute and tokens-per-minute under
+    the quota;
+  - the number of requests in flight follows AIMD: it doubles per "round"
+    of successful calls until the first 429 (slow start), then grows by +1
+    per round, is halved on ResourceExhausted (429) and held when latency
+    climbs well above the best observed;
+  - after a 429 every worker pauses for the same cooldown, instead of each
+    thread hammering the API with its own retry loop.
+
+    controller = RateController(rpm=60, tpm=1_000_000, max_concurrency=16)
+    model = controller.wrap(genai.GenerativeModel('gemini-2.5-pro'))
+    model.generate_content(...)      # waits for a slot, retries 429s
+    controller.report()
+
+AsyncRateController does the same for asyncio workers, wrapping
+generate_content_async.
+"""
+
+import time
+import asyncio
+import threading
+
+DEFAULT_RPM = 60
+DEFAULT_TPM = 1_000_000
+DEFAULT_MAX_CONCURRENCY = 16
+
+# Cooldown after a 429 doubles while they keep coming
+COOLDOWN_BASE = 2.0
+COOLDOWN_MAX = 60.0
+
+# Latency above this multiple of the best observed stops the additive increase
+LATENCY_FACTOR = 2.0
+
+
+def is_throttled(error):
+    """True for Gemini quota errors (google.api_core ResourceExhausted / HTTP 429)."""
+    return type(error).__name__ == "ResourceExhausted" or "429" in str(error)
+
+
+def estimate_prompt_tokens(contents):
+    """Input + output estimate: ~1 token per Japanese character, answer about the same size."""
+    if isinstance(contents, str):
+        contents = [contents]
+    chars = sum(len(c) for c in contents if isinstance(c, str))
+    return 2 * chars
+
+
+class TokenBucket:
+    """`rate` units per `period` seconds, holding at most `capacity`."""
+
+    def __init__(self, rate, period=60.0, capacity=None):
+        self.rate = float(rate) / period
+        self.capacity = float(capacity if capacity is not None else rate)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` can be taken (requests larger than the bucket only need it full)."""
+        self._refill(now)
+        needed = min(amount, self.capacity)
+        if self.level >= needed:
+            return 0.0
+        return (needed - self.level) / self.rate
+
+    def take(self, amount, now):
+        self._refill(now)
+        self.level -= amount
+
+
+class RateController:
+    def __init__(self, rpm=DEFAULT_RPM, tpm=DEFAULT_TPM, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 min_concurrency=1, initial_concurrency=None, period=60.0, max_retries=8):
+        # Bursts are limited to a quarter of the per-period quota
+        self.requests = TokenBucket(rpm, period, capacity=max(1, rpm / 4))
+        self.tokens = TokenBucket(tpm, period, capacity=max(1, tpm / 4))
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.limit = float(initial_concurrency or min(4, max_concurrency))
+        # Slow start (+1 per success) below this, +1 per round above it
+        self.threshold = float(max_concurrency)
+        self.max_retries = max_retries
+
+        self.cond = threading.Condition()
+        self.in_flight = 0
+        self.resume_at = 0.0
+        self.cooldown = COOLDOWN_BASE
+        self.last_decrease = 0.0
+        self.best_latency = None
+
+        self.stats = {"requests": 0, "throttled": 0, "errors": 0, "tokens": 0,
+                      "wait": 0.0, "peak_concurrency": self.limit}
+
+    # --- Slots ---
+
+    def _try_acquire(self, tokens, started):
+        """
+        Takes a slot and returns 0, or returns how long to wait before trying
+        again (None = until a request finishes). Caller holds self.cond.
+        """
+        now = time.monotonic()
+        if now < self.resume_at:
+            return self.resume_at - now
+        if self.in_flight >= int(self.limit):
+            return None
+        wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+        if wait > 0:
+            return wait
+        self.requests.take(1, now)
+        self.tokens.take(tokens, now)
+        self.in_flight += 1
+        self.stats["wait"] += now - started
+        return 0
+
+    def acquire(self, tokens):
+        """Blocks until a request of `tokens` may start."""
+        started = time.monotonic()
+        with self.cond:
+            while True:
+                wait = self._try_acquire(tokens, started)
+                if wait == 0:
+                    return
+                self.cond.wait(wait)
+
+    def release(self, latency=None, throttled=False):
+        with self.cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+
+            if throttled:
+                self.stats["throttled"] += 1
+                # One decrease per round trip, not one per worker that saw the same 429
+                window = self.best_latency or 1.0
+                if now - self.last_decrease > window:
+                    self.limit = max(self.min_concurrency, self.limit / 2)
+                    self.threshold = self.limit
+                    self.last_decrease = now
+                    self.resume_at = max(self.resume_at, now + self.cooldown)
+                    self.cooldown = min(self.cooldown * 2, COOLDOWN_MAX)
+            elif latency is not None:
+                self.cooldown = COOLDOWN_BASE
+                if self.best_latency is None or latency < self.best_latency:
+                    self.best_latency = latency
+                if latency <= self.best_latency * LATENCY_FACTOR:
+                    step = 1.0 if self.limit < self.threshold else 1.0 / self.limit
+                    self.limit = min(self.max_concurrency, self.limit + step)
+                    self.stats["peak_concurrency"] = max(self.stats["peak_concurrency"], self.limit)
+
+            self.cond.notify_all()
+
+    # --- Calls ---
+
+    def _finished(self, tokens, error=None):
+        with self.cond:
+            if error is None:
+                self.stats["requests"] += 1
+                self.stats["tokens"] += tokens
+            else:
+                self.stats["errors"] += 1
+
+    def call(self, fn, tokens=0):
+        """Runs fn() inside a slot, retrying quota errors after the shared cooldown."""
+        for attempt in range(self.max_retries + 1):
+            self.acquire(tokens)
+            started = time.monotonic()
+            try:
+                result = fn()
+            except Exception as e:
+                if is_throttled(e) and attempt < self.max_retries:
+                    self.release(throttled=True)
+                    continue
+                self._finished(tokens, e)
+                self.release()
+                raise
+            self.release(latency=time.monotonic() - started)
+            self._finished(tokens)
+            return result
+
+    def wrap(self, model):
+        return ThrottledModel(model, self)
+
+    def report(self):
+        s = self.stats
+        print(f"Rate controller: {s['requests']} requests, {s['throttled']} throttled (429), "
+              f"{s['errors']} errors, ~{s['tokens']} tokens; concurrency now {int(self.limit)} "
+              f"(peak {int(s['peak_concurrency'])}), {s['wait']:.1f}s waited for slots (all workers).")
+
+
+class ThrottledModel:
+    """GenerativeModel stand-in whose generate_content goes through a RateController."""
+
+    def __init__(self, model, controller):
+        self.model = model
+        self.controller = controller
+        self.model_name = getattr(model, "model_name", str(model))
+
+    def generate_content(self, contents, *args, **kwargs):
+        tokens = estimate_prompt_tokens(contents)
+        return self.controller.call(lambda: self.model.generate_content(contents, *args, **kwargs), tokens)
+
+
+class AsyncRateController(RateController):
+    """RateController for coroutines: waiting for a slot does not block the event loop."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.changed = None
+
+    def release(self, latency=None, throttled=False):
+        super().release(latency, throttled)
+        # Wake the coroutines waiting for a slot
+        if self.changed is not None:
+            self.changed.set()
+            self.changed = None
+
+    async def acquire_async(self, tokens):
+        started = time.monotonic()
+        while True:
+            with self.cond:
+                wait = self._try_acquire(tokens, started)
+                if wait == 0:
+                    return
+                if self.changed is None:
+                    self.changed = asyncio.Event()
+                changed = self.changed
+            try:
+                await asyncio.wait_for(changed.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def call_async(self, coro_fn, tokens=0):
+        """Awaits coro_fn() inside a slot, retrying quota errors after the shared cooldown."""
+        for attempt in range(self.max_retries + 1):
+            await self.acquire_async(tokens)
+            started = time.monotonic()
+            try:
+                result = await coro_fn()
+            except asyncio.CancelledError:
+                self.release()
+                raise
+            except Exception as e:
+                if is_throttled(e) and attempt < self.max_retries:
+                    self.release(throttled=True)
+                    continue
+                self._finished(tokens, e)
+                self.release()
+                raise
+            self.release(latency=time.monotonic() - started)
+            self._finished(tokens)
+            return result
+
+    def wrap(self, model):
+        return AsyncThrottledModel(model, self)
+
+
+class AsyncThrottledModel(ThrottledModel):
+    """Adds generate_content_async, going through an AsyncRateController."""
+
+    async def generate_content_async(self, contents, *args, **kwargs):
+        tokens = estimate_prompt_tokens(contents)
+        return await self.controller.call_async(
+            lambda: self.model.generate_content_async(contents, *args, **kwargs), tokens
+        )
@@ -1,13 +1,148 @@
 import json
 import os
+import re
 import shutil
-import math
+
+from batch_translation import estimate_tokens
 
 # Configuration
 MAIN_JSON = "data/shin_college_data.json"
 OUT_DIR = "data/temasSeparados"
 PARTES_DIR = os.path.join(OUT_DIR, "partes")
-ITEMS_PER_PART = 20
+BKP_DIR = os.path.join(OUT_DIR, "bkp")
+
+# Parts are packed by size instead of a fixed 20 publications: estimated
+# Japanese input tokens per part (titles + content), and an item cap for
+# themes made of many one-line publications
+PART_TOKEN_BUDGET = 16000
+MAX_ITEMS_PER_PART = 40
+# A part kept from the last run may grow this much past the budget before it is repacked
+PART_BUDGET_SLACK = 1.25
+
+# Publications of every part of the last run (kept across the clean below).
+# Without it (first run) the layout is read from the part files on disk
+PART_MAP_PATH = os.path.join(OUT_DIR, "part_map.json")
+PART_MAP_VERSION = 1
+
+# Same naming as data/merge_translations.py, which pairs _parteNN_pt.json by number
+PART_PATTERN = re.compile(r"^(.+?)_parte(\d+)(_pt)?\.json$")
+
+
+def item_tokens(item):
+    """Estimated input tokens of a flattened publication."""
+    text = f"{item['title']}\n{item['publication_title']}\n{item['content'] or ''}"
+    return estimate_tokens(text)
+
+
+def item_key(item):
+    """Stable key of a flattened publication: its ID, else its position."""
+    return item.get("id") or position_key(item)
+
+
+def position_key(item):
+    return f"{item['title_idx']}/{item['pub_idx']}"
+
+
+def same_items(keys, items):
+    """True if items are the publications of keys, in order (parts written before the IDs hold positions)."""
+    return len(keys) == len(items) and all(key in (item["id"], position_key(item)) for key, item in zip(keys, items))
+
+
+def pack_parts(tokens, start=0):
+    """
+    Bin-packs items start.. in order: a part is closed before it would pass
+    PART_TOKEN_BUDGET or MAX_ITEMS_PER_PART. An item larger than the budget
+    gets a part of its own. Returns [[item indexes]].
+    """
+    parts = []
+    current = []
+    current_tokens = 0
+    for i in range(start, len(tokens)):
+        if current and (current_tokens + tokens[i] > PART_TOKEN_BUDGET or len(current) >= MAX_ITEMS_PER_PART):
+            parts.append(current)
+            current = []
+            current_tokens = 0
+        current.append(i)
+        current_tokens += tokens[i]
+    if current:
+        parts.append(current)
+    return parts
+
+
+def plan_parts(items, previous_parts=None, translated=()):
+    """
+    [[item indexes]] of each part. The leading parts of the last run that
+    still hold the same publications in the same order (and did not grow
+    past the slack, unless their number is in translated) keep their number
+    and contents, so the _pt.json files made from them stay valid; the rest
+    of the theme is packed again.
+    """
+    tokens = [item_tokens(item) for item in items]
+
+    parts = []
+    start = 0
+    for number, previous in enumerate(previous_parts or [], 1):
+        end = start + len(previous)
+        if not same_items(previous, items[start:end]):
+            break
+        if number not in translated and sum(tokens[start:end]) > PART_TOKEN_BUDGET * PART_BUDGET_SLACK:
+            break
+        parts.append(list(range(start, end)))
+        start = end
+    return parts + pack_parts(tokens, start)
+
+
+def load_part_map():
+    if not os.path.exists(PART_MAP_PATH):
+        return {}
+    try:
+        with open(PART_MAP_PATH, 'r', encoding='utf-8') as f:
+            part_map = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: ignoring unreadable {PART_MAP_PATH}: {e}")
+        return {}
+    if part_map.get("version") != PART_MAP_VERSION or part_map.get("budget") != PART_TOKEN_BUDGET:
+        return {}
+    return part_map.get("themes", {})
+
+
+def read_part_files(directories=(BKP_DIR, PARTES_DIR)):
+    """
+    Layout of the part files on disk, for a first run without part_map.json
+    (parts of 20 publications): {base_filename: {"parts": [[keys]],
+    "translated": [part numbers with a _pt.json]}}. partes/ wins over bkp/.
+    """
+    files = {}
+    translated = {}
+    for directory in directories:
+        if not os.path.isdir(directory):
+            continue
+        for name in os.listdir(directory):
+            match = PART_PATTERN.match(name)
+            if not match:
+                continue
+            base, number = match.group(1), int(match.group(2))
+            if match.group(3):
+                translated.setdefault(base, set()).add(number)
+            else:
+                files.setdefault(base, {})[number] = os.path.join(directory, name)
+
+    layout = {}
+    for base, numbered in files.items():
+        parts = []
+        # Only the run of parts 1, 2, ... without gaps
+        for number in range(1, len(numbered) + 1):
+            if number not in numbered:
+                break
+            try:
+                with open(numbered[number], 'r', encoding='utf-8') as f:
+                    pubs = json.load(f).get("publications", [])
+                parts.append([item_key(pub) for pub in pubs])
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Warning: ignoring unreadable {numbered[number]}: {e}")
+                break
+        layout[base] = {"parts": parts, "translated": sorted(translated.get(base, ()))}
+    return layout
 
 def main():
     print(f"Loading {MAIN_JSON}...")
@@ -18,6 +153,15 @@ def main():
         print(f"Error loading main JSON: {e}")
         return
 
+    previous_map = load_part_map()
+    # Read before the clean below: the files that are there, and which parts have a translation
+    on_disk = read_part_files()
+    if not previous_map and on_disk:
+        print(f"No {PART_MAP_PATH}: keeping the part layout of the {len(on_disk)} themes on disk where possible.")
+    part_map = {}
+    kept_parts = 0
+    moved = []
+
     # Clean Output Directory
     if os.path.exists(OUT_DIR):
         print(f"Cleaning {OUT_DIR}...")
@@ -72,6 +216,8 @@ def main():
                         has_trans = True
                     
                     item = {
+                        "id": pub.get('id', ''),
+                        "title_id": title_group.get('id', ''),
                         "title_idx": t_idx,
                         "title": t_jp,
                         "title_ptbr": t_pt,
@@ -89,6 +235,7 @@ def main():
             theme_data = {
                 "source_file": "shin_college_data_translated.json",
                 "volume": vol_title_raw,
+                "theme_id": theme.get('id', ''),
                 "theme_name": theme_title_raw,
                 "theme_name_ptbr": theme_title_ptbr_raw,
                 "publications": flat_items
@@ -102,12 +249,26 @@ def main():
             # Split into Parts
             count_items = len(flat_items)
             if count_items > 0:
-                num_parts = math.ceil(count_items / ITEMS_PER_PART)
-                
-                for i in range(num_parts):
-                    start = i * ITEMS_PER_PART
-                    end = start + ITEMS_PER_PART
-                    chunk = flat_items[start:end]
+                disk = on_disk.get(base_filename, {})
+                previous_parts = previous_map.get(base_filename, {}).get("parts") or disk.get("parts")
+                translated = set(disk.get("translated", ()))
+                parts = plan_parts(flat_items, previous_parts, translated)
+                num_parts = len(parts)
+                kept = 0
+                for previous, part in zip(previous_parts or [], parts):
+                    if not same_items(previous, [flat_items[i] for i in part]):
+                        break
+                    kept += 1
+                kept_parts += kept
+                moved += [f"{base_filename}_parte{n:02d}_pt.json" for n in sorted(translated) if n > kept]
+
+                part_map[base_filename] = {
+                    "parts": [[item_key(flat_items[i]) for i in part] for part in parts],
+                    "tokens": [sum(item_tokens(flat_items[i]) for i in part) for part in parts],
+                }
+
+                for i, part in enumerate(parts):
+                    chunk = [flat_items[j] for j in part]
                     
                     part_num = i + 1
                     part_filename = f"{base_filename}_parte{part_num:02d}.json"
@@ -118,6 +279,7 @@ def main():
                         "part": part_num,
                         "total_parts": num_parts,
                         "volume": vol_title_raw,
+                        "theme_id": theme.get('id', ''),
                         "theme_name": theme_title_raw,
                         "theme_name_ptbr": theme_title_ptbr_raw,
                         "publications": chunk
@@ -128,9 +290,24 @@ def main():
                     
                     total_parts += 1
 
+    with open(PART_MAP_PATH, 'w', encoding='utf-8') as f:
+        json.dump({"version": PART_MAP_VERSION, "budget": PART_TOKEN_BUDGET, "themes": part_map},
+                  f, ensure_ascii=False, indent=1)
+
+    part_tokens = sorted(t for theme in part_map.values() for t in theme["tokens"])
     print(f"Regeneration Complete.")
     print(f"Themes: {total_themes}")
-    print(f"Parts: {total_parts}")
+    print(f"Parts: {total_parts} ({kept_parts} unchanged from the last run)")
+    if moved:
+        # merge_translations.py pairs _parteNN_pt.json with _parteNN.json by number
+        print(f"Warning: {len(moved)} translated parts were repacked; their _pt.json no longer match "
+              f"the part of the same number (data/align_parts.py realigns them):")
+        for name in moved:
+            print(f"    {name}")
+    if part_tokens:
+        print(f"Part size (estimated tokens): median {part_tokens[len(part_tokens) // 2]}, "
+              f"p90 {part_tokens[len(part_tokens) * 9 // 10]}, max {part_tokens[-1]} "
+              f"(budget {PART_TOKEN_BUDGET}, {MAX_ITEMS_PER_PART} publications at most)")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,245 @@
+"""
+Inverted search index of the site, built at publish time.
+
+js/app.js used to lowercase and concatenate the volume, theme, title,
+both publication titles and both bodies of every publication on each
+search. The publish step now writes posting lists instead:
+
+    site/search/meta.json        {"version", "documents", "shards": {key: term count}}
+    site/search/<key>.json       {term: [doc, delta, delta, ...]}
+
+Terms are Portuguese words after accent folding and lowercasing, and
+character bigrams of the Japanese runs (Japanese has no spaces) plus
+the last character of each run. Documents are the publications
+numbered in manifest order (volume, theme, title, publication), so the
+app maps a doc number back to its publication without an ID table.
+Posting lists are sorted and delta-encoded. Shards are keyed by term
+prefix: the first letter of Latin terms, the first character of kana
+terms, and the 128-codepoint block of the first character of the others.
+
+Search intersects the posting lists of every query term. Every
+Portuguese word of the query, and a single Japanese character, matches
+as a prefix (union of the terms that start with it): "purif" finds
+"purificacao", a mid-word substring such as "ficacao" finds nothing. A
+longer Japanese run is looked up by its bigrams, which only say its
+characters are there; the app then checks the candidates for the run
+itself, as query_engine.py does for phrases.
+
+The postings of each theme (doc numbers local to the theme) are cached
+in site.cache/index/ under the sha256 of the theme's texts; a publish
+only tokenizes the themes whose text changed and shifts the others.
+
+    python3 scripts/search_index.py data/shin_college_data.json
+"""
+
+import os
+import re
+import sys
+import json
+import hashlib
+import unicodedata
+
+from node_ids import fill_ids
+
+INDEX_VERSION = 1
+INDEX_DIR_NAME = "search"
+META_NAME = "meta.json"
+CACHE_DIR_NAME = "index"
+
+# Text of a publication that the search looks at, as in the old linear scan
+PUB_FIELDS = ("publication_title", "publication_title_ptbr", "content", "content_ptbr")
+
+COMBINING_PATTERN = re.compile(r'[\u0300-\u036f]')
+LATIN_PATTERN = re.compile(r'[a-z0-9]+')
+CJK_PATTERN = re.compile(r'[ぁ-ゖァ-ヺー々〆ヶ㐀-䶿一-鿿豈-﫿]+')
+TOKEN_PATTERN = re.compile(LATIN_PATTERN.pattern + '|' + CJK_PATTERN.pattern)
+
+
+def fold(text):
+    """Lowercase, without Latin accents ('Purificação' -> 'purificacao'); kana keep their dakuten."""
+    text = unicodedata.normalize('NFKD', text)
+    text = COMBINING_PATTERN.sub('', text)
+    return unicodedata.normalize('NFC', text).lower()
+
+
+def tokenize(text):
+    """Yields the index terms of text: Latin words, Japanese bigrams and run-final characters."""
+    for match in TOKEN_PATTERN.finditer(fold(text)):
+        token = match.group(0)
+        if LATIN_PATTERN.fullmatch(token):
+            yield token
+        else:
+            for i in range(len(token) - 1):
+                yield token[i:i + 2]
+            # The last character as a unigram: every character then starts a
+            # term, so a one-character query is a prefix lookup
+            yield token[-1]
+
+
+def shard_key(term):
+    first = term[0]
+    if first.isascii():
+        return first
+    code = ord(first)
+    if 0x3040 <= code <= 0x30ff:
+        # Kana start most bigrams: one shard per character
+        return f"k{code:04x}"
+    return f"u{code >> 7:03x}"
+
+
+def documents(data):
+    """Yields (doc number, publication, search text) in manifest order."""
+    doc = 0
+    for volume in data:
+        volume_text = f"{volume.get('volume', '')} {volume.get('volume_ptbr', '')}"
+        for theme in volume.get("themes", []):
+            theme_text = f"{theme.get('theme', '')} {theme.get('theme_ptbr', '')}"
+            for title in theme.get("titles", []):
+                title_text = f"{title.get('title', '')} {title.get('title_ptbr', '')}"
+                for pub in title.get("publications", []):
+                    text = " ".join([volume_text, theme_text, title_text] +
+                                    [pub.get(field) or "" for field in PUB_FIELDS])
+                    yield doc, pub, text
+                    doc += 1
+
+
+def theme_documents(data):
+    """Yields (theme id, [search text of each publication]) in manifest order."""
+    theme_id = None
+    texts = []
+    themes = {id(pub): theme["id"] for volume in data for theme in volume.get("themes", [])
+              for title in theme.get("titles", []) for pub in title.get("publications", [])}
+    for _, pub, text in documents(data):
+        if themes[id(pub)] != theme_id:
+            if texts:
+                yield theme_id, texts
+            theme_id, texts = themes[id(pub)], []
+        texts.append(text)
+    if texts:
+        yield theme_id, texts
+
+
+def theme_postings(texts):
+    """{term: [doc number within the theme]} of the texts of one theme."""
+    postings = {}
+    for doc, text in enumerate(texts):
+        for term in set(tokenize(text)):
+            postings.setdefault(term, []).append(doc)
+    return postings
+
+
+def cached_theme_postings(cache_dir, theme_id, texts, stats):
+    """theme_postings, read from cache_dir when the theme's texts did not change."""
+    sha256 = hashlib.sha256("\x00".join(texts).encode('utf-8')).hexdigest()
+    path = os.path.join(cache_dir, f"{theme_id}.json")
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get("version") == INDEX_VERSION and cached.get("sha256") == sha256:
+                stats["reused"] += 1
+                return cached["postings"]
+        except (OSError, ValueError):
+            pass
+
+    postings = theme_postings(texts)
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({"version": INDEX_VERSION, "sha256": sha256, "postings": postings},
+                  f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(temp_path, path)
+    stats["tokenized"] += 1
+    return postings
+
+
+def build_index(data, cache_dir=None):
+    """Returns (meta, {shard key: {term: delta-encoded doc list}})."""
+    postings = {}
+    count = 0
+    stats = {"reused": 0, "tokenized": 0}
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    themes = set()
+    for theme_id, texts in theme_documents(fill_ids(data)):
+        themes.add(theme_id)
+        if cache_dir:
+            local = cached_theme_postings(cache_dir, theme_id, texts, stats)
+        else:
+            local = theme_postings(texts)
+        # Themes come in document order: shifting keeps every list sorted
+        for term, docs in local.items():
+            target = postings.get(term)
+            if target is None:
+                target = postings[term] = []
+            target.extend([count + doc for doc in docs])
+        count += len(texts)
+
+    if cache_dir:
+        for name in os.listdir(cache_dir):
+            if name.endswith(".json") and name[:-len(".json")] not in themes:
+                os.remove(os.path.join(cache_dir, name))
+        print(f"Search index: {stats['tokenized']} themes tokenized, {stats['reused']} reused from {cache_dir}.")
+
+    shards = {}
+    for term in sorted(postings):
+        docs = postings[term]
+        shards.setdefault(shard_key(term), {})[term] = [docs[0]] + [b - a for a, b in zip(docs, docs[1:])]
+
+    meta = {
+        "version": INDEX_VERSION,
+        "documents": count,
+        "shards": {key: len(terms) for key, terms in sorted(shards.items())},
+    }
+    return meta, shards
+
+
+def decode_postings(deltas):
+    docs = []
+    total = 0
+    for delta in deltas:
+        total += delta
+        docs.append(total)
+    return docs
+
+
+def write_index(data, site_dir, publish):
+    """Writes meta.json and the changed term shards under site_dir/search (publish: site_shards.PublishManifest)."""
+    from site_shards import cache_dir_for, dump_compact
+
+    meta, shards = build_index(data, os.path.join(cache_dir_for(site_dir), CACHE_DIR_NAME))
+
+    names = {f"{INDEX_DIR_NAME}/{META_NAME}"}
+    written = 0
+    size = 0
+    for key, terms in shards.items():
+        text = dump_compact(terms)
+        size += len(text.encode('utf-8'))
+        name = f"{INDEX_DIR_NAME}/{key}.json"
+        names.add(name)
+        written += publish.write(name, text)
+    publish.remove_stale(INDEX_DIR_NAME, names)
+    publish.write(f"{INDEX_DIR_NAME}/{META_NAME}", dump_compact(meta))
+
+    terms = sum(meta["shards"].values())
+    print(f"Search index: {terms} terms over {meta['documents']} publications, "
+          f"{len(shards)} shards ({size // 1024} KB, {written} written).")
+    return meta, shards
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python3 scripts/search_index.py <shin_college_data.json> [site dir]")
+        return
+
+    from site_shards import PublishManifest, site_dir_for
+
+    with open(sys.argv[1], 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    site_dir = sys.argv[2] if len(sys.argv) > 2 else site_dir_for(sys.argv[1])
+    publish = PublishManifest(site_dir)
+    write_index(data, site_dir, publish)
+    publish.save()
+
+if __name__ == "__main__":
+    main()
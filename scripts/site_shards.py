@@ -0,0 +1,303 @@
+"""
+Lazily-loadable site data: a navigation manifest plus content shards.
+
+js/app.js used to fetch the whole shin_college_data.json, JP and PT
+bodies included, before rendering anything. The publish steps now also
+write, next to the main JSON:
+
+    site/manifest.json             volumes / themes / titles / publications with
+                                   only what navigation needs: ids, titles,
+                                   has_jp / has_pt flags, content_key for
+                                   repeated texts and each theme's shard
+    site/content/<theme id>.json   {"theme": id, "publications": {pub id: {the other fields}}}
+    site/search/                   inverted index of the same data (search_index.py)
+    site/assets.json, site/dist/   minified / .gz / .br content-hashed copies of all
+                                   of the above, in release mode (publish_artifacts.py)
+
+The app renders from the manifest and fetches a theme's shard when one
+of its titles is opened.
+
+Publishing is a delta: site/publish.json keeps the sha256 of every file
+of the last publish, so a shard (content or search) whose hash did not
+change is neither rewritten nor compared byte by byte, shards of themes
+that disappeared are removed, and "changed" / "removed" list what a
+deploy has to upload or delete after merging a single _pt.json.
+
+    python3 scripts/site_shards.py data/shin_college_data.json [--release]
+"""
+
+import os
+import sys
+import json
+import glob
+import hashlib
+
+from node_ids import fill_ids
+from search_index import write_index
+
+MANIFEST_NAME = "manifest.json"
+PUBLISH_NAME = "publish.json"
+PUBLISH_VERSION = 1
+CONTENT_DIR_NAME = "content"
+MANIFEST_VERSION = 1
+
+# Publication fields the app needs before a title is opened; everything
+# else (content, header, source, date, ...) goes to the theme's shard
+MANIFEST_PUB_FIELDS = ("id", "publication_title", "publication_title_ptbr")
+DEFAULT_PUB_TYPE = "publication"
+
+# Title keys only used while building the JSON
+DROPPED_TITLE_KEYS = ("origin_filename",)
+
+
+def site_dir_for(output_file):
+    """site/ directory next to a main JSON."""
+    return os.path.join(os.path.dirname(os.path.abspath(output_file)), "site")
+
+
+def cache_dir_for(site_dir):
+    """Build cache of a site directory, next to it so it is not deployed."""
+    return os.path.abspath(site_dir).rstrip(os.sep) + ".cache"
+
+
+def counted_text(pub):
+    """Text js/app.js counts as one article: trimmed JP content, else PT."""
+    return (pub.get("content") or "").strip() or (pub.get("content_ptbr") or "").strip()
+
+
+def dump_compact(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+def manifest_entry(pub, first_with_text):
+    entry = {k: pub[k] for k in MANIFEST_PUB_FIELDS if pub.get(k)}
+    if not pub.get("publication_title") and pub.get("header"):
+        entry["header"] = pub["header"]
+    if pub.get("type", DEFAULT_PUB_TYPE) != DEFAULT_PUB_TYPE:
+        entry["type"] = pub["type"]
+    if (pub.get("content") or "").strip():
+        entry["has_jp"] = True
+    if (pub.get("content_ptbr") or "").strip():
+        entry["has_pt"] = True
+
+    # The unique-article count keys on the text; repeated texts point at the
+    # first publication holding them, the others count as themselves (their id)
+    text = counted_text(pub)
+    if text:
+        first = first_with_text.setdefault(text, pub["id"])
+        if first != pub["id"]:
+            entry["content_key"] = first
+    return entry
+
+
+def build_site(data):
+    """Returns (manifest, {theme id: shard}) for the shin_college_data list."""
+    volumes = []
+    shards = {}
+    first_with_text = {}
+    totals = {"volumes": 0, "themes": 0, "publications": 0, "translated": 0}
+
+    for volume in fill_ids(data):
+        themes = []
+        for theme in volume.get("themes", []):
+            shard_pubs = {}
+            titles = []
+            for title in theme.get("titles", []):
+                publications = []
+                for pub in title.get("publications", []):
+                    entry = manifest_entry(pub, first_with_text)
+                    publications.append(entry)
+                    shard_pubs[pub["id"]] = {
+                        k: v for k, v in pub.items() if k not in MANIFEST_PUB_FIELDS and k not in entry
+                    }
+                    totals["publications"] += 1
+                    totals["translated"] += bool(entry.get("has_pt"))
+                title = {k: v for k, v in title.items() if k not in DROPPED_TITLE_KEYS}
+                titles.append(dict(title, publications=publications))
+
+            theme_entry = dict(theme, titles=titles, shard=f"{CONTENT_DIR_NAME}/{theme['id']}.json")
+            shards[theme["id"]] = {"theme": theme["id"], "publications": shard_pubs}
+            themes.append(theme_entry)
+            totals["themes"] += 1
+
+        volumes.append(dict(volume, themes=themes))
+        totals["volumes"] += 1
+
+    manifest = {"version": MANIFEST_VERSION, "counts": totals, "volumes": volumes}
+    return manifest, shards
+
+
+def write_if_changed(path, text):
+    """Writes text unless the file already holds it. Returns True if written."""
+    encoded = text.encode('utf-8')
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            if f.read() == encoded:
+                return False
+    temp_path = path + ".tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(encoded)
+    os.replace(temp_path, path)
+    return True
+
+
+def publish_group(name):
+    """Report group of a site file: its directory, or the file itself at the top."""
+    return name.split("/", 1)[0] if "/" in name else name
+
+
+class PublishManifest:
+    """
+    Usage:
+        publish = PublishManifest(site_dir)
+        publish.write("content/t-xxxx.json", text)    # False if the last publish wrote the same
+        publish.remove_stale("content", kept_names)
+        publish.save()                                # site/publish.json + summary
+
+    Saving also removes site/assets.json: the plain files are then newer
+    than the hashed ones, and a release publish writes it again.
+    """
+
+    def __init__(self, site_dir):
+        self.site_dir = site_dir
+        self.path = os.path.join(site_dir, PUBLISH_NAME)
+        previous = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    previous = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Warning: ignoring unreadable publish manifest {self.path}: {e}")
+            if previous.get("version") != PUBLISH_VERSION:
+                previous = {}
+        self.files = dict(previous.get("files", {}))
+        self.changed = []
+        self.removed = []
+        self.unchanged = {}
+
+    def write(self, name, text):
+        """Writes site_dir/name unless the last publish wrote the same bytes. Returns True if written."""
+        encoded = text.encode('utf-8')
+        sha256 = hashlib.sha256(encoded).hexdigest()
+        path = os.path.join(self.site_dir, name)
+        if self.files.get(name) == sha256 and os.path.exists(path):
+            group = publish_group(name)
+            self.unchanged[group] = self.unchanged.get(group, 0) + 1
+            return False
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = path + ".tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(encoded)
+        os.replace(temp_path, path)
+        self.files[name] = sha256
+        self.changed.append(name)
+        return True
+
+    def remove_stale(self, directory, kept_names):
+        """Removes the .json files of directory that are not in kept_names (names relative to site_dir)."""
+        for path in glob.glob(os.path.join(self.site_dir, directory, "*.json")):
+            name = f"{directory}/{os.path.basename(path)}"
+            if name not in kept_names:
+                os.remove(path)
+                self.files.pop(name, None)
+                self.removed.append(name)
+
+    def save(self):
+        publish = {
+            "version": PUBLISH_VERSION,
+            "files": dict(sorted(self.files.items())),
+            "changed": sorted(self.changed),
+            "removed": sorted(self.removed),
+        }
+        write_if_changed(self.path, json.dumps(publish, ensure_ascii=False, indent=1))
+        self.drop_assets()
+        self.report()
+
+    def drop_assets(self):
+        from publish_artifacts import ASSETS_NAME
+
+        assets_path = os.path.join(self.site_dir, ASSETS_NAME)
+        if os.path.exists(assets_path):
+            os.remove(assets_path)
+
+    def report(self):
+        changed = {}
+        for name in self.changed:
+            changed[publish_group(name)] = changed.get(publish_group(name), 0) + 1
+        groups = sorted(set(changed) | set(self.unchanged))
+        summary = ", ".join(f"{g} {changed.get(g, 0)} changed / {self.unchanged.get(g, 0)} unchanged" for g in groups)
+        size = sum(os.path.getsize(os.path.join(self.site_dir, name)) for name in self.changed)
+        print(f"Delta publish: {summary}; {len(self.removed)} removed. "
+              f"To upload: {len(self.changed)} files, {size // 1024} KB.")
+
+
+def write_site(data, site_dir, publish):
+    """Writes the manifest and the content shards of data under site_dir."""
+    manifest, shards = build_site(data)
+
+    names = set()
+    written = 0
+    for theme_id, shard in shards.items():
+        name = f"{CONTENT_DIR_NAME}/{theme_id}.json"
+        names.add(name)
+        written += publish.write(name, dump_compact(shard))
+    removed = len(publish.removed)
+    publish.remove_stale(CONTENT_DIR_NAME, names)
+    removed = len(publish.removed) - removed
+
+    manifest_path = os.path.join(site_dir, MANIFEST_NAME)
+    publish.write(MANIFEST_NAME, dump_compact(manifest))
+
+    print(f"Site data: {manifest_path} ({os.path.getsize(manifest_path) // 1024} KB), "
+          f"{len(shards)} content shards ({written} written, {removed} removed).")
+    return manifest, shards
+
+
+def publish_data(data, site_dir):
+    """Writes the site data and the search index of data under site_dir, as a delta of the last publish."""
+    publish = PublishManifest(site_dir)
+    write_site(data, site_dir, publish)
+    write_index(data, site_dir, publish)
+    publish.save()
+
+
+def publish_site(output_file, changed=True, release=False):
+    """
+    Writes the site data and search index of a freshly written main JSON
+    (skipped when it did not change), and with release the hashed,
+    precompressed artifacts of both.
+    """
+    from publish_artifacts import ASSETS_NAME, publish_artifacts
+
+    site_dir = site_dir_for(output_file)
+    if not changed and os.path.exists(os.path.join(site_dir, MANIFEST_NAME)) and \
+            (not release or os.path.exists(os.path.join(site_dir, ASSETS_NAME))):
+        print(f"Site data: unchanged ({site_dir}).")
+        return
+    with open(output_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    publish_data(data, site_dir)
+    if release:
+        publish_artifacts(output_file, site_dir)
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if arg != "--release"]
+    release = len(args) < len(sys.argv) - 1
+    if not args:
+        print("Usage: python3 scripts/site_shards.py <shin_college_data.json> [site dir] [--release]")
+        return
+
+    if len(args) > 1:
+        with open(args[0], 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        publish_data(data, args[1])
+        if release:
+            from publish_artifacts import publish_artifacts
+            publish_artifacts(args[0], args[1])
+    else:
+        publish_site(args[0], release=release)
+
+if __name__ == "__main__":
+    main()
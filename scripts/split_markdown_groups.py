@@ -2,6 +2,8 @@ import os
 import re
 import glob
 
+from markdown_tokenizer import match_heading
+
 def get_base_title(title):
     # Remove H1 marker
     clean = re.sub(r'^#\s*', '', title).strip()
@@ -26,7 +28,8 @@ def process_file(filepath):
     
     # Identify boundaries
     for line in lines:
-        if re.match(r'^#\s+', line):
+        heading = match_heading(line.rstrip('\n'))
+        if heading and heading[0] == 1:
             if current_section:
                 sections.append({'title': current_title, 'lines': current_section})
             current_section = [line]
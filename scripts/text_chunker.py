@@ -0,0 +1,231 @@
+"""
+Chunked translation of long publication bodies.
+
+Some publications (the longest ones of 02_浄霊の方法 are ~16k characters)
+used to go to the model in a single request: the answer hit the output
+token limit and came back cut short without any error, and that one slow
+request was the critical path of the whole run. Long texts are now split
+into chunks under a token budget:
+
+    blocks     a 信者の質問 / 明主様御垂示 exchange or a "---" section stays whole
+    paragraphs a block larger than the budget is split on blank lines
+    sentences  a paragraph larger than the budget is split after 。！？
+
+The chunks are translated concurrently, each with the publication title
+and the tail of the previous (Japanese) chunk as context, retried one by
+one, and joined back in order with the whitespace that separated them in
+the source (a space for chunks cut between two sentences). A chunk that still fails after its
+retries fails the text (its error is raised), but the chunks that
+succeeded are cached, so the next run only asks for the missing ones.
+
+    chunks = split_text(text, max_tokens=DEFAULT_CHUNK_TOKENS)
+    translation = await translate_chunked(text, translate_chunk, title=title)
+"""
+
+import re
+import asyncio
+
+from rate_limiter import estimate_prompt_tokens
+from async_engine import gather_bounded
+from failure_queue import TranslationFailed
+
+# Prompt + answer tokens per chunk (estimate_prompt_tokens: ~2 per JP character)
+DEFAULT_CHUNK_TOKENS = 6000
+DEFAULT_CHUNK_CONCURRENCY = 8
+CHUNK_RETRIES = 3
+RETRY_DELAY = 2.0
+
+# Characters of the previous chunk given as context
+CONTEXT_TAIL_CHARS = 300
+
+# A translation shorter than this fraction of its source was cut short
+MIN_LENGTH_RATIO = 0.25
+
+# Joins the translations of two chunks cut inside a paragraph (after 。！？)
+SENTENCE_JOINER = " "
+
+PARAGRAPH_SEPARATOR = re.compile(r'\n\s*\n')
+SENTENCE_END = re.compile(r'(?<=[。！？!?」])')
+SECTION_RULE = re.compile(r'^\s*-{3,}\s*$')
+# Paragraphs opening a new exchange: the question leads, the answer follows it
+DIALOGUE_START = re.compile(r'^\W*(信者の質問|明主様御垂示)')
+QUESTION_START = re.compile(r'^\W*信者の質問')
+
+CONTEXT_TEMPLATE = """
+**Contexto (NÃO traduza, apenas use para manter a coerência):**
+Este é o trecho {index} de {total} do ensinamento "{title}".
+{previous}
+**Traduza apenas o trecho abaixo.**
+"""
+PREVIOUS_TEMPLATE = "Final do trecho anterior (original):\n{tail}\n"
+
+
+def chunk_tokens(text):
+    return estimate_prompt_tokens(text)
+
+
+def paragraphs(text):
+    """Paragraphs of text, each with the separator that follows it, so ''.join() gives text back."""
+    parts = []
+    start = 0
+    for match in PARAGRAPH_SEPARATOR.finditer(text):
+        parts.append(text[start:match.end()])
+        start = match.end()
+    if start < len(text):
+        parts.append(text[start:])
+    return parts
+
+
+def blocks(text):
+    """
+    Groups paragraphs into blocks that should be translated together: a
+    question with its answer, or the paragraphs between two "---" rules.
+    """
+    result = []
+    current = []
+    previous_was_question = False
+    for paragraph in paragraphs(text):
+        stripped = paragraph.strip()
+        starts_exchange = bool(DIALOGUE_START.match(stripped))
+        # An answer right after its question stays in the same block
+        if current and (SECTION_RULE.match(stripped) or (starts_exchange and not (
+                previous_was_question and not QUESTION_START.match(stripped)))):
+            result.append("".join(current))
+            current = []
+        current.append(paragraph)
+        if stripped:
+            previous_was_question = bool(QUESTION_START.match(stripped))
+    if current:
+        result.append("".join(current))
+    return result
+
+
+def sentences(text):
+    return [s for s in SENTENCE_END.split(text) if s]
+
+
+def split_text(text, max_tokens=DEFAULT_CHUNK_TOKENS):
+    """
+    Chunks of text under max_tokens (a single sentence larger than that
+    stays whole). ''.join(chunks) == text.
+    """
+    if chunk_tokens(text) <= max_tokens:
+        return [text]
+
+    pieces = []
+    for block in blocks(text):
+        if chunk_tokens(block) <= max_tokens:
+            pieces.append(block)
+            continue
+        for paragraph in paragraphs(block):
+            if chunk_tokens(paragraph) <= max_tokens:
+                pieces.append(paragraph)
+            else:
+                pieces.extend(pack(sentences(paragraph), max_tokens))
+
+    return pack(pieces, max_tokens)
+
+
+def pack(pieces, max_tokens):
+    """Joins consecutive pieces into chunks of at most max_tokens."""
+    chunks = []
+    current = ""
+    for piece in pieces:
+        if current and chunk_tokens(current + piece) > max_tokens:
+            chunks.append(current)
+            current = ""
+        current += piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def joiners(chunks):
+    """
+    Whitespace between each chunk and the next one in the source ("" after
+    the last one): the blank lines between paragraphs, or SENTENCE_JOINER
+    where a paragraph was cut between two sentences.
+    """
+    result = []
+    for chunk, following in zip(chunks, chunks[1:]):
+        between = chunk[len(chunk.rstrip()):] + following[:len(following) - len(following.lstrip())]
+        result.append(between or SENTENCE_JOINER)
+    return result + [""]
+
+
+def context_prompt(index, total, title, previous):
+    """Context block of chunk index (0-based) for the prompt."""
+    tail = previous.strip()[-CONTEXT_TAIL_CHARS:] if previous else ""
+    return CONTEXT_TEMPLATE.format(
+        index=index + 1, total=total, title=title or "(sem título)",
+        previous=PREVIOUS_TEMPLATE.format(tail=tail) if tail else "",
+    )
+
+
+def hit_token_limit(response):
+    """True if the model stopped at its output token limit (finish_reason MAX_TOKENS)."""
+    candidates = getattr(response, "candidates", None) or []
+    return bool(candidates) and \
+        getattr(getattr(candidates[0], "finish_reason", None), "name", None) == "MAX_TOKENS"
+
+
+def looks_truncated(source, translation, response=None):
+    """
+    True for an answer the model cut short: finish_reason MAX_TOKENS, or
+    much shorter than its source. Callers check it before caching.
+    """
+    if hit_token_limit(response):
+        return True
+    return len(translation.strip()) < MIN_LENGTH_RATIO * len(source.strip())
+
+
+async def translate_one(chunk, translate_chunk, context, label):
+    """Translation of one chunk, retried up to CHUNK_RETRIES times. Raises the last error if it keeps failing."""
+    error = None
+    for attempt in range(1, CHUNK_RETRIES + 1):
+        try:
+            translation = await translate_chunk(chunk, context)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Chunk {label} failed (attempt {attempt}/{CHUNK_RETRIES}): {e}")
+            translation, error = None, e
+            # Blocked content is blocked again
+            if isinstance(e, TranslationFailed) and e.reason == "blocked":
+                raise
+        if translation:
+            return translation.strip()
+        if attempt < CHUNK_RETRIES:
+            await asyncio.sleep(RETRY_DELAY * attempt)
+    raise error or TranslationFailed("empty", f"chunk {label}")
+
+
+async def translate_chunked(text, translate_chunk, title="", max_tokens=DEFAULT_CHUNK_TOKENS,
+                            concurrency=DEFAULT_CHUNK_CONCURRENCY):
+    """
+    Translates text chunk by chunk. translate_chunk(chunk, context) is an
+    async callable returning the translation of chunk, or raising
+    (TranslationFailed for looks_truncated answers); context is "" for a
+    text that fits in one chunk. Returns the translations in order, joined
+    as the chunks were in the source (joiners); raises the error of the
+    first chunk that kept failing.
+    """
+    chunks = split_text(text, max_tokens)
+    if len(chunks) == 1:
+        return await translate_chunk(text, "")
+
+    factories = [
+        lambda i=i: translate_one(
+            chunks[i], translate_chunk,
+            context_prompt(i, len(chunks), title, chunks[i - 1] if i else ""),
+            f"{i + 1}/{len(chunks)}{f' of {title}' if title else ''}",
+        )
+        for i in range(len(chunks))
+    ]
+    results = await gather_bounded(factories, concurrency, timeout=None)
+
+    errors = [error for _, error in results if error is not None]
+    if errors:
+        print(f"{len(errors)}/{len(chunks)} chunks failed{f' for {title}' if title else ''}; the others are kept in the cache.")
+        raise errors[0]
+    return "".join(result + joiner for (result, _), joiner in zip(results, joiners(chunks)))
@@ -1,15 +1,30 @@
 import json
 import os
-import time
+import asyncio
 import argparse
-import threading
-import concurrent.futures
 import google.generativeai as genai
-from google.api_core import exceptions
+
+from rate_limiter import AsyncRateController, DEFAULT_RPM, DEFAULT_TPM
+from async_engine import as_completed_bounded, DEFAULT_TIMEOUT
+from translation_cache import TranslationCache, DEFAULT_CACHE_PATH, prompt_version, model_name_of
+from japanese_dates import convert_japanese_date
+from glossary import load_glossary, SOURCES, THEMES
+from text_chunker import CONTEXT_TEMPLATE, split_text, translate_chunked, looks_truncated, hit_token_limit
+from translation_journal import (TranslationJournal, JOURNAL_SUFFIX, reorder_ptbr_keys, write_json_atomic, resolve,
+                                 source_sha, walk)
+from failure_queue import FailureQueue, TranslationFailed, DEFAULT_QUEUE_PATH
+from japanese_text import has_japanese
+from translation_status import TranslationStatus, STATUS_SUFFIX, TRANSLATABLE_KEYS
+from batch_translation import (
+    DEFAULT_BATCH_TOKENS, pack_batches, build_batch_prompt, batch_prompt_version_text, parse_batch_response
+)
 
 # --- CONFIGURATION ---
 API_KEY = os.environ.get("GEMINI_API_KEY")
 
+# Known theme/title/source translations, consulted before the model
+GLOSSARY = load_glossary()
+
 # --- PROMPT ADAPTATION ---
 SYSTEM_INSTRUCTION = """
 # PERSONA E PAPEL
@@ -54,15 +69,12 @@ CRÍTICO:
 4. NÃO use aspas ao redor do texto, a menos que o original tenha.
 """
 
-def translate_text(model, text, field_type="generic"):
-    if not text or not isinstance(text, str) or len(text.strip()) == 0:
-        return text
-
-    elif field_type == "theme":
+def build_prompt(text, field_type="generic", context=""):
+    if field_type == "theme":
         prompt = f"""
 {SYSTEM_INSTRUCTION_BASE}
 **Tarefa:** Traduza o Tema.
-Regra Específica: '御神体とお光' DEVE ser 'Imagem Sagrada e Luz Divina'.
+Regra Específica: '御神体とお光' DEVE ser '{THEMES["御神体とお光"]}'.
 Retorne APENAS a tradução.
 
 Texto Original:
@@ -82,7 +94,7 @@ Texto Original:
         prompt = f"""
 {SYSTEM_INSTRUCTION_BASE}
 **Tarefa:** Converta a data japonesa para o formato ocidental (Dia de Mês de Ano).
-Exemplo: '昭和10年5月21日' -> '21 de Maio de 1935'.
+Exemplo: '昭和10年5月21日' -> '21 de maio de 1935'.
 Se não for uma data clara, traduza normalmente.
 Retorne APENAS a data convertida.
 
@@ -108,7 +120,7 @@ Texto Original:
 **Tarefa:** Converter o nome da Publicação/Fonte para Romaji.
 NÃO traduza o significado. Transcreva para o alfabeto latino (Romaji).
 Exemplo: '地上天国' -> 'Tijou Tengoku'.
-Regra Específica: '明主様御教え' DEVE ser 'Meishu-sama Mioshie'.
+Regra Específica: '明主様御教え' DEVE ser '{SOURCES["明主様御教え"]}'.
 Retorne APENAS o Romaji.
 
 Texto Original:
@@ -123,7 +135,7 @@ Texto Original:
 3. Fidelidade ao conteúdo (não altere fatos).
 4. Termos técnicos: Traduza, exceto 'Kannon' (観音) e nomes próprios.
 5. Formatação: Retorne apenas o texto traduzido. SEM COMENTÁRIOS EXTRAS.
-
+{context}
 Texto Original:
 {text}
 """
@@ -136,95 +148,301 @@ Retorne APENAS a tradução.
 Texto Original:
 {text}
 """
+    return prompt
+
+def translate_locally(text, field_type, theme=None):
+    """Translation that needs no model call (date rule or glossary), or None. theme: JP name of the node's theme."""
+    # Regular era dates are converted by rule; only the odd ones go to the model
+    if field_type == "date":
+        converted = convert_japanese_date(text)
+        if converted:
+            return converted
+
+    return GLOSSARY.lookup(text, field_type, theme)
+
+def theme_names(data):
+    """{id(node): JP theme name} for every node under a theme (title groups, publications)."""
+    names = {}
+    for volume in data:
+        for theme in volume.get("themes", []):
+            for _, node in walk(theme.get("titles", [])):
+                names[id(node)] = theme.get("theme")
+    return names
+
+async def translate_text(model, text, field_type="generic", cache=None, title=None, theme=None):
+    if not text or not isinstance(text, str) or len(text.strip()) == 0:
+        return text
 
-    try:
-        response = model.generate_content(
-            contents=[prompt],
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.3, 
-            )
-        )
-        return response.text.strip()
-    except Exception as e:
-        print(f"Error translating text: {e}")
-        return None
+    known = translate_locally(text, field_type, theme)
+    if known:
+        return known
 
-def process_item(item, model, stats_lock, stats):
-    # Translate fields relevant to the structure
-    # Volume, Theme, Title, Publication content
-    
-    # Note: Structure is nested. 
-    # This function processes a single node. 
-    # Since the JSON is hierarchical, we might need a recursive approach outside or inside.
-    # However, to parallelize, we usually collect all "leaf" nodes (Publications) and translate them.
-    # But Volume/Theme/Title titles also need translation.
-    
-    changed = False
+    if field_type == "content":
+        # Long bodies are translated in chunks (text_chunker.py); a short one is a single chunk
+        return await translate_chunked(
+            text, lambda chunk, context: request_translation(model, chunk, field_type, cache, context), title=title
+        )
+    return await request_translation(model, text, field_type, cache)
 
-    # Helper to translate a specific key
-    def translate_field(key):
-        val = item.get(key)
-        # Check if it needs translation (contains Japanese characters?)
-        # For now, just translate if present and strictly string
-        if val and isinstance(val, str) and not item.get(f"{key}_ptbr"):
-             # Heuristic: Check for Japanese characters to avoid re-translating English/PT
-             # For 'source' or 'date', we might want to process even if no Japanese chars are obvious?
-             # But 'date' usually has japanese chars. 'source' definitely.
-             if any(ord(char) > 0x2E80 for char in val):
-                translated = translate_text(model, val, field_type=key)
-                if translated:
-                    item[f"{key}_ptbr"] = translated
-                    return True
-        return False
-
-    # Translate specific metadata fields if they exist at this level
-    if translate_field("volume"): changed = True
-    if translate_field("theme"): changed = True
-    if translate_field("title"): changed = True
-    if translate_field("publication_title"): changed = True
-    if translate_field("source"): changed = True
-    if translate_field("date"): changed = True # date was missing in previous list
-    
-    # Translate Main Content
-    if "content" in item:
-        if translate_field("content"): changed = True
+async def request_translation(model, text, field_type, cache=None, context=""):
+    """One model call for text (a whole field, or a chunk of a long body with its context)."""
+    prompt = build_prompt(text, field_type, context)
 
-    if changed:
-        # Reorder keys to keep translations adjacent to source
-        # This is purely for JSON readability
+    async def call_model():
         try:
-             order = list(item.keys())
-             # Filter out _ptbr keys from the iteration list to avoid duplication if we construct new dict
-             # Actually, simpler way: create new dict, iterate known order or current keys
-             new_map = {}
-             # We want to preserve original insertion order roughly, but pull _ptbr up
-             # The keys in 'item' might be unordered effectively depending on python version history, 
-             # but usually insertion order.
-             # 'item' keys: 'title', 'publications', 'title_ptbr' ...
-             
-             # Collect base keys (excluding _ptbr)
-             base_keys = [k for k in item.keys() if not k.endswith("_ptbr")]
-             
-             for k in base_keys:
-                 new_map[k] = item[k]
-                 if f"{k}_ptbr" in item:
-                     new_map[f"{k}_ptbr"] = item[f"{k}_ptbr"]
-             
-             # If there were any _ptbr keys whose base key wasn't found (orphan?), add them?
-             # Unlikely in this script.
-             
-             item.clear()
-             item.update(new_map)
+            response = await model.generate_content_async(
+                contents=[prompt],
+                generation_config=genai.types.GenerationConfig(
+                    temperature=0.3, 
+                )
+            )
+            translated = response.text.strip()
         except Exception as e:
-            print(f"Error reordering keys: {e}")
+            print(f"Error translating text: {e}")
+            raise
+        if not translated:
+            raise TranslationFailed("empty", f"{field_type} of {len(text)} characters")
+        # Bodies are also checked against their length; short fields only against the token limit
+        if looks_truncated(text, translated, response) if field_type == "content" else hit_token_limit(response):
+            # Not cached: the text is asked again
+            raise TranslationFailed("truncated", f"{field_type} of {len(text)} characters")
+        return translated
+
+    if cache is None:
+        return await call_model()
+
+    # Same source, field, prompt and model -> reuse the stored translation.
+    # Chunks are stored on their own, so a failed chunk does not redo the others
+    if context:
+        version = prompt_version(build_prompt("", field_type, CONTEXT_TEMPLATE))
+        return await cache.get_or_translate_async(text, f"{field_type}_chunk", version, model_name_of(model), call_model)
+    version = prompt_version(build_prompt("", field_type))
+    return await cache.get_or_translate_async(text, field_type, version, model_name_of(model), call_model)
+
+def needs_translation(item, key):
+    """True if item[key] holds Japanese text without a key_ptbr translation yet."""
+    # Japanese characters only, to avoid re-translating English/PT
+    return not item.get(f"{key}_ptbr") and has_japanese(item.get(key))
+
+def record_failure(failures, journal, item, key, error):
+    """Queues a field that failed (failure_queue.py), by the node's journal path."""
+    if failures is None or journal is None or id(item) not in journal.paths:
+        return
+    failures.record(journal.paths[id(item)], key, error, source_sha(item[key]))
+
+def record_success(failures, journal, item, key):
+    if failures is not None and journal is not None and id(item) in journal.paths:
+        failures.resolve(journal.paths[id(item)], key)
+
+async def process_item(item, model, cache=None, journal=None, failures=None, only_keys=None, theme=None):
+    """
+    Translates the pending fields (of only_keys) of one node concurrently;
+    theme is the JP name of its theme (theme-scoped glossary titles).
+    Returns True if any changed.
+    """
+    keys = [key for key in TRANSLATABLE_KEYS
+            if needs_translation(item, key) and (only_keys is None or key in only_keys)]
+    translations = await asyncio.gather(
+        *(translate_text(model, item[key], field_type=key, cache=cache, title=item.get("publication_title"),
+                         theme=theme)
+          for key in keys),
+        return_exceptions=True
+    )
 
-        with stats_lock:
-            stats["count"] += 1
-            if stats["count"] % 10 == 0:
-                print(f"Translated {stats['count']} items...", flush=True)
+    changed = False
+    for key, translated in zip(keys, translations):
+        if isinstance(translated, Exception):
+            record_failure(failures, journal, item, key, translated)
+        elif translated:
+            item[f"{key}_ptbr"] = translated
+            if journal:
+                journal.record(item, key, translated, model_name_of(model))
+            record_success(failures, journal, item, key)
+            changed = True
+        else:
+            record_failure(failures, journal, item, key, "empty")
+
+    if changed:
+        reorder_ptbr_keys(item)
 
     return changed
 
+def batch_version(field_type):
+    return prompt_version(batch_prompt_version_text(field_type, SYSTEM_INSTRUCTION_BASE))
+
+def cached_translation(model, text, field_type, cache):
+    """Stored translation from a single or a batch request, or None."""
+    if cache is None:
+        return None
+    model_name = model_name_of(model)
+    return (cache.get(text, field_type, prompt_version(build_prompt("", field_type)), model_name)
+            or cache.get(text, field_type, batch_version(field_type), model_name))
+
+async def translate_batch(model, entries, cache=None):
+    """
+    Translates a list of {"text", "field_type"} entries with one request.
+    Returns (translations in entry order, number of entries retried); entries
+    the model skipped, answered badly or cut short (the looks_truncated check
+    of single mode) are translated one by one with translate_text.
+    """
+    prompt = build_batch_prompt(entries, SYSTEM_INSTRUCTION_BASE)
+    try:
+        response = await model.generate_content_async(
+            contents=[prompt],
+            generation_config=genai.types.GenerationConfig(
+                temperature=0.3,
+                response_mime_type="application/json",
+            )
+        )
+        answers = parse_batch_response(response.text, len(entries))
+        # An answer cut at the token limit is suspect in every entry
+        if answers and hit_token_limit(response):
+            print(f"Batch of {len(entries)} hit the token limit, retrying its entries one by one.")
+            answers = {}
+    except Exception as e:
+        print(f"Error translating batch of {len(entries)}: {e}")
+        answers = {}
+
+    results = []
+    missing = []
+    for index, entry in enumerate(entries):
+        translation = answers.get(index)
+        if translation and entry["field_type"] == "content" and looks_truncated(entry["text"], translation):
+            translation = None
+        if translation:
+            if cache:
+                cache.put(entry["text"], entry["field_type"], batch_version(entry["field_type"]),
+                          model_name_of(model), translation)
+        else:
+            missing.append(index)
+        results.append(translation)
+
+    # Fields that fail again come back as their exception
+    retries = await asyncio.gather(
+        *(translate_text(model, entries[i]["text"], field_type=entries[i]["field_type"], cache=cache,
+                         theme=entries[i].get("theme")) for i in missing),
+        return_exceptions=True
+    )
+    for index, translation in zip(missing, retries):
+        results[index] = translation
+
+    return results, len(missing)
+
+async def translate_in_batches(targets, model, workers, max_tokens, cache=None, journal=None, timeout=DEFAULT_TIMEOUT,
+                               failures=None, themes=None, only_keys=None):
+    """
+    Batch mode: every field that needs the model is packed with others into
+    requests of up to max_tokens, translated concurrently and written back
+    to its node (and to the journal) as its batch completes. only_keys:
+    {id(node): fields} to limit the fields of some nodes.
+    """
+    themes = themes or {}
+    only_keys = only_keys or {}
+    entries = []
+    changed = []
+    local = 0
+    for item in targets:
+        theme = themes.get(id(item))
+        keys = only_keys.get(id(item))
+        item_changed = False
+        for key in TRANSLATABLE_KEYS:
+            if not needs_translation(item, key) or (keys is not None and key not in keys):
+                continue
+            text = item[key]
+            known = translate_locally(text, key, theme) or cached_translation(model, text, key, cache)
+            if known:
+                item[f"{key}_ptbr"] = known
+                if journal:
+                    journal.record(item, key, known, "local")
+                item_changed = True
+                local += 1
+            else:
+                entries.append({"item": item, "key": key, "field_type": key, "text": text, "theme": theme})
+                item_changed = True
+        if item_changed:
+            changed.append(item)
+
+    # Bodies too long for one answer are translated in chunks, outside the batches
+    short_entries, long_entries = [], []
+    for entry in entries:
+        is_long = entry["key"] == "content" and len(split_text(entry["text"])) > 1
+        (long_entries if is_long else short_entries).append(entry)
+    batches = pack_batches(short_entries, max_tokens)
+    print(f"{local} fields resolved locally; {len(short_entries)} fields packed into "
+          f"{len(batches)} requests, {len(long_entries)} long bodies translated in chunks.")
+
+    async def translate_long(entry):
+        try:
+            translation = await translate_text(model, entry["text"], "content", cache, entry["item"].get("publication_title"))
+        except Exception as e:
+            translation = e
+        return [translation], 0
+
+    requests = 0
+    retried = 0
+    factories = [lambda batch=batch: translate_batch(model, batch, cache) for batch in batches]
+    factories += [lambda entry=entry: translate_long(entry) for entry in long_entries]
+    batches += [[entry] for entry in long_entries]
+    done = 0
+    async for index, answer, error in as_completed_bounded(factories, workers, timeout):
+        done += 1
+        batch = batches[index]
+        if error is not None:
+            print(f"Batch {done}/{len(batches)} failed ({len(batch)} fields): {error!r}", flush=True)
+            for entry in batch:
+                record_failure(failures, journal, entry["item"], entry["key"], error)
+            continue
+        results, batch_retried = answer
+        requests += 1 + batch_retried
+        retried += batch_retried
+        # Results are written back here, as batches complete
+        for entry, translation in zip(batch, results):
+            if isinstance(translation, Exception) or not translation:
+                record_failure(failures, journal, entry["item"], entry["key"], translation or "empty")
+                continue
+            entry["item"][f"{entry['key']}_ptbr"] = translation
+            if journal:
+                journal.record(entry["item"], entry["key"], translation, model_name_of(model))
+            record_success(failures, journal, entry["item"], entry["key"])
+        print(f"Batch {done}/{len(batches)} done ({len(batch)} fields).", flush=True)
+
+    for item in changed:
+        reorder_ptbr_keys(item)
+
+    print(f"Batch mode: {len(entries)} fields, {requests} requests "
+          f"({retried} fields retried individually).")
+    return len(changed)
+
+async def translate_items(targets, model, workers, cache=None, journal=None, timeout=DEFAULT_TIMEOUT,
+                          failures=None, only_keys=None, themes=None):
+    """
+    One task per node, at most `workers` in flight. Progress follows
+    completions as they happen; every field is journaled as it lands, and
+    every failure queued. only_keys: {id(node): fields} to limit the
+    fields of some nodes (--retry-failed, backoff); themes: theme_names(data).
+    """
+    only_keys = only_keys or {}
+    themes = themes or {}
+    factories = [lambda item=item: process_item(item, model, cache, journal, failures, only_keys.get(id(item)),
+                                                themes.get(id(item)))
+                 for item in targets]
+    count = 0
+    async for index, changed, error in as_completed_bounded(factories, workers, timeout):
+        if error is not None:
+            print(f"Error translating item {index}: {error!r}", flush=True)
+            # Timed out (or crashed) as a whole: every field it still needs is queued
+            item = targets[index]
+            for key in TRANSLATABLE_KEYS:
+                if needs_translation(item, key) and (id(item) not in only_keys or key in only_keys[id(item)]):
+                    record_failure(failures, journal, item, key, error)
+            continue
+        if not changed:
+            continue
+        count += 1
+        if count % 10 == 0:
+            print(f"Translated {count}/{len(targets)} items...", flush=True)
+    return count
+
 def traverse_and_collect(data, collector):
     if isinstance(data, list):
         for item in data:
@@ -239,20 +457,110 @@ def traverse_and_collect(data, collector):
         if "publications" in data:
             traverse_and_collect(data["publications"], collector)
 
+def target_filter(data, filter_volume=None, filter_theme=None):
+    """accept(path) for TranslationStatus.targets: the --filter-volume / --filter-theme of a node's ancestors."""
+    if not filter_volume and not filter_theme:
+        return None
+
+    def accept(path):
+        if filter_volume and data[path[0]].get("volume") != filter_volume:
+            return False
+        if filter_theme:
+            theme = resolve(data, path[:3]) if len(path) >= 3 else None
+            return theme is not None and theme.get("theme") == filter_theme
+        return True
+
+    return accept
+
+def failed_targets(data, failures):
+    """
+    Nodes and fields of the failure queue that are due (--retry-failed).
+    Returns (nodes, {id(node): fields}); entries whose source changed or
+    that were translated meanwhile are dropped from the queue.
+    """
+    targets = []
+    only_keys = {}
+    stale = 0
+    due = failures.due()
+    for entry in due:
+        node = resolve(data, entry["node"])
+        key = entry["field"]
+        if node is None or not needs_translation(node, key) or source_sha(node[key]) != entry["source_sha"]:
+            failures.resolve(entry["node"], key)
+            stale += 1
+            continue
+        if id(node) not in only_keys:
+            targets.append(node)
+            only_keys[id(node)] = set()
+        only_keys[id(node)].add(key)
+
+    waiting = len(failures.entries()) - len(due)
+    print(f"Retrying {len(due) - stale} failed fields of {len(targets)} nodes "
+          f"({stale} no longer needed, {waiting} still backing off or past their attempts).")
+    return targets, only_keys
+
+def skip_backing_off(targets, journal, failures):
+    """
+    Leaves out of a normal run the fields whose queued failure is still in
+    its backoff window (unless their source changed since).
+    Returns (nodes, {id(node): fields}).
+    """
+    waiting = {}
+    for entry in failures.backing_off():
+        waiting.setdefault(FailureQueue.node_key(entry["node"]), {})[entry["field"]] = entry["source_sha"]
+    if not waiting:
+        return targets, {}
+
+    kept = []
+    only_keys = {}
+    skipped = 0
+    for item in targets:
+        held = waiting.get(FailureQueue.node_key(journal.paths[id(item)])) if id(item) in journal.paths else None
+        if held:
+            keys = {key for key in TRANSLATABLE_KEYS if needs_translation(item, key)}
+            held = {key for key in keys if key in held and held[key] == source_sha(item[key])}
+            skipped += len(held)
+            if keys == held:
+                continue
+            only_keys[id(item)] = keys - held
+        kept.append(item)
+    if skipped:
+        print(f"Skipping {skipped} failed fields still backing off (failure_queue.py --list; --retry-failed when due).")
+    return kept, only_keys
+
 def main():
     parser = argparse.ArgumentParser(description="Translate JSON content using Gemini.")
     parser.add_argument("--input", default="data/shin_college_data.json", help="Input JSON file")
     parser.add_argument("--output", default="data/shin_college_data_translated.json", help="Output JSON file")
     parser.add_argument("--limit", type=int, default=0, help="Limit number of items to translate (for testing)")
-    parser.add_argument("--workers", type=int, default=5, help="Number of concurrent workers")
+    parser.add_argument("--workers", type=int, default=64, help="Maximum number of concurrent requests")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="Seconds allowed per node (or batch) before it is abandoned")
     parser.add_argument("--filter-theme", type=str, default=None, help="Process only specific theme")
     parser.add_argument("--filter-volume", type=str, default=None, help="Process only specific volume")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="SQLite translation cache")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the model, bypassing the translation cache")
+    parser.add_argument("--rpm", type=int, default=DEFAULT_RPM, help="Requests per minute allowed by the API quota")
+    parser.add_argument("--tpm", type=int, default=DEFAULT_TPM, help="Tokens per minute allowed by the API quota")
+    parser.add_argument("--fake-model", action="store_true", help="Use the local fake model (offline test runs)")
+    parser.add_argument("--journal", default=None, help=f"Append-only journal of translated fields (default: <output>{JOURNAL_SUFFIX})")
+    parser.add_argument("--batch", action="store_true", help="Pack many fields into each request (JSON answers)")
+    parser.add_argument("--batch-tokens", type=int, default=DEFAULT_BATCH_TOKENS, help="Approximate input tokens per batch request")
+    parser.add_argument("--failures", default=DEFAULT_QUEUE_PATH, help="SQLite queue of the fields that failed")
+    parser.add_argument("--retry-failed", action="store_true", help="Only retry the queued failures whose backoff has passed")
     args = parser.parse_args()
 
-    model = setup_gemini()
+    if args.fake_model:
+        from fake_gemini import FakeGeminiModel
+        model = FakeGeminiModel(args.rpm, args.tpm)
+    else:
+        model = setup_gemini()
     if not model:
         return
 
+    # Every request goes through the same controller: shared quota, AIMD concurrency
+    controller = AsyncRateController(args.rpm, args.tpm, max_concurrency=args.workers)
+    model = controller.wrap(model)
+
     print(f"Loading {args.input}...")
     try:
         with open(args.input, "r", encoding="utf-8") as f:
@@ -261,111 +569,67 @@ def main():
         print("Input file not found.")
         return
 
-    # Collect all dict objects that might need translation
-    all_dicts = []
-    
-    # Custom traversal to respect theme/volume filter
-    def collect_with_filter(node, current_volume=None, current_theme=None):
-        if isinstance(node, list):
-            for item in node:
-                collect_with_filter(item, current_volume, current_theme)
-        elif isinstance(node, dict):
-            # Update current volume if we are at a volume node
-            if "volume" in node and isinstance(node["volume"], str):
-                current_volume = node["volume"]
-
-            # Update current theme if we are at a theme node
-            if "theme" in node and isinstance(node["theme"], str):
-                current_theme = node["theme"]
-            
-            # --- FILTERING LOGIC ---
-            passed_filter = True
-            
-            # Volume Filter
-            if args.filter_volume:
-                if current_volume != args.filter_volume:
-                    passed_filter = False
-                    # Optimization: If at volume level and mismatch, stop recursion
-                    if "volume" in node and node["volume"] != args.filter_volume:
-                        return 
-
-            # Theme Filter (only if passed volume filter)
-            if passed_filter and args.filter_theme:
-                # If specifically filtered by theme, we need to match it
-                # Note: Theme filter applies globally or within volume if both set
-                if current_theme != args.filter_theme:
-                     passed_filter = False
-                     if "theme" in node and node["theme"] != args.filter_theme:
-                         return
-
-            if passed_filter:
-                 all_dicts.append(node)
-
-            if "themes" in node:
-                collect_with_filter(node["themes"], current_volume, current_theme)
-            if "titles" in node:
-                collect_with_filter(node["titles"], current_volume, current_theme)
-            if "publications" in node:
-                collect_with_filter(node["publications"], current_volume, current_theme)
-
-    collect_with_filter(data)
-    
-    print(f"Found {len(all_dicts)} recursive nodes in JSON.")
-
-    # Filter dicts that actually have content to translate and haven't been translated
-    targets = []
-    for d in all_dicts:
-        needs_translation = False
-        possible_keys = ["volume", "theme", "title", "publication_title", "source", "content"]
-        for k in possible_keys:
-            if k in d and isinstance(d[k], str) and any(ord(c) > 0x2E80 for c in d[k]):
-                # Check if already translated
-                if f"{k}_ptbr" not in d:
-                    needs_translation = True
-                    break
-        if needs_translation:
-            targets.append(d)
-
+    # Fields translated by earlier (possibly interrupted) runs come back from the journal
+    journal = TranslationJournal(args.journal or args.output + JOURNAL_SUFFIX)
+    resumed = journal.replay(data)
+    if resumed:
+        print(f"Resumed {resumed} translated fields from {journal.path}.")
+    journal.index(data)
+    failures = FailureQueue(args.output, args.failures)
+
+    # Per-field status: read as is while the input and the journal are unchanged
+    status = TranslationStatus(args.output + STATUS_SUFFIX)
+    if status.is_current(args.input, journal.path):
+        print(f"Status index {status.path} is current.")
+    else:
+        status.build(data, journal.replaced)
+    status.report()
+
+    only_keys = None
+    if args.retry_failed:
+        targets, only_keys = failed_targets(data, failures)
+    else:
+        targets = status.targets(data, accept=target_filter(data, args.filter_volume, args.filter_theme))
     print(f"Targets needing translation: {len(targets)}")
 
     if args.limit > 0:
         targets = targets[:args.limit]
         print(f"Limiting to first {args.limit} targets.")
 
-    stats = {"count": 0}
-    stats_lock = threading.Lock()
+    if not args.retry_failed:
+        # Translations made from an older source are asked again
+        reopened = status.reopen_stale(data, targets) if status.counts()["stale"] else 0
+        if reopened:
+            print(f"Translating again {reopened} stale fields (source changed since their translation).")
+        targets, only_keys = skip_backing_off(targets, journal, failures)
+
+    cache = None if args.no_cache else TranslationCache(args.cache)
+    themes = theme_names(data)
 
     print("Starting translation...")
-    with concurrent.futures.ThreadPoolExecutor(max_workers=args.workers) as executor:
-        # Process futures and save periodically
-        futures = [executor.submit(process_item, item, model, stats_lock, stats) for item in targets]
-        
-        last_save_count = 0
-        total_targets = len(targets)
-        
-        while True:
-            # Check status every 5 seconds
-            time.sleep(5)
-            
-            # Check if all tasks are done
-            all_done = all(f.done() for f in futures)
-            
-            with stats_lock:
-                current_count = stats["count"]
-            
-            # Save if enough items processed or if finished
-            if (current_count - last_save_count >= 5) or (all_done and current_count > last_save_count):
-                print(f"Saving progress ({current_count}/{total_targets} translated)...")
-                with open(args.output, "w", encoding="utf-8") as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
-                last_save_count = current_count
-            
-            if all_done:
-                break
-
-    print(f"Translation finished. Saving to {args.output}...")
-    with open(args.output, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    if args.batch and not args.retry_failed:
+        run = translate_in_batches(targets, model, args.workers, args.batch_tokens, cache, journal, args.timeout, failures,
+                                   themes, only_keys)
+    else:
+        run = translate_items(targets, model, args.workers, cache, journal, args.timeout, failures, only_keys, themes)
+    try:
+        asyncio.run(run)
+    except KeyboardInterrupt:
+        # Pending requests are cancelled; everything translated is already in the journal
+        print("Interrupted.")
+    journal.close()
+    status.update(data, [journal.paths[id(item)] for item in targets])
+    status.save(args.input, journal.path)
+
+    # The full JSON is written once, atomically
+    print(f"Translation finished ({journal.written} fields journaled). Saving to {args.output}...")
+    write_json_atomic(data, args.output)
+    GLOSSARY.report()
+    controller.report()
+    if cache:
+        cache.report()
+    failures.report()
+    failures.close()
     print("Done.")
 
 if __name__ == "__main__":
@@ -1,11 +1,19 @@
 import json
 import time
 import os
+import sys
+import asyncio
 import google.generativeai as genai
 from google.api_core import exceptions
-import concurrent.futures
 import threading
 
+from rate_limiter import AsyncRateController
+from async_engine import as_completed_bounded
+from translation_cache import TranslationCache, DEFAULT_CACHE_PATH, prompt_version, model_name_of
+from text_chunker import CONTEXT_TEMPLATE, translate_chunked, looks_truncated
+from failure_queue import FailureQueue, TranslationFailed, classify
+from translation_journal import source_sha
+
 # --- CONFIGURAÇÃO ---
 # 1. API KEY (Do Ambiente)
 API_KEY = os.environ.get("GEMINI_API_KEY")
@@ -26,7 +34,14 @@ CHAVE_TEXTO_PORTUGUES = "content_ptbr"
 
 # --- CONFIGURAÇÃO DA IA ---
 genai.configure(api_key=API_KEY)
-model = genai.GenerativeModel('gemini-2.5-pro')
+MAX_WORKERS = 32
+
+# Controlador, modelo, cache e fila de falhas são criados em main():
+# importar o módulo não abre os bancos SQLite
+controller = None
+model = None
+cache = None
+falhas = None
 
 # --- PROMPT MASTER ---
 PROMPT_SISTEMA = """
@@ -53,34 +68,63 @@ Atue como um tradutor editorial sênior e devoto da Sekaikyuseikyou, com vasta e
 **Texto para tradução:**
 """
 
-def traduzir_texto(texto_jp, titulo_ref="(Sem Título)"):
+async def traduzir_texto(texto_jp, titulo_ref="(Sem Título)"):
     if not texto_jp or len(texto_jp) < 2:
         return ""
-    
-    prompt_completo = f"{PROMPT_SISTEMA}\n\n{texto_jp}"
+
+    # Artigos longos vão em trechos traduzidos em paralelo (text_chunker.py)
+    return await translate_chunked(
+        texto_jp, lambda trecho, contexto: traduzir_trecho(trecho, contexto, titulo_ref), title=titulo_ref
+    )
+
+async def traduzir_trecho(texto_jp, contexto, titulo_ref):
+    # Texto idêntico já traduzido com o mesmo prompt/modelo sai do cache;
+    # trechos são guardados um a um, então uma falha não refaz o artigo inteiro
+    if contexto:
+        return await cache.get_or_translate_async(
+            texto_jp, "article_chunk", prompt_version(PROMPT_SISTEMA + CONTEXT_TEMPLATE), model_name_of(model),
+            lambda: chamar_modelo(texto_jp, titulo_ref, contexto)
+        )
+    return await cache.get_or_translate_async(
+        texto_jp, "article", prompt_version(PROMPT_SISTEMA), model_name_of(model),
+        lambda: chamar_modelo(texto_jp, titulo_ref)
+    )
+
+async def chamar_modelo(texto_jp, titulo_ref, contexto=""):
+    prompt_completo = f"{PROMPT_SISTEMA}\n{contexto}\n{texto_jp}"
     max_retries = 10 
-    retry_delay = 5
+    ultimo_erro = None
 
     for attempt in range(max_retries):
         try:
-            response = model.generate_content(prompt_completo)
-            return response.text.strip()
-            
-        except exceptions.ResourceExhausted:
-            print(f"   [!] Limite de velocidade (429). Aguardando {retry_delay}s...")
-            time.sleep(retry_delay)
-            retry_delay = min(retry_delay * 2, 60)
+            # 429 é esperado e repetido dentro do controlador
+            response = await model.generate_content_async(prompt_completo)
+            traducao = response.text.strip()
+
+        except exceptions.ResourceExhausted as e:
+            print(f"   [!] Limite de velocidade (429) persistente no item '{titulo_ref}'.")
+            raise TranslationFailed("429", str(e)) from e
         
         except Exception as e:
             erro_str = str(e)
             if "PROHIBITED_CONTENT" in erro_str or "block_reason" in erro_str:
                 print(f"   [!] CONTEÚDO BLOQUEADO '{titulo_ref}': {erro_str}")
-                return None
+                raise TranslationFailed("blocked", erro_str) from e
             print(f"   [!] Erro desconhecido no item '{titulo_ref}': {e}. Tentando novamente em 10s...")
-            time.sleep(10)
+            ultimo_erro = e
+            await asyncio.sleep(10)
+            continue
+
+        if not traducao:
+            raise TranslationFailed("empty", titulo_ref)
+        if looks_truncated(texto_jp, traducao, response):
+            # Não vai para o cache: o texto (ou trecho) é pedido de novo
+            print(f"   [!] Resposta cortada em '{titulo_ref}'.")
+            raise TranslationFailed("truncated", titulo_ref)
+        return traducao
             
     print(f"   [X] FALHA FINAL no item '{titulo_ref}' após {max_retries} tentativas.")
-    return None
+    raise TranslationFailed(classify(ultimo_erro), str(ultimo_erro))
 
 arquivo_lock = threading.Lock()
 last_save_time = 0
@@ -105,7 +149,7 @@ def salvar_progresso(item, novos_dados):
             except Exception as e:
                 print(f"Erro ao salvar: {e}")
 
-def processar_item(item, total, i, mapa_traduzidos, novos_dados):
+async def processar_item(item, total, i, mapa_traduzidos, novos_dados):
     item_id = item.get(CHAVE_ID)
     titulo = item.get('title', 'Sem Título')
 
@@ -118,22 +162,39 @@ def processar_item(item, total, i, mapa_traduzidos, novos_dados):
 
     print(f"[{i+1}/{total}] Iniciando: {titulo} ({item_id})...")
     
-    traducao = traduzir_texto(item.get(CHAVE_TEXTO_JAPONES, ""), titulo)
+    texto_jp = item.get(CHAVE_TEXTO_JAPONES, "")
+    try:
+        traducao = await traduzir_texto(texto_jp, titulo)
+    except Exception as e:
+        falhas.record(item_id, CHAVE_TEXTO_PORTUGUES, e, source_sha(texto_jp))
+        print(f"   -> [FALHA] {titulo} ({classify(e)})")
+        return
 
     if traducao:
         item[CHAVE_TEXTO_PORTUGUES] = traducao
         salvar_progresso(item, novos_dados)
+        falhas.resolve(item_id, CHAVE_TEXTO_PORTUGUES)
         print(f"   -> [PRONTO] {titulo}")
     else:
         print(f"   -> [FALHA] {titulo}")
 
 def main():
+    global controller, model, cache, falhas
+
     print("--- INICIANDO TRADUÇÃO DE ARTIGOS FALTANTES ---")
     
     if not os.path.exists(ARQUIVO_ENTRADA):
         print(f"Erro: Arquivo '{ARQUIVO_ENTRADA}' não encontrado.")
         return
 
+    # Todas as requisições passam pelo mesmo controlador (cota compartilhada, 429 tratado em conjunto)
+    controller = AsyncRateController(max_concurrency=MAX_WORKERS)
+    model = controller.wrap(genai.GenerativeModel('gemini-2.5-pro'))
+    # Cache de traduções
+    cache = TranslationCache(DEFAULT_CACHE_PATH)
+    # Fila de falhas (motivo, tentativas, próxima tentativa; --retry-failed)
+    falhas = FailureQueue(ARQUIVO_SAIDA)
+
     with open(ARQUIVO_ENTRADA, 'r', encoding='utf-8') as f:
         dados = json.load(f)
 
@@ -151,27 +212,47 @@ def main():
     total = len(dados)
     print(f"Total: {total} | Já traduzidos: {len(mapa_traduzidos)}")
 
+    # --retry-failed: só os itens da fila de falhas cujo intervalo de espera já passou
+    pendentes = None
+    if "--retry-failed" in sys.argv:
+        pendentes = {entrada["node"] for entrada in falhas.due()}
+        print(f"Repetindo {len(pendentes)} itens da fila de falhas.")
+
     itens_para_processar = []
     for i, item in enumerate(dados):
-        if item.get(CHAVE_ID) not in mapa_traduzidos:
+        if item.get(CHAVE_ID) not in mapa_traduzidos and (pendentes is None or item.get(CHAVE_ID) in pendentes):
              itens_para_processar.append((i, item))
 
     print(f"Itens restantes: {len(itens_para_processar)}")
     
-    max_workers = 5
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = []
-        for i, item in itens_para_processar:
-            future = executor.submit(processar_item, item, total, i, mapa_traduzidos, novos_dados)
-            futures.append(future)
-            
-        for future in concurrent.futures.as_completed(futures):
-            pass
+    tarefas = [
+        lambda i=i, item=item: processar_item(item, total, i, mapa_traduzidos, novos_dados)
+        for i, item in itens_para_processar
+    ]
+
+    async def executar():
+        async for indice, _, erro in as_completed_bounded(tarefas, MAX_WORKERS):
+            if erro is not None:
+                i, item = itens_para_processar[indice]
+                print(f"   -> [ERRO] {item.get('title', 'Sem Título')}: {erro!r}")
+                falhas.record(item.get(CHAVE_ID), CHAVE_TEXTO_PORTUGUES, erro,
+                              source_sha(item.get(CHAVE_TEXTO_JAPONES, "")))
+
+    try:
+        asyncio.run(executar())
+    except KeyboardInterrupt:
+        # As requisições pendentes são canceladas; o que já foi traduzido é salvo abaixo
+        print("Interrompido.")
 
     # Final Save
     with open(ARQUIVO_SAIDA, 'w', encoding='utf-8') as f:
         json.dump(novos_dados, f, ensure_ascii=False, indent=2)
 
+    cache.report()
+    controller.report()
+    falhas.report()
+    falhas.close()
+
     print(f"\n--- FIM ---")
     print(f"Arquivo salvo em: {ARQUIVO_SAIDA}")
 
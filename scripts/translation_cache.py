@@ -0,0 +1,230 @@
+"""
+Persistent cache of Gemini translations (SQLite).
+
+Entries are keyed by sha256 of (normalized source text, field_type,
+prompt version, model name), so re-runs and duplicated publications are
+answered locally instead of calling generate_content again.
+
+    python3 scripts/translation_cache.py            # entries per field/model
+"""
+
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import argparse
+import threading
+import unicodedata
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_PATH = os.path.join(PROJECT_ROOT, "data", "translation_cache.sqlite")
+
+
+def normalize_source(text):
+    """NFC, unified line endings and no surrounding whitespace."""
+    text = unicodedata.normalize('NFC', text)
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text.strip()
+
+
+def prompt_version(prompt_template):
+    """Short hash of a prompt template; editing the prompt invalidates its entries."""
+    return hashlib.sha256(prompt_template.encode('utf-8')).hexdigest()[:12]
+
+
+def model_name_of(model):
+    """Name of a GenerativeModel ('models/gemini-2.5-pro' -> 'gemini-2.5-pro')."""
+    name = getattr(model, "model_name", None) or str(model)
+    return name.split("/")[-1]
+
+
+class TranslationCache:
+    """
+    Thread-safe cache shared by the translation workers.
+
+        cache = TranslationCache()
+        result = cache.get_or_translate(text, "title", version, model_name,
+                                        lambda: call_gemini(text))
+        cache.report()
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS translations (
+                key TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                field_type TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                model TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.async_in_flight = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "stored": 0}
+
+    @staticmethod
+    def make_key(text, field_type, version, model_name):
+        payload = json.dumps([normalize_source(text), field_type, version, model_name], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, text, field_type, version, model_name):
+        key = self.make_key(text, field_type, version, model_name)
+        with self.lock:
+            row = self.conn.execute("SELECT translation FROM translations WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, text, field_type, version, model_name, translation):
+        key = self.make_key(text, field_type, version, model_name)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, normalize_source(text), field_type, version, model_name, translation, time.time())
+            )
+            self.conn.commit()
+            self.stats["stored"] += 1
+
+    def get_or_translate(self, text, field_type, version, model_name, translate):
+        """
+        Returns the cached translation or calls translate() once and stores a
+        non-empty result. Concurrent requests for the same key wait for the
+        first one instead of calling the API again.
+        """
+        key = self.make_key(text, field_type, version, model_name)
+
+        while True:
+            with self.lock:
+                row = self.conn.execute("SELECT translation FROM translations WHERE key = ?", (key,)).fetchone()
+                if row:
+                    self.stats["hits"] += 1
+                    return row[0]
+                event = self.in_flight.get(key)
+                if event is None:
+                    event = threading.Event()
+                    self.in_flight[key] = event
+                    self.stats["misses"] += 1
+                    break
+                self.stats["coalesced"] += 1
+            # Someone else is translating the same text; re-check once it is done
+            event.wait()
+
+        try:
+            result = translate()
+            if result:
+                self.put(text, field_type, version, model_name, result)
+            return result
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+            event.set()
+
+    async def get_or_translate_async(self, text, field_type, version, model_name, translate):
+        """
+        get_or_translate for coroutines: translate is an async callable, and
+        concurrent tasks asking for the same key await the first one.
+        """
+        key = self.make_key(text, field_type, version, model_name)
+
+        while True:
+            with self.lock:
+                row = self.conn.execute("SELECT translation FROM translations WHERE key = ?", (key,)).fetchone()
+                if row:
+                    self.stats["hits"] += 1
+                    return row[0]
+                pending = self.async_in_flight.get(key)
+                if pending is None:
+                    pending = asyncio.get_running_loop().create_future()
+                    self.async_in_flight[key] = pending
+                    self.stats["misses"] += 1
+                    break
+                self.stats["coalesced"] += 1
+            # Someone else is translating the same text; re-check once it is done
+            await asyncio.shield(pending)
+
+        try:
+            result = await translate()
+            if result:
+                self.put(text, field_type, version, model_name, result)
+            return result
+        finally:
+            with self.lock:
+                self.async_in_flight.pop(key, None)
+            if not pending.done():
+                pending.set_result(None)
+
+    def report(self):
+        s = self.stats
+        total = s["hits"] + s["misses"]
+        rate = (100.0 * s["hits"] / total) if total else 0.0
+        print(f"Translation cache ({self.path}): {s['hits']} hits, {s['misses']} misses "
+              f"({rate:.1f}% hit rate), {s['coalesced']} duplicate requests coalesced, {s['stored']} stored.")
+
+    def summary(self):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT field_type, model, prompt_version, COUNT(*), SUM(LENGTH(source)) "
+                "FROM translations GROUP BY field_type, model, prompt_version ORDER BY field_type"
+            ).fetchall()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class RefreshingCache:
+    """
+    Write-only view of a TranslationCache: every text is translated again
+    and the new translation replaces the stored one (quality re-runs), so
+    later normal runs read the new text.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def get(self, text, field_type, version, model_name):
+        return None
+
+    def put(self, text, field_type, version, model_name, translation):
+        self.cache.put(text, field_type, version, model_name, translation)
+
+    def get_or_translate(self, text, field_type, version, model_name, translate):
+        result = translate()
+        if result:
+            self.put(text, field_type, version, model_name, result)
+        return result
+
+    async def get_or_translate_async(self, text, field_type, version, model_name, translate):
+        result = await translate()
+        if result:
+            self.put(text, field_type, version, model_name, result)
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the contents of the translation cache.")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="SQLite cache file")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.cache):
+        print(f"Cache not found: {args.cache}")
+        return
+
+    cache = TranslationCache(args.cache)
+    print(f"{'Field':<20} | {'Model':<20} | {'Prompt':<12} | {'Entries':>7} | {'Source chars':>12}")
+    print("-" * 82)
+    for field_type, model, version, count, chars in cache.summary():
+        print(f"{field_type:<20} | {model:<20} | {version:<12} | {count:>7} | {chars or 0:>12}")
+    cache.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Append-only journal of translated fields (JSONL, one fsync'd line each).
+
+translate_full_json.py records every `<key>_ptbr` it sets here, instead of
+re-dumping the whole JSON every few items. The full output is written
+once at the end, or on demand, by replaying the journal over the input.
+After a crash the same replay restores everything already translated, so
+nothing is sent to the model twice.
+
+    {"path": [2, "themes", 8, "titles", 3], "key": "title", "value": "...",
+     "source_sha": "<sha256 of the Japanese text, 16 hex>", "model": "gemini-2.5-pro", "ts": 1718000000.0}
+
+    python3 scripts/translation_journal.py --input data/shin_college_data.json \
+        --journal data/shin_college_data_translated.json.journal.jsonl \
+        --output data/shin_college_data_translated.json
+"""
+
+import os
+import json
+import time
+import hashlib
+import argparse
+import threading
+
+JOURNAL_SUFFIX = ".journal.jsonl"
+
+# Child lists of the shin_college_data tree
+CHILD_KEYS = ("themes", "titles", "publications")
+
+
+def source_sha(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def walk(node, path=()):
+    """Yields (path, dict) for every node of the tree."""
+    if isinstance(node, list):
+        for i, child in enumerate(node):
+            yield from walk(child, path + (i,))
+    elif isinstance(node, dict):
+        yield list(path), node
+        for key in CHILD_KEYS:
+            if isinstance(node.get(key), list):
+                yield from walk(node[key], path + (key,))
+
+
+def resolve(data, path):
+    node = data
+    try:
+        for step in path:
+            node = node[step]
+    except (KeyError, IndexError, TypeError):
+        return None
+    return node if isinstance(node, dict) else None
+
+
+def write_json_atomic(data, output_file, indent=2):
+    temp_file = output_file + ".tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_file, output_file)
+
+
+def reorder_ptbr_keys(item):
+    # Reorder keys to keep translations adjacent to source
+    # This is purely for JSON readability
+    try:
+         new_map = {}
+         # We want to preserve original insertion order roughly, but pull _ptbr up
+         # 'item' keys: 'title', 'publications', 'title_ptbr' ...
+         
+         # Collect base keys (excluding _ptbr)
+         base_keys = [k for k in item.keys() if not k.endswith("_ptbr")]
+         
+         for k in base_keys:
+             new_map[k] = item[k]
+             if f"{k}_ptbr" in item:
+                 new_map[f"{k}_ptbr"] = item[f"{k}_ptbr"]
+         
+         # If there were any _ptbr keys whose base key wasn't found (orphan?), add them?
+         # Unlikely in this script.
+         
+         item.clear()
+         item.update(new_map)
+    except Exception as e:
+        print(f"Error reordering keys: {e}")
+
+
+class TranslationJournal:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.paths = {}
+        self.file = None
+        self.written = 0
+        # (path, key) -> (source sha, translation sha) of the records replay skipped
+        self.replaced = {}
+
+    def index(self, data):
+        """Remembers the path of every node of data, so record() can take the node itself."""
+        self.paths = {id(node): path for path, node in walk(data)}
+
+    def replay(self, data):
+        """
+        Applies the journal to data. Records whose node no longer holds the
+        same source text are skipped; the last one of each field that no
+        later record replaces is kept in self.replaced (translation_status
+        reports those fields as stale). Returns the number of fields applied.
+        """
+        if not os.path.exists(self.path):
+            return 0
+
+        applied = 0
+        skipped = 0
+        touched = {}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn last line of an interrupted run
+                    continue
+                node = resolve(data, record["path"])
+                key = record["key"]
+                text = node.get(key) if node else None
+                field = (tuple(record["path"]), key)
+                if not isinstance(text, str) or source_sha(text) != record["source_sha"]:
+                    skipped += 1
+                    if isinstance(text, str):
+                        self.replaced[field] = (record["source_sha"], source_sha(record["value"]))
+                    continue
+                self.replaced.pop(field, None)
+                node[f"{key}_ptbr"] = record["value"]
+                applied += 1
+                touched[id(node)] = node
+
+        for node in touched.values():
+            reorder_ptbr_keys(node)
+        if skipped:
+            print(f"Journal: {skipped} records skipped (source changed since they were written).")
+        return applied
+
+    def record(self, node, key, value, model=None):
+        """Appends one translated field and fsyncs it before returning."""
+        line = json.dumps({
+            "path": self.paths[id(node)],
+            "key": key,
+            "value": value,
+            "source_sha": source_sha(node[key]),
+            "model": model,
+            "ts": time.time(),
+        }, ensure_ascii=False)
+        with self.lock:
+            if self.file is None:
+                self.file = open(self.path, 'a', encoding='utf-8')
+            self.file.write(line + "\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.written += 1
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Materialize a translated JSON from its input and journal.")
+    parser.add_argument("--input", default="data/shin_college_data.json", help="Untranslated input JSON")
+    parser.add_argument("--output", default="data/shin_college_data_translated.json", help="Output JSON file")
+    parser.add_argument("--journal", default=None, help=f"Journal file (default: <output>{JOURNAL_SUFFIX})")
+    args = parser.parse_args()
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    journal = TranslationJournal(args.journal or args.output + JOURNAL_SUFFIX)
+    applied = journal.replay(data)
+    write_json_atomic(data, args.output)
+    print(f"Applied {applied} journal records; saved {args.output}.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Per-field translation status of a translated JSON, kept next to it.
+
+translate_full_json.py chose its targets by walking every node and
+scanning every field for Japanese characters, megabytes of text per run.
+The status index records, for every field holding Japanese text:
+
+    needs        no <key>_ptbr yet
+    translated   <key>_ptbr made from the current Japanese text
+    stale        <key>_ptbr (in the input, or a journal record replay
+                 skipped) made from a Japanese text that has changed since
+
+    <output>.status.json          {"version": 2, "keys": [...], "input": [size, mtime_ns],
+                                   "journal": [size, mtime_ns], "fields": [size, mtime_ns],
+                                   "counts": {"needs": n, ...},
+                                   "targets": {"needs": [[0,"themes",3], ...], "stale": [...]}}
+    <output>.status.fields.json   {"[0,\"themes\",3]": {"theme": [state, source sha, pt sha]}}
+
+Nodes are keyed by their journal path (translation_journal.walk). While
+the input, the journal and the fields file have the size and mtime
+recorded in the header, the targets are the paths listed there: the
+per-field entries are only read when a run updates them. Otherwise the
+index is rebuilt with the compiled detector (japanese_text.py), keeping
+the source sha each translation was made from, which is how stale
+translations are found. Stale fields are targets like the needs ones:
+translate_full_json.py drops their old translation and asks again.
+
+    python3 scripts/translation_status.py --input data/shin_college_data.json \
+        --output data/shin_college_data_translated.json [--list stale]
+"""
+
+import os
+import json
+import argparse
+
+from japanese_text import has_japanese
+from translation_journal import TranslationJournal, JOURNAL_SUFFIX, walk, resolve, source_sha
+
+STATUS_SUFFIX = ".status.json"
+FIELDS_SUFFIX = ".status.fields.json"
+STATUS_VERSION = 2
+STATES = ("needs", "translated", "stale")
+
+# Fields translated per node (Volume, Theme, Title, Publication content)
+TRANSLATABLE_KEYS = ["volume", "theme", "title", "publication_title", "source", "date", "content"]
+
+
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def fields_path_for(status_path):
+    return status_path[:-len(STATUS_SUFFIX)] + FIELDS_SUFFIX if status_path.endswith(STATUS_SUFFIX) \
+        else status_path + ".fields"
+
+
+def path_key(path):
+    return json.dumps(path, ensure_ascii=False, separators=(',', ':'))
+
+
+def field_status(node, key, previous=None, replaced=None):
+    """
+    [state, source sha, pt sha] of node[key], or None when it holds no
+    Japanese. replaced: (source sha, pt sha) of a journal translation
+    skipped because the source changed.
+    """
+    text = node.get(key)
+    if not has_japanese(text):
+        return None
+    sha = source_sha(text)
+    translation = node.get(f"{key}_ptbr")
+    if not translation:
+        return ["stale", replaced[0], replaced[1]] if replaced else ["needs", sha, None]
+    pt_sha = source_sha(translation) if isinstance(translation, str) else None
+    # Same translation as before over a different source: made from the old text
+    if previous and previous[0] != "needs" and previous[2] == pt_sha and previous[1] != sha:
+        return ["stale", previous[1], pt_sha]
+    return ["translated", sha, pt_sha]
+
+
+class TranslationStatus:
+    """
+    Usage:
+        status = TranslationStatus(output + STATUS_SUFFIX)
+        if not status.is_current(input_path, journal_path):
+            status.build(data, journal.replaced)
+        targets = status.targets(data)
+        ...
+        status.update(data, paths_of_changed_nodes)
+        status.save(input_path, journal_path)
+    """
+
+    def __init__(self, path, keys=TRANSLATABLE_KEYS):
+        self.path = path
+        self.fields_path = fields_path_for(path)
+        self.keys = list(keys)
+        self._fields = None
+        self.signatures = {}
+        self.saved_counts = dict.fromkeys(STATES, 0)
+        self.saved_targets = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    saved = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Warning: ignoring unreadable status index {path}: {e}")
+                saved = {}
+            if saved.get("version") == STATUS_VERSION and saved.get("keys") == self.keys:
+                self.signatures = {name: saved.get(name) for name in ("input", "journal", "fields")}
+                self.saved_counts.update(saved.get("counts", {}))
+                self.saved_targets = saved.get("targets", {})
+
+    @property
+    def fields(self):
+        """Per-field entries, read from the fields file on first use."""
+        if self._fields is None:
+            self._fields = {}
+            if self.signatures and self.signatures.get("fields") == file_signature(self.fields_path):
+                try:
+                    with open(self.fields_path, 'r', encoding='utf-8') as f:
+                        self._fields = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"Warning: ignoring unreadable status fields {self.fields_path}: {e}")
+        return self._fields
+
+    def is_current(self, input_path, journal_path):
+        """True if the index describes input_path with journal_path replayed over it."""
+        return bool(self.signatures) and \
+            self.signatures.get("input") == file_signature(input_path) and \
+            self.signatures.get("journal") == file_signature(journal_path) and \
+            self.signatures.get("fields") == file_signature(self.fields_path)
+
+    def _node_fields(self, node, previous, replaced=None):
+        fields = {}
+        for key in self.keys:
+            entry = field_status(node, key, previous.get(key), (replaced or {}).get(key))
+            if entry:
+                fields[key] = entry
+        return fields
+
+    def build(self, data, replaced=None):
+        """
+        Recomputes every field of data, keeping the provenance of the
+        translations already indexed. replaced: TranslationJournal.replaced
+        after the replay, {(path, key): (source sha, pt sha)}.
+        """
+        by_path = {}
+        for (path, key), shas in (replaced or {}).items():
+            by_path.setdefault(path, {})[key] = shas
+        fields = {}
+        for path, node in walk(data):
+            key = path_key(path)
+            node_fields = self._node_fields(node, self.fields.get(key, {}), by_path.get(tuple(path)))
+            if node_fields:
+                fields[key] = node_fields
+        self._fields = fields
+
+    def update(self, data, paths):
+        """Recomputes the fields of the nodes at paths (the ones a run touched)."""
+        fields = self.fields
+        for path in paths:
+            key = path_key(path)
+            node = resolve(data, path)
+            node_fields = self._node_fields(node, fields.get(key, {})) if node is not None else {}
+            if node_fields:
+                fields[key] = node_fields
+            else:
+                fields.pop(key, None)
+
+    def entries(self, state=None):
+        """Yields (path, key, [state, source sha, pt sha]) in document order."""
+        for key, node_fields in self.fields.items():
+            for field, entry in node_fields.items():
+                if state is None or entry[0] == state:
+                    yield json.loads(key), field, entry
+
+    def target_paths(self, state="needs"):
+        """Paths of the nodes with fields in state, in document order."""
+        if self._fields is None:
+            # Unchanged index: the header lists them, the fields file is not read
+            return self.saved_targets.get(state, [])
+        return [json.loads(key) for key, node_fields in self._fields.items()
+                if any(entry[0] == state for entry in node_fields.values())]
+
+    def targets(self, data, states=("needs", "stale"), accept=None):
+        """Nodes of data with fields in states (and accepted by accept(path)), by state then document order."""
+        nodes = []
+        seen = set()
+        for state in states:
+            for path in self.target_paths(state):
+                if accept is not None and not accept(path):
+                    continue
+                node = resolve(data, path)
+                if node is not None and id(node) not in seen:
+                    seen.add(id(node))
+                    nodes.append(node)
+        return nodes
+
+    def reopen_stale(self, data, nodes):
+        """Drops the stale <key>_ptbr of nodes so they are translated again. Returns the number dropped."""
+        chosen = {id(node) for node in nodes}
+        dropped = 0
+        for path, key, _ in self.entries("stale"):
+            node = resolve(data, path)
+            if node is not None and id(node) in chosen and node.pop(f"{key}_ptbr", None) is not None:
+                dropped += 1
+        return dropped
+
+    def counts(self):
+        if self._fields is None:
+            return dict(self.saved_counts)
+        counts = dict.fromkeys(STATES, 0)
+        for node_fields in self.fields.values():
+            for entry in node_fields.values():
+                counts[entry[0]] += 1
+        return counts
+
+    def save(self, input_path, journal_path):
+        """Writes the fields file, then the header that vouches for it."""
+        self._write(self.fields_path, self.fields)
+        status = {
+            "version": STATUS_VERSION,
+            "keys": self.keys,
+            "input": file_signature(input_path),
+            "journal": file_signature(journal_path),
+            "fields": file_signature(self.fields_path),
+            "counts": self.counts(),
+            "targets": {state: self.target_paths(state) for state in STATES if state != "translated"},
+        }
+        self._write(self.path, status)
+
+    @staticmethod
+    def _write(path, data):
+        temp_path = path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(temp_path, path)
+
+    def report(self):
+        counts = self.counts()
+        print(f"Translation status ({self.path}): " + ", ".join(f"{counts[s]} {s}" for s in STATES) + " fields.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and show the translation status index of a translated JSON.")
+    parser.add_argument("--input", default="data/shin_college_data.json", help="Untranslated input JSON")
+    parser.add_argument("--output", default="data/shin_college_data_translated.json", help="Translated output JSON")
+    parser.add_argument("--journal", default=None, help=f"Journal file (default: <output>{JOURNAL_SUFFIX})")
+    parser.add_argument("--list", choices=STATES, default=None, help="List the fields in this state")
+    args = parser.parse_args()
+
+    journal_path = args.journal or args.output + JOURNAL_SUFFIX
+    with open(args.input, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    journal = TranslationJournal(journal_path)
+    journal.replay(data)
+
+    status = TranslationStatus(args.output + STATUS_SUFFIX)
+    status.build(data, journal.replaced)
+    status.save(args.input, journal_path)
+    status.report()
+
+    if args.list:
+        for path, key, entry in status.entries(args.list):
+            node = resolve(data, path)
+            print(f"{path_key(path):<40} {key:<18} {node[key][:60]!r}")
+
+if __name__ == "__main__":
+    main()